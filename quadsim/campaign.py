@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2021 Luminita-Cristiana Totu
+#
+# Part of the QuadrotorSim aka quadsim package
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this package, in a file called LICENSE.
+# If not, see <https://www.gnu.org/licenses/>.
+
+""" Monte Carlo campaigns of the headless simulation
+
+A campaign runs every combination of seeds x filter configurations x
+reference modes with simulation.run, in a pool of processes, and appends one
+row per run ( RMSE, NEES, runtime ) to a CSV table as the runs finish. Runs
+already in the table are skipped, so an interrupted campaign is resumed by
+running it again.
+
+    python campaign.py logs/campaign.csv --seeds 20 --ref_modes hover step
+
+"""
+
+__version__ = "0.1"
+__author__ = "Luminita-Cristiana Totu"
+__copyright__ = "Copyright (C) 2019 Luminita-Cristiana Totu"
+__license__ = "GNU GPLv3"
+
+import os
+import csv
+import math
+import argparse
+import concurrent.futures
+import numpy as np
+
+import simulation
+
+filter_configs = {
+    "model0":            { "estimator": "model0" },
+    "model1":            { "estimator": "model1" },
+    "model1-ekf":        { "estimator": "model1-ekf" },
+    "model2":            { "estimator": "model2" },
+    "model2-ukf":        { "estimator": "model2", "variant": 0 },
+    "model2-ekf":        { "estimator": "model2-ekf" },
+    "model2-ekf-simple": { "estimator": "model2-ekf", "joseph": 0 },
+    "model3":            { "estimator": "model3" },
+    "model3-ekf":        { "estimator": "model3-ekf" },
+}
+""" Filter configurations, as SimConfig fields. The names without suffix are
+the IUKF and EKF of the main_estim_with_ukf_model* scripts, -ukf is the plain
+UKF, -simple the simple covariance update in place of the Joseph form """
+
+columns = ("run", "filter", "ref_mode", "seed", "rmse_pos", "rmse_euler",
+           "nees", "runtime", "steps", "t", "error")
+""" Columns of the results table """
+
+def _run_worker(run, filter, ref_mode, seed, config):
+    # one row of the table; a run that fails is recorded with its error
+    row = { "run": run, "filter": filter, "ref_mode": ref_mode, "seed": seed }
+    try:
+        results = simulation.run(config)
+        row.update(rmse_pos = results.rmse_pos, rmse_euler = results.rmse_euler,
+                   nees = results.nees, runtime = results.runtime,
+                   steps = results.steps, t = results.t, error = "")
+    except Exception as e:
+        row.update(rmse_pos = math.nan, rmse_euler = math.nan, nees = math.nan,
+                   runtime = math.nan, steps = 0, t = math.nan,
+                   error = "%s: %s" % (type(e).__name__, e))
+    return row
+
+def read_rows(fullname):
+    """ Rows of a results table, as dicts of strings; a last row cut by an
+    interruption is dropped """
+    if not os.path.exists(fullname):
+        return []
+    with open(fullname, newline = "") as f:
+        return [ row for row in csv.DictReader(f)
+                 if None not in row.values() and None not in row ]
+
+def load_table(fullname):
+    """ Results table as a dict of column name -> array """
+    rows = read_rows(fullname)
+    table = {}
+    for name in columns:
+        values = [ row[name] for row in rows ]
+        if name in ("run", "filter", "ref_mode", "error"):
+            table[name] = np.array(values, dtype = str)
+        else:
+            table[name] = np.array(values, dtype = float)
+    return table
+
+def summary(table):
+    """ Means over the seeds, ( filter, ref_mode ) -> dict of rmse_pos,
+    rmse_euler, nees, runtime, and the number of runs and of failed runs """
+    result = {}
+    ok = table["error"] == ""
+    for key in sorted(set(zip(table["filter"], table["ref_mode"]))):
+        sel = (table["filter"] == key[0]) & (table["ref_mode"] == key[1])
+        result[key] = { name: float(np.mean(table[name][sel & ok])) if np.any(sel & ok) else math.nan
+                        for name in ("rmse_pos", "rmse_euler", "nees", "runtime") }
+        result[key]["runs"] = int(np.sum(sel))
+        result[key]["failed"] = int(np.sum(sel & ~ok))
+    return result
+
+class Campaign:
+    """ Seeds x filter configurations x reference modes, with their table """
+
+    def __init__(self, fullname, seeds = range(10), filters = tuple(filter_configs),
+                 ref_modes = ("hover",), **config):
+        """ filters are names in campaign.filter_configs, or a dict of name ->
+        SimConfig fields. config holds the SimConfig fields common to all
+        the runs ( e.g. t_end ) """
+
+        self.fullname = fullname
+        """ CSV file of the results table """
+
+        self.seeds = list(seeds)
+        self.filters = filters if isinstance(filters, dict) else \
+                       { name: filter_configs[name] for name in filters }
+        self.ref_modes = list(ref_modes)
+        self.config = config
+
+    def runs(self):
+        """ ( run, filter, ref_mode, seed, config ) of all the runs, run
+        being the key of the row in the table """
+        for filter, filter_config in self.filters.items():
+            for ref_mode in self.ref_modes:
+                for seed in self.seeds:
+                    config = dict(self.config, ref_mode = ref_mode, seed = seed, **filter_config)
+                    yield ("%s/%s/%d" % (filter, ref_mode, seed), filter, ref_mode, seed, config)
+
+    def run(self, processes = None):
+        """ Runs what is not in the table yet, in a pool of processes ( here
+        if processes is 1 ), and returns the table. Needs a
+        if __name__ == "__main__" guard unless the start method is fork """
+
+        location = os.path.dirname(self.fullname)
+        if location and not os.path.exists(location):
+            os.makedirs(location)
+
+        rows = read_rows(self.fullname)
+        done = set(row["run"] for row in rows)
+        todo = [ run for run in self.runs() if run[0] not in done ]
+
+        # rewrite the table with the complete rows, in a temporary file 
+        # replacing the table only once written, then append to it
+        tmpname = self.fullname + ".tmp"
+        with open(tmpname, "w", newline = "") as f:
+            writer = csv.DictWriter(f, columns)
+            writer.writeheader()
+            writer.writerows(rows)
+        os.replace(tmpname, self.fullname)
+
+        with open(self.fullname, "a", newline = "") as f:
+            writer = csv.DictWriter(f, columns)
+            def write(row):
+                writer.writerow(row)
+                f.flush()
+            if (processes == 1):
+                for run in todo:
+                    write(_run_worker(*run))
+            else:
+                with concurrent.futures.ProcessPoolExecutor(processes) as pool:
+                    futures = [ pool.submit(_run_worker, *run) for run in todo ]
+                    for future in concurrent.futures.as_completed(futures):
+                        write(future.result())
+
+        return self.table()
+
+    def table(self):
+        """ Results table of the runs done so far """
+        return load_table(self.fullname)
+
+if __name__ == "__main__":
+
+    arg_parser = argparse.ArgumentParser(description = "Monte Carlo campaign")
+    arg_parser.add_argument("fullname", help = "CSV file of the results table")
+    arg_parser.add_argument("--seeds", type = int, default = 10, help = "Number of seeds")
+    arg_parser.add_argument("--filters", nargs = "+", default = list(filter_configs), 
+                            choices = list(filter_configs))
+    arg_parser.add_argument("--ref_modes", nargs = "+", default = ["hover"])
+    arg_parser.add_argument("--t_end", type = float, default = None)
+    arg_parser.add_argument("--processes", type = int, default = None)
+    args = arg_parser.parse_args()
+
+    campaign = Campaign(args.fullname, range(args.seeds), args.filters, args.ref_modes,
+                        t_end = args.t_end)
+    for key, values in summary(campaign.run(args.processes)).items():
+        print("%-18s %-10s rmse_pos %8.4f rmse_euler %8.4f nees %8.2f runtime %6.2f  runs %d failed %d" %
+              (key + tuple(values[name] for name in ("rmse_pos", "rmse_euler", "nees",
+                                                     "runtime", "runs", "failed"))))
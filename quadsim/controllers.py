@@ -38,9 +38,9 @@ class AttController_01:
         self.dt_ctrl_rate = 1.0/freq_ctrl_rate
 
         rate_sat = 4
-        self.pid_rollrate = pid.PID(50, 0, 0, rate_sat*360*math.pi/180, -rate_sat*360*math.pi/180, 0.01)
-        self.pid_pitchrate = pid.PID(50, 0, 0, rate_sat*360*math.pi/180, -rate_sat*360*math.pi/180, 0.01)
-        self.pid_yawrate = pid.PID(50, 0, 0, rate_sat*360*math.pi/180, -rate_sat*360*math.pi/180, 0.01)
+        self.pid_rollrate = pid.PID(50, 0, 0, rate_sat*360*math.pi/180, -rate_sat*360*math.pi/180, 0.01, self.dt_ctrl_rate)
+        self.pid_pitchrate = pid.PID(50, 0, 0, rate_sat*360*math.pi/180, -rate_sat*360*math.pi/180, 0.01, self.dt_ctrl_rate)
+        self.pid_yawrate = pid.PID(50, 0, 0, rate_sat*360*math.pi/180, -rate_sat*360*math.pi/180, 0.01, self.dt_ctrl_rate)
 
 #        self.pid_rollrate = pid.PID(10, 0, 0, 8*360*math.pi/180,-8*360*math.pi/180, 0.01)
 #        self.pid_pitchrate = pid.PID(10, 0, 0, 8*360*math.pi/180,-8*360*math.pi/180, 0.01)
@@ -49,9 +49,9 @@ class AttController_01:
         self.dt_ctrl_angle = 1.0/freq_ctrl_angle  
         
         angle_sat = 1.5
-        self.pid_pitch = pid.PID(10, 0, 0, angle_sat*360*math.pi/180, -angle_sat*360*math.pi/180, 0.01)
-        self.pid_roll = pid.PID(10, 0, 0, angle_sat*360*math.pi/180, -angle_sat*360*math.pi/180, 0.01)
-        self.pid_yaw = pid.PID(5, 0, 0, angle_sat*360*math.pi/180, -angle_sat*360**math.pi/180, 0.01)
+        self.pid_pitch = pid.PID(10, 0, 0, angle_sat*360*math.pi/180, -angle_sat*360*math.pi/180, 0.01, self.dt_ctrl_angle)
+        self.pid_roll = pid.PID(10, 0, 0, angle_sat*360*math.pi/180, -angle_sat*360*math.pi/180, 0.01, self.dt_ctrl_angle)
+        self.pid_yaw = pid.PID(5, 0, 0, angle_sat*360*math.pi/180, -angle_sat*360**math.pi/180, 0.01, self.dt_ctrl_angle)
 
 #        self.pid_pitch = pid.PID(1, 0, 0, 2.5*360*math.pi/180, -2.5*360*math.pi/180, 0.01)
 #        self.pid_roll = pid.PID(1, 0, 0, 2.5*360*math.pi/180, -2.5*360*math.pi/180, 0.01)
@@ -62,17 +62,10 @@ class AttController_01:
         
         alpha_ref = np. zeros(3)
         
-        alpha_ref[0] = self.pid_rollrate.run(ref_omegab[0]-meas_omegab[0], self.dt_ctrl_rate)
-        alpha_ref[0] = self.pid_rollrate.saturate()
-        self.pid_rollrate.antiwindup()
-        
-        alpha_ref[1] = self.pid_pitchrate.run(ref_omegab[1]-meas_omegab[1],self.dt_ctrl_rate)
-        alpha_ref[1] = self.pid_pitchrate.saturate()
-        self.pid_pitchrate.antiwindup()
-        
-        alpha_ref[2] = self.pid_yawrate.run(ref_omegab[2]-meas_omegab[2],self.dt_ctrl_rate)
-        alpha_ref[2] = self.pid_yawrate.saturate()
-        self.pid_yawrate.antiwindup()
+        # run, saturate and antiwindup, at dt_ctrl_rate
+        alpha_ref[0] = self.pid_rollrate.step(ref_omegab[0]-meas_omegab[0])
+        alpha_ref[1] = self.pid_pitchrate.step(ref_omegab[1]-meas_omegab[1])
+        alpha_ref[2] = self.pid_yawrate.step(ref_omegab[2]-meas_omegab[2])
         
         tau_ref = J@alpha_ref + utils.skew(meas_omegab)@J@meas_omegab
 
@@ -82,13 +75,9 @@ class AttController_01:
         
         omega_ref = np. zeros(3)
         
-        omega_ref[0] = self.pid_roll.run(ref_rpy[0]-meas_rpy[0],self.dt_ctrl_angle)
-        omega_ref[0] = self.pid_roll.saturate()
-        self.pid_roll.antiwindup()
-        
-        omega_ref[1] = self.pid_pitch.run(ref_rpy[1]-meas_rpy[1],self.dt_ctrl_angle)
-        omega_ref[1] = self.pid_pitch.saturate()
-        self.pid_pitch.antiwindup()
+        # run, saturate and antiwindup, at dt_ctrl_angle
+        omega_ref[0] = self.pid_roll.step(ref_rpy[0]-meas_rpy[0])
+        omega_ref[1] = self.pid_pitch.step(ref_rpy[1]-meas_rpy[1])
         
        # make possible 2*pi degrees yaw movement 
        # by bridging  the discontinuity -pi + pi 
@@ -98,9 +87,7 @@ class AttController_01:
         elif (err_yaw < -math.pi):
             err_yaw = 2*math.pi + err_yaw
         
-        omega_ref[2] = self.pid_yaw.run(err_yaw,self.dt_ctrl_angle)
-        omega_ref[2] = self.pid_yaw.saturate()
-        self.pid_yaw.antiwindup()
+        omega_ref[2] = self.pid_yaw.step(err_yaw)
         
         return omega_ref
     
@@ -186,7 +173,7 @@ class PosController_02:
             rp_ref = (V/v_max)*rp_ref
         
         # recalculate to do antiwindup 
-        T12 = np.transpose(R)*envir.g*rp_ref
+        T12 = envir.g*np.transpose(R)@rp_ref
         self.pid_vx.u = T12[0]
         self.pid_vx.antiwindup()
         self.pid_vy.u = T12[1]
@@ -216,4 +203,123 @@ class PosController_02:
         ref_ve[1] = self.pid_y.run(ref_pos[1] - meas_pos[1], self.dt_ctrl_pos_p)
         ref_ve[2] = self.pid_z.run(ref_pos[2] - meas_pos[2], self.dt_ctrl_pos_p)
         
-        return ref_ve
\ No newline at end of file
+        return ref_ve
+
+
+class AttControllerBatch_01:
+    """ AttController_01 for N vehicles: the PID gains and states are (N,3)
+    arrays ( roll, pitch, yaw columns ) and each loop is one array step for
+    all the axes and vehicles, with the same saturation and anti-windup """
+
+    def __init__(self, N, freq_ctrl_rate = 500, freq_ctrl_angle = 250):
+
+        ctrl = AttController_01(freq_ctrl_rate, freq_ctrl_angle)
+
+        self.N = N
+        """ Number of vehicles """
+
+        self.dt_ctrl_rate = ctrl.dt_ctrl_rate
+        self.pid_rate = pid.PIDArray.from_pids([ctrl.pid_rollrate, ctrl.pid_pitchrate, 
+                                                ctrl.pid_yawrate], N)
+        """ Rate PIDs, columns roll, pitch, yaw rate """
+
+        self.dt_ctrl_angle = ctrl.dt_ctrl_angle
+        self.pid_angle = pid.PIDArray.from_pids([ctrl.pid_roll, ctrl.pid_pitch, 
+                                                 ctrl.pid_yaw], N)
+        """ Angle PIDs, columns roll, pitch, yaw """
+
+    def run_rate(self, ref_omegab, meas_omegab, J):
+        """ ref_omegab, meas_omegab are (N,3), J is (3,3) or (N,3,3); 
+        returns the (N,3) torque references """
+
+        meas_omegab = np.asarray(meas_omegab, dtype=float)
+        self.pid_rate.run(np.asarray(ref_omegab) - meas_omegab, self.dt_ctrl_rate)
+        alpha_ref = self.pid_rate.saturate()
+        self.pid_rate.antiwindup()
+
+        J = np.asarray(J, dtype=float)
+        if (J.ndim == 2):
+            Jalpha = alpha_ref@J.T
+            Jomega = meas_omegab@J.T
+        else:
+            Jalpha = np.einsum('nij,nj->ni', J, alpha_ref)
+            Jomega = np.einsum('nij,nj->ni', J, meas_omegab)
+
+        return Jalpha + np.cross(meas_omegab, Jomega)
+
+    def run_angle(self, ref_rpy, meas_rpy):
+        """ ref_rpy, meas_rpy are (N,3); returns the (N,3) rate references """
+
+        err = np.asarray(ref_rpy, dtype=float) - np.asarray(meas_rpy, dtype=float)
+        # yaw error across the -pi + pi discontinuity, as AttController_01 
+        err_yaw = err[:,2]
+        err[:,2] = np.where(err_yaw > math.pi, -(2*math.pi - err_yaw),
+                            np.where(err_yaw < -math.pi, 2*math.pi + err_yaw, err_yaw))
+
+        self.pid_angle.run(err, self.dt_ctrl_angle)
+        omega_ref = self.pid_angle.saturate()
+        self.pid_angle.antiwindup()
+
+        return omega_ref
+
+class PosControllerBatch_02:
+    """ PosController_02 for N vehicles, the velocity and position PIDs as
+    (N,3) arrays ( x, y, z columns ) """
+
+    def __init__(self, N, freq_ctrl_pos_v = 10, freq_ctrl_pos_p = 10):
+
+        ctrl = PosController_02(freq_ctrl_pos_v, freq_ctrl_pos_p)
+
+        self.N = N
+        """ Number of vehicles """
+
+        self.dt_ctrl_pos_v = ctrl.dt_ctrl_pos_v
+        self.pid_v = pid.PIDArray.from_pids([ctrl.pid_vx, ctrl.pid_vy, ctrl.pid_vz], N)
+        """ Velocity PIDs, columns vx, vy, vz """
+
+        self.dt_ctrl_pos_p = ctrl.dt_ctrl_pos_p
+        self.pid_p = pid.PIDArray.from_pids([ctrl.pid_x, ctrl.pid_y, ctrl.pid_z], N)
+        """ Position PIDs, columns x, y, z """
+
+        self.max_thrust = ctrl.max_thrust
+
+    def run_vel(self, ref_ve, meas_ve, meas_yaw, mass):
+        """ ref_ve, meas_ve are (N,3), meas_yaw (N,), mass a scalar or (N,);
+        returns the (N,2) roll, pitch references and the (N,) thrusts """
+
+        T = self.pid_v.run(np.asarray(ref_ve, dtype=float) - np.asarray(meas_ve, dtype=float), 
+                           self.dt_ctrl_pos_v)
+
+        s = np.sin(meas_yaw)
+        c = np.cos(meas_yaw)
+        rp_ref = np.column_stack((s*T[:,0] - c*T[:,1], c*T[:,0] + s*T[:,1]))/envir.g
+
+        # And saturate 
+        V = 30 * math.pi /180 
+        v_max = np.max(abs(rp_ref), axis=1)
+        rp_ref = np.where((v_max > V)[:,None], (V/np.maximum(v_max, V))[:,None]*rp_ref, rp_ref)
+
+        # recalculate to do antiwindup, T12 = g*R^T*rp_ref as PosController_02
+        u = self.pid_v.u.copy()
+        u[:,0] = envir.g*( s*rp_ref[:,0] + c*rp_ref[:,1])
+        u[:,1] = envir.g*(-c*rp_ref[:,0] + s*rp_ref[:,1])
+
+        mass = np.broadcast_to(np.asarray(mass, dtype=float), (self.N,))
+        thrust_ref = mass*envir.g + mass*T[:,2]
+
+        # And saturate 
+        thrust_ref = np.where(thrust_ref > self.max_thrust, self.max_thrust,
+                              np.where(thrust_ref < 0.8*mass*envir.g, 0.8*mass*envir.g, thrust_ref))
+
+        # recalculate to do anti-windup
+        u[:,2] = (thrust_ref - mass*envir.g)/mass
+        self.pid_v.u = u
+        self.pid_v.antiwindup()
+
+        return rp_ref, thrust_ref
+
+    def run_pos(self, ref_pos, meas_pos):
+        """ ref_pos, meas_pos are (N,3); returns the (N,3) velocity references """
+
+        return self.pid_p.run(np.asarray(ref_pos, dtype=float) - np.asarray(meas_pos, dtype=float),
+                              self.dt_ctrl_pos_p)
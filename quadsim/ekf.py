@@ -1,10 +1,11 @@
 import numpy as np
 from scipy.integrate import odeint
+from scipy.linalg import cho_factor, cho_solve
 
 class EKF:
     """ Implementation of the discrete-time EKF """
       
-    def __init__(self, f, dfdx, G, Q, x0, P0, M=0, b=0):
+    def __init__(self, f, dfdx, G, Q, x0, P0, M=0, b=0, F_rows=None, rows=False):
 
         # ToDo: size checks
         self.f = f
@@ -15,6 +16,18 @@ class EKF:
         self.P = P0
         self.n = self.x.shape[0]
         
+        self.I_n = np.eye(self.n)
+        """ Identity, built once """
+
+        self.F_rows = F_rows
+        """ Rows of dfdx that can be non-zero ( e.g. 
+        rigidbody.motion3d_ros_biases_F_rows ), None if unknown. Used in 
+        predict to skip the products with the zero rows """
+
+        self.rows = rows
+        """ If True, dfdx returns only the F_rows rows ( e.g. 
+        motion3d_ros_biases_dFXdX_rows ), else the full matrix """
+        
         # Implements constraint M@x=b
         if (M==0):
             return 
@@ -28,22 +41,40 @@ class EKF:
         else:
             Y = odeint(self.f,self.x,np.array([0, dt]),args=(u,))
             self.x = Y[1]  
-        A = np.eye(self.x.shape[0]) + self.dfdx(self.x, u)*dt
-        self.P = A@self.P@A.transpose() + dt*self.G@self.Q@self.G.transpose()
+        if (self.F_rows is None):
+            A = self.I_n + self.dfdx(self.x, u)*dt
+            self.P = A@self.P@A.transpose() + dt*self.G@self.Q@self.G.transpose()
+        else:
+            # A = I + dt*F with F zero outside F_rows, so A*P*A' =
+            # P + dt*F*P + (dt*F*P)' + dt*F*P*F'*dt, only on those rows
+            r = self.F_rows
+            Fr = self.dfdx(self.x, u)
+            if not self.rows:
+                Fr = Fr[r]
+            Fr = Fr*dt
+            FP = Fr@self.P
+            P = self.P + dt*self.G@self.Q@self.G.transpose()
+            P[r,:] += FP
+            P[:,r] += FP.transpose()
+            P[np.ix_(r,r)] += FP@Fr.transpose()
+            self.P = P
 
     def update(self, y, h, dhdx, R, var = 0):
         H = dhdx(self.x)
         Pxy = self.P@H.transpose()
         Py = H@self.P@H.transpose()
-        K = Pxy@np.linalg.inv(Py+R)
+        # K = Pxy*(Py+R)^-1, Cholesky solve instead of the inverse 
+        K = cho_solve(cho_factor(Py+R, lower=True), Pxy.transpose()).transpose()
         y_est = h(self.x)
         self.x = self.x + K@(y-y_est)
         if (var == 0):
-            # Simple Covariance Update
-            self.P = self.P - K@(Py+R)@np.transpose(K)
+            # Simple Covariance Update, K*(Py+R)*K' = K*Pxy', symmetrized so
+            # that the rounding does not build up over long runs
+            P = self.P - K@Pxy.transpose()
+            self.P = 0.5*(P + P.transpose())
         else:
             # Joseph Form Covariance Update
-            IUK = np.eye(self.n) - K@H
+            IUK = self.I_n - K@H
             self.P = IUK@self.P@IUK.transpose()+K@R@K.transpose()
 
     def apply_eq_constraint(self):
@@ -54,11 +85,11 @@ class EKF:
         #Wi = self.P
         
         # Option 2
-        Wi = np.eye(self.x.shape[0])
+        Wi = self.I_n
 
         A = np.linalg.inv(self.M@Wi@self.M.transpose())
         Lambda = Wi@self.M.transpose()*A
         
         self.x -= Lambda@(self.M@self.x-self.b)
-        self.P = (np.eye(self.x.shape[0]) - Lambda@self.M)@self.P
+        self.P = (self.I_n - Lambda@self.M)@self.P
 ##########################################################
\ No newline at end of file
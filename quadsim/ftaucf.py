@@ -32,7 +32,33 @@ __license__ = "GNU GPLv3"
 
 import numpy as np
 import math
-import sys
+
+#####################################################
+# Command lookup tables 
+#####################################################
+
+_lut_cache = {}
+""" Tables already built, keyed by the polynomial coefficients """
+
+def build_luts(input2thrust_coeff, input2omegar_coeff, thrust2torque_coeff):
+    """ Thrust, rotor angular velocity and rotor torque for every integer 
+    command 0..65535, dead-bands included. Built once per set of 
+    coefficients and shared ( read-only ) by all the instances using them """
+    
+    key = (tuple(input2thrust_coeff), tuple(input2omegar_coeff), 
+           tuple(thrust2torque_coeff))
+    if key not in _lut_cache:
+        cmd = np.arange(2**16, dtype=float)
+        thrust = np.polyval(input2thrust_coeff, cmd)
+        thrust[cmd < 1000] = 0
+        omegar = np.polyval(input2omegar_coeff, cmd)
+        omegar[cmd <= 1000] = 0
+        torque = np.polyval(thrust2torque_coeff, thrust)
+        torque[thrust == 0] = 0
+        for table in (thrust, omegar, torque):
+            table.flags.writeable = False
+        _lut_cache[key] = (thrust, omegar, torque)
+    return _lut_cache[key]
 
 #####################################################
 # Julian Foerster's model 
@@ -41,8 +67,9 @@ import sys
 class QuadFTau_CF:
     """ Model of the mini quadrotor the Crazyflie """
     
-    def __init__(self, std_ratio, plus = True):
-        """ std_ration should be in [0,1] """
+    def __init__(self, std_ratio, plus = True, lut = False):
+        """ std_ration should be in [0,1]. With lut True, input2ftau 
+        uses the 65536 entry command tables instead of the polynomials """
         
         # if plus is false we have cross 
         self.plus = plus
@@ -107,6 +134,21 @@ class QuadFTau_CF:
         # Really different from Benoit Landry MIT paper Kf and Km, by 3 orders of mag
         self.cT = 1.903*10**(-8)
         self.cQ = 1.246*10**(-10)
+        
+        # rotor thrusts to [taub_x, taub_y], and rotor torques to taub_z 
+        if self.plus is True:
+            self.thrust2taubxy = np.array([[0, 1, 0, -1],
+                                           [-1, 0, 1, 0]])*self.radius
+        else:
+            self.thrust2taubxy = np.array([[-1, 1, 1, -1],
+                                           [-1, -1, 1, 1]])*math.sqrt(2)/2*self.radius
+        self.torque2taubz = np.array([-1, 1, -1, 1])
+        
+        self.lut = lut
+        if self.lut is True:
+            self.lut_thrust, self.lut_omegar, self.lut_torque = build_luts(
+                    self.input2thrust_coeff, self.input2omegar_coeff, 
+                    self.thrust2torque_coeff)
 		
     
     def input2thrust_i(self, cmd_i):
@@ -187,48 +229,43 @@ class QuadFTau_CF:
                    /  \
 		          *    *
 		   CCW  (3)    (4) CW
+		
+        cmd can also be a (N,4) array, one row per vehicle, with vb (N,3); 
+        then fb and taub are (N,3). cmd is not modified. 
 		"""
-        # basic check 
-        for i in range(4):
-            if cmd[i]<0:
-                cmd[i]=0
-            elif cmd[i]>2**16-1:
-                cmd[i]=2**16-1
-            cmd[i]=int(cmd[i])
+        # basic check, clamp and truncate to integer commands 
+        cmd = np.floor(np.clip(np.asarray(cmd, dtype=float), 0, 2**16-1))
+        
+        if self.lut is True:
+            idx = cmd.astype(np.intp)
+            ft = self.lut_thrust[idx]
+            omegar = self.lut_omegar[idx]
+            taur = self.lut_torque[idx]
+        else:
+            # thrust on each rotor, dead-band below 1000
+            ft = np.polyval(self.input2thrust_coeff, cmd)
+            ft[cmd < 1000] = 0
             
-        # thrust on each rotor
-        ft1 = self.input2thrust_i(cmd[0])
-        ft2 = self.input2thrust_i(cmd[1])
-        ft3 = self.input2thrust_i(cmd[2])
-        ft4 = self.input2thrust_i(cmd[3])
+            # ang velocity on each rotor, dead-band up to 1000
+            omegar = np.polyval(self.input2omegar_coeff, cmd)
+            omegar[cmd <= 1000] = 0
             
-        # ang velocity on each rotor
-        omegar = self.input2omegar(cmd)
+            # torque of each rotor
+            taur = np.polyval(self.thrust2torque_coeff, ft)
+            taur[ft == 0] = 0
           
         # aerodynamic force
-        fba = self.f_aero(omegar,vb)
+        fba = (np.asarray(vb)@self.Kaero.T)*np.sum(omegar, axis=-1, keepdims=True)
          
         # total force
-        fb = ( np.array([0,0,ft1+ft2+ft3+ft4]) # thrust  
-               + fba # aerodynamic forces s
-              ) 
-        
-        taur1 = self.thrust2torque_i(ft1)
-        taur2 = self.thrust2torque_i(ft2)
-        taur3 = self.thrust2torque_i(ft3)
-        taur4 = self.thrust2torque_i(ft4)
+        fb = fba # aerodynamic forces 
+        fb[...,2] += np.sum(ft, axis=-1) # thrust  
             
-        if self.plus is True: 
-            # total torques   		
-            taub_x = (ft2 - ft4)*self.radius   # rolling moment 
-            taub_y = (ft3 - ft1)*self.radius   # pitching moment 
-        else: # we have cross
-            taub_x = (ft2 + ft3 - ft1 - ft4)*math.sqrt(2)/2*self.radius   # rolling moment 
-            taub_y = (ft3 + ft4 - ft2 - ft1)*math.sqrt(2)/2*self.radius   # pitching moment 
-        
-        taub_z = -taur1 - taur3 + taur2 + taur4 # yawing moment 
+        taub = np.empty(fb.shape)
+        taub[...,0:2] = ft@self.thrust2taubxy.T   # rolling and pitching moment 
+        taub[...,2] = taur@self.torque2taubz  # yawing moment 
 		
-        return (fb, np.array([taub_x,taub_y,taub_z]))
+        return (fb, taub)
 
 ####################################################
 # The simplified model, good for inversion 
@@ -289,6 +326,13 @@ class QuadFTau_CF_S:
         self.omegar2input_coeff = [  1/self.input2omegar_coeff[0], 
                       -self.input2omegar_coeff[1]/self.input2omegar_coeff[0] ]
         self.omegar2input_poly = np.poly1d(self.omegar2input_coeff)
+
+        self.omegar2_min = self.input2omegar_poly(1001)**2
+        """ Smallest squared rotor angular velocity out of the dead-band, at
+        command 1001 """
+
+        self.omegar2_max = self.input2omegar_poly(2**16-1)**2
+        """ Largest squared rotor angular velocity, at command 65535 """
         
     def omegar2ftau(self, omega_rotors):
         """ Given omega_rotors in R+^4, returns forces and torques """
@@ -320,19 +364,11 @@ class QuadFTau_CF_S:
     
     # the inverse of the above, vector form
     def omegar2input(self,omegar):
-        """ Given vector of rotor angular velocities in rad/s, returns command """ 
-        cmd = np.zeros(4)
-        try:
-             cmd[0] = int(self.omegar2input_poly(omegar[0]))
-             cmd[1] = int(self.omegar2input_poly(omegar[1]))
-             cmd[2] = int(self.omegar2input_poly(omegar[2]))
-             cmd[3] = int(self.omegar2input_poly(omegar[3]))
-             cmd[cmd < 0] = 0
-             cmd[cmd > 65535] = 65535
-        except:
-            print("ERROR: ",sys.exc_info()[0],".")
-            print("omegar = {},{},{},{}".format(omegar[0],omegar[1],omegar[2],omegar[3]))
-        return cmd
+        """ Given rotor angular velocities in rad/s, (4,) or (N,4), returns 
+        the commands, truncated to integers in 0..65535 ( 0 if not finite ) """ 
+        cmd = np.trunc(self.omegar2input_coeff[0]*np.asarray(omegar, dtype=float) 
+                       + self.omegar2input_coeff[1])
+        return np.clip(np.nan_to_num(cmd, nan=0.0, posinf=0.0, neginf=0.0), 0, 65535)
         
     # Final function (no aerodynamic component, drag is neglected)
     ##############################################################
@@ -354,9 +390,30 @@ class QuadFTau_CF_S:
         return fb, taub
     
     def fztau2cmd(self,fztau):
-        tmp = self.invGamma@fztau
-        tmp[tmp < 0] = 0 
-        omegar = np.sqrt(tmp)
-        cmd = self.omegar2input(omegar)
+        """ Commands for [fb_z, taub_x, taub_y, taub_z], (4,) or (N,4) for N 
+        vehicles; the negative squared rotor velocities are set to 0 """
+        omegar2 = np.asarray(fztau, dtype=float)@self.invGamma.T
+        return self.omegar2input(np.sqrt(np.maximum(omegar2, 0)))
+
+    def fztau2cmd_sat(self,fztau):
+        """ Commands for [fb_z, taub_x, taub_y, taub_z], (4,) or (N,4), with 
+        the attitude first when the rotors saturate: the torques are kept and
+        the thrust is moved to bring the squared rotor velocities within 
+        [omegar2_min, omegar2_max]; if the torques alone need more than that
+        range, they are scaled down to fit it. The rotors are kept out of 
+        the dead-band, at command 1001 or more """
+        fztau = np.asarray(fztau, dtype=float)
+        span = self.omegar2_max - self.omegar2_min
+        # Gamma@ones = [4 cT, 0, 0, 0], so the thrust is the common part of 
+        # the squared rotor velocities and the torques the zero mean part
+        omegar2_f = fztau[...,0:1]/(4*self.cT)
+        omegar2_tau = fztau[...,1:4]@self.invGamma[:,1:4].T
+        
+        spread = np.max(omegar2_tau, axis=-1, keepdims=True) - np.min(omegar2_tau, axis=-1, keepdims=True)
+        omegar2_tau = np.minimum(1.0, span/np.maximum(spread, 1e-300))*omegar2_tau
         
-        return cmd    
\ No newline at end of file
+        low = self.omegar2_min - np.min(omegar2_tau, axis=-1, keepdims=True)
+        high = self.omegar2_max - np.max(omegar2_tau, axis=-1, keepdims=True)
+        omegar2 = np.clip(np.clip(omegar2_f, low, high) + omegar2_tau, 
+                          self.omegar2_min, self.omegar2_max)
+        return np.maximum(self.omegar2input(np.sqrt(omegar2)), 1001)
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2021 Luminita-Cristiana Totu
+#
+# Part of the QuadrotorSim aka quadsim package
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this package, in a file called LICENSE.
+# If not, see <https://www.gnu.org/licenses/>.
+
+""" Scalar kernels for the small rotation helpers of utils and the 
+Cholesky downdate of spkf
+
+Same semantics as the numpy versions in utils and spkf, written element by
+element so that numba can compile them. If numba is installed the 
+functions are jit compiled and utils and spkf use them in place of their 
+own; if not, they stay plain Python and the numpy versions are kept.
+
+"""
+
+__version__ = "0.1"
+__author__ = "Luminita-Cristiana Totu"
+__copyright__ = "Copyright (C) 2019 Luminita-Cristiana Totu"
+__license__ = "GNU GPLv3"
+
+import math
+import numpy as np
+
+try:
+    import numba
+    compiled = True
+except ImportError:
+    numba = None
+    compiled = False
+""" True if the kernels are compiled with numba """
+
+def _jit(f):
+    if compiled:
+        return numba.njit(cache=True)(f)
+    return f
+
+@_jit
+def quat2rotm(q):
+    """ Takes a quaternion and returns the rotation matrix"""
+
+    q0 = q[0]; q1 = q[1]; q2 = q[2]; q3 = q[3]
+    R = np.empty((3,3))
+    R[0,0] = 2*(q0*q0+q1*q1-0.5)
+    R[0,1] = 2*(q1*q2-q0*q3)
+    R[0,2] = 2*(q1*q3+q0*q2)
+    R[1,0] = 2*(q1*q2+q0*q3)
+    R[1,1] = 2*(q0*q0+q2*q2-0.5)
+    R[1,2] = 2*(-q0*q1+q2*q3)
+    R[2,0] = 2*(q1*q3-q0*q2)
+    R[2,1] = 2*(q2*q3+q0*q1)
+    R[2,2] = 2*(q0*q0+q3*q3-0.5)
+    return R
+
+@_jit
+def skew(X):
+    """  Returns the skew-symmetric matrix form of the input vector """
+    S = np.zeros((3,3))
+    S[0,1] = -X[2]; S[0,2] = X[1]
+    S[1,0] = X[2];  S[1,2] = -X[0]
+    S[2,0] = -X[1]; S[2,1] = X[0]
+    return S
+
+@_jit
+def quaternion_multiply(quaternion1, quaternion0):
+    w0 = quaternion0[0]; x0 = quaternion0[1]; y0 = quaternion0[2]; z0 = quaternion0[3]
+    w1 = quaternion1[0]; x1 = quaternion1[1]; y1 = quaternion1[2]; z1 = quaternion1[3]
+    Q = np.empty(4)
+    Q[0] = -x1 * x0 - y1 * y0 - z1 * z0 + w1 * w0
+    Q[1] =  x1 * w0 + y1 * z0 - z1 * y0 + w1 * x0
+    Q[2] = -x1 * z0 + y1 * w0 + z1 * x0 + w1 * y0
+    Q[3] =  x1 * y0 - y1 * x0 + z1 * w0 + w1 * z0
+    return Q
+
+@_jit
+def rpy2q(rpy):
+    """ QR*QP*QY, expanded """
+    cr = math.cos(rpy[0]/2.0); sr = math.sin(rpy[0]/2.0)
+    cp = math.cos(rpy[1]/2.0); sp = math.sin(rpy[1]/2.0)
+    cy = math.cos(rpy[2]/2.0); sy = math.sin(rpy[2]/2.0)
+    Q = np.empty(4)
+    Q[0] = cr*cp*cy - sr*sp*sy
+    Q[1] = sr*cp*cy + cr*sp*sy
+    Q[2] = cr*sp*cy - sr*cp*sy
+    Q[3] = cr*cp*sy + sr*sp*cy
+    return Q
+
+@_jit
+def rpy2rotm(rpy):
+    """ R = Rz(y)*Ry(p)*Rx(r), same as Rotation.from_euler('xyz',rpy) """
+    cr = math.cos(rpy[0]); sr = math.sin(rpy[0])
+    cp = math.cos(rpy[1]); sp = math.sin(rpy[1])
+    cy = math.cos(rpy[2]); sy = math.sin(rpy[2])
+    R = np.empty((3,3))
+    R[0,0] = cy*cp
+    R[0,1] = cy*sp*sr - sy*cr
+    R[0,2] = cy*sp*cr + sy*sr
+    R[1,0] = sy*cp
+    R[1,1] = sy*sp*sr + cy*cr
+    R[1,2] = sy*sp*cr - cy*sr
+    R[2,0] = -sp
+    R[2,1] = cp*sr
+    R[2,2] = cp*cr
+    return R
+
+@_jit
+def rotm2rpy(R):
+    """ Inverse of rpy2rotm, same as Rotation.from_matrix(R).as_euler('xyz')
+    away from gimbal lock ( pitch = +-90 deg ), where yaw is set to 0 """
+    sp = -R[2,0]
+    if sp > 1.0:
+        sp = 1.0
+    elif sp < -1.0:
+        sp = -1.0
+    pitch = math.asin(sp)
+    rpy = np.empty(3)
+    if abs(abs(sp) - 1.0) < 1e-7:
+        # gimbal lock, only roll -+ yaw is defined
+        rpy[0] = math.atan2(sp*R[0,1], sp*R[0,2])
+        rpy[2] = 0.0
+    else:
+        rpy[0] = math.atan2(R[2,1], R[2,2])
+        rpy[2] = math.atan2(R[1,0], R[0,0])
+    rpy[1] = pitch
+    return rpy
+
+@_jit
+def chol_downdate(L, X):
+    """ In place rank k downdate of the lower triangular L by the k columns 
+    of X ( overwritten ), see spkf.cholupdate; False if the result would not
+    be positive definite """
+    n = L.shape[0]
+    for j in range(X.shape[1]):
+        for k in range(n):
+            xk = X[k,j]
+            if xk == 0.0:
+                continue
+            Lkk = L[k,k]
+            r2 = (Lkk - xk)*(Lkk + xk)
+            if not r2 > 0.0:
+                return False
+            r = math.sqrt(r2)
+            c = r/Lkk
+            s = xk/Lkk
+            L[k,k] = r
+            for i in range(k+1, n):
+                Lik = (L[i,k] - s*X[i,j])/c
+                L[i,k] = Lik
+                X[i,j] = c*X[i,j] - s*Lik
+    return True
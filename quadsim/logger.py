@@ -17,65 +17,301 @@
 # along with this package, in a file called LICENSE.
 # If not, see <https://www.gnu.org/licenses/>.
 
-""" This module implements the logging functionality """
+""" This module implements the logging functionality 
+
+The channels are kept in memory during the run, each in a Channel ( a 
+preallocated float64 buffer, or a ring of the last samples ), and written 
+at the end, either all together to one binary .npz file ( save, read back 
+with load ) or as text, one file per group ( the log2file_ methods ).
+
+In streaming mode the full chunks of the channels are instead appended to 
+disk during the run by a LogWriter thread, one raw float64 file per channel 
+in the folder <basename>__log, so memory stays flat and a killed run keeps 
+everything up to its last flushed chunk ( also read back with load ).
+
+LogReader opens a saved run, either kind, without loading it: the channels 
+are memory-mapped when first used. The Plotter takes one, a file name, or a 
+Logger.
+
+"""
 
 __version__ = "0.1"
 __author__ = "Luminita-Cristiana Totu"
-__copyright__ = "Copyright (C) 2004 Luminita-Cristiana Totu"
+__copyright__ = "Copyright (C) 2019 Luminita-Cristiana Totu"
 __license__ = "GNU GPLv3"
 
 import numpy as np
 import math 
 import os 
+import json
+import queue
+import threading
+import atexit
+import struct
+import zipfile
+
+class Channel:
+    """ The samples of one logged quantity, written in place into float64 
+    chunks of chunk samples, or, if maxlen is given, into a ring that keeps 
+    the last maxlen samples. Reads as an array ( np.asarray ) in time order, 
+    multiplied by scale ( e.g. rad to deg ), which is applied only then """
+
+    def __init__(self, scale = 1.0, maxlen = None, chunk = 4096):
+
+        self.scale = scale
+        self.maxlen = maxlen
+        self.chunk = maxlen if maxlen is not None else chunk
+        self.n = 0
+        """ Number of samples appended, including the ones overwritten """
+
+        self.sink = None
+        """ If set ( not with maxlen ), sink(A) receives the samples A 
+        (k,...) in order, each full chunk is handed over and dropped """
+
+        self.flushed = 0
+        """ Number of samples handed to sink """
+
+        self._chunks = []
+        self._start = 0
+
+    def append(self, value):
+        k = self.n % self.chunk
+        if (k == 0 and (self.maxlen is None or self.n == 0)):
+            self._chunks.append(np.empty((self.chunk,) + np.shape(value)))
+        self._chunks[-1][k] = value
+        self.n += 1
+        if (self.sink is not None and k == self.chunk - 1):
+            self.flush()
+
+    def flush(self):
+        """ Hands the samples not handed yet to sink """
+        if (self.n == self.flushed):
+            return
+        start = self._start + (len(self._chunks) - 1)*self.chunk
+        A = self._chunks[-1][self.flushed - start:self.n - start]
+        if (self.n - start == self.chunk):
+            # full, the chunk goes with A
+            self._chunks = []
+            self._start = self.n
+        else:
+            A = A.copy()
+        self.sink(A)
+        self.flushed = self.n
+
+    def __len__(self):
+        if (self.maxlen is None):
+            return self.n - self._start 
+        return min(self.n, self.maxlen)
+
+    @property
+    def data(self):
+        """ The kept samples in time order, without scale; in streaming mode
+        only the ones still in memory """
+        if (self.n == self._start):
+            return np.empty(0)
+        if (self.maxlen is None):
+            return np.concatenate(self._chunks)[:self.n - self._start]
+        ring = self._chunks[0]
+        if (self.n <= self.maxlen):
+            return ring[:self.n].copy()
+        k = self.n % self.maxlen
+        return np.concatenate([ring[k:], ring[:k]])
+
+    def __array__(self, dtype = None, copy = None):
+        A = self.data
+        if (self.scale != 1.0):
+            A *= self.scale
+        return A if dtype is None else A.astype(dtype)
+
+    def __getitem__(self, index):
+        return np.asarray(self)[index]
+
+class LogWriter:
+    """ Appends arrays to one raw float64 file per channel in folder, from a 
+    background thread. channels.json holds the shape of a sample and the 
+    scale of each channel, a file is readable as soon as it has a sample """
+
+    def __init__(self, folder):
+
+        self.folder = folder
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+        elif os.path.exists(os.path.join(folder, "channels.json")):
+            os.remove(os.path.join(folder, "channels.json"))  # a previous run
+        self.meta = {}
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target = self._run, daemon = True)
+        self.thread.start()
+
+    def write(self, name, scale, A):
+        self.queue.put((name, scale, A))
+
+    def _run(self):
+        files = {}
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            name, scale, A = item
+            if name not in files:
+                files[name] = open(os.path.join(self.folder, name + ".f64"), "wb")
+                self.meta[name] = { "shape": list(A.shape[1:]), "scale": scale }
+                tmpname = os.path.join(self.folder, "channels.json.tmp")
+                with open(tmpname, "w") as f:
+                    json.dump(self.meta, f)
+                os.replace(tmpname, os.path.join(self.folder, "channels.json"))
+            files[name].write(np.ascontiguousarray(A, dtype=float).tobytes())
+            files[name].flush()
+        for f in files.values():
+            f.close()
+
+    def close(self):
+        """ Waits for the queued arrays to be written """
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
 
 class Logger:
     """ This class implements logging functionality """
+
+    channels = ("rb_time", "rb_pos", "rb_ve", "rb_euler", "rb_vb", "rb_omegab", 
+                "rb_alphab", "cmd_time", "cmd_rotors", "ftau_time", "ftau_fe", 
+                "ftau_fb", "ftau_taue", "ftau_taub", "attstab_time", 
+                "attstab_angle_ref", "attstab_omega_ref", "attstab_tau_ref", 
+                "posctrl_time", "posctrl_pos_ref", "mems_time", "acc_bias", 
+                "gyro_bias", "filter_time", "filter_pos", "filter_euler", 
+                "filter_vb", "filter_ve", "filter_vel", "filter_omegab", 
+                "filter_ab", "filter_ae", "filter_ba", "filter_bg")
+    """ Names of the logged channels, also the keys in the .npz file """
   
-    def __init__(self, location, basename):
+    def __init__(self, location, basename, window = None, dt_log = None, 
+                 stream = False, chunk = 4096):
+        """ With window ( seconds ) and dt_log ( logging step ) given, only 
+        the last window seconds are kept, otherwise the whole run. With 
+        stream, every chunk samples of a channel are written to disk """
         
         self.location = location
         self.basename = basename
+
+        options = { "chunk": chunk }
+        if window is not None:
+            if stream:
+                raise ValueError("Logger: stream and window are exclusive")
+            options["maxlen"] = int(math.ceil(window/dt_log))
+        deg = 180/math.pi
      
-        self.rb_time = []
-        self.rb_pos = []
-        self.rb_ve = []
-        self.rb_euler = []
-        self.rb_vb = []
-        self.rb_omegab = []
-        self.rb_alphab = []
-
-        self.cmd_time = []
-        self.cmd_rotors = []
+        self.rb_time = Channel(**options)
+        self.rb_pos = Channel(**options)
+        self.rb_ve = Channel(**options)
+        self.rb_euler = Channel(deg, **options)
+        self.rb_vb = Channel(**options)
+        self.rb_omegab = Channel(deg, **options)
+        self.rb_alphab = Channel(deg, **options)
+
+        self.cmd_time = Channel(**options)
+        self.cmd_rotors = Channel(**options)
         
-        self.ftau_time = []
-        self.ftau_fe = []
-        self.ftau_fb = []
-        self.ftau_taue = []
-        self.ftau_taub = []
+        self.ftau_time = Channel(**options)
+        self.ftau_fe = Channel(**options)
+        self.ftau_fb = Channel(**options)
+        self.ftau_taue = Channel(**options)
+        self.ftau_taub = Channel(**options)
         
-        self.attstab_time = []
-        self.attstab_angle_ref = []
-        self.attstab_omega_ref = []
-        self.attstab_tau_ref = []
+        self.attstab_time = Channel(**options)
+        self.attstab_angle_ref = Channel(deg, **options)
+        self.attstab_omega_ref = Channel(deg, **options)
+        self.attstab_tau_ref = Channel(**options)
         
-        self.posctrl_time = []
-        self.posctrl_pos_ref = []
+        self.posctrl_time = Channel(**options)
+        self.posctrl_pos_ref = Channel(**options)
         
-        self.mems_time = []
-        self.acc_bias = []
-        self.gyro_bias = []
+        self.mems_time = Channel(**options)
+        self.acc_bias = Channel(**options)
+        self.gyro_bias = Channel(**options)
         
-        self.filter_time = []
-        self.filter_pos = []
-        self.filter_euler = []
-        self.filter_vb = []
-        self.filter_ve = []
-        self.filter_vel = []
-        self.filter_omegab = []
-        self.filter_ab = []
-        self.filter_ae = []
-        self.filter_ba = []
-        self.filter_bg = []
+        self.filter_time = Channel(**options)
+        self.filter_pos = Channel(**options)
+        self.filter_euler = Channel(deg, **options)
+        self.filter_vb = Channel(**options)
+        self.filter_ve = Channel(**options)
+        self.filter_vel = Channel(**options)
+        self.filter_omegab = Channel(**options)
+        self.filter_ab = Channel(**options)
+        self.filter_ae = Channel(**options)
+        self.filter_ba = Channel(**options)
+        self.filter_bg = Channel(**options)
+
+        self.writer = None
+        if stream:
+            self.writer = LogWriter(location + "/" + basename + "__log")
+            for name in self.channels:
+                channel = getattr(self, name)
+                channel.sink = lambda A, name=name, scale=channel.scale: \
+                                   self.writer.write(name, scale, A)
+            # writes what is left at exit if the logger is not closed
+            atexit.register(self.close)
+
+    def flush(self):
+        """ Streaming mode, hands the samples still in memory to the writer """
+        for name in self.channels:
+            getattr(self, name).flush()
+
+    def close(self):
+        """ Streaming mode, writes what is left and stops the writer """
+        if self.writer is not None:
+            self.flush()
+            self.writer.close()
+            # closed, nothing left for the exit handler; lets the logger go
+            atexit.unregister(self.close)
+
+    # binary columnar file 
+    ###################################################
+
+    def save(self):
+        """ Writes all the channels, as float64 arrays, to one .npz file """
+
+        location = self.location 
+        if not os.path.exists(location):
+            os.makedirs(location)
+        fullname = location + "/" +  self.basename + "__log.npz"
+        np.savez(fullname, **{ name: np.asarray(getattr(self, name), dtype=float) 
+                               for name in self.channels })
+        return fullname
+
+    @staticmethod
+    def load(fullname):
+        """ Logger with the channels of a file written by save, or of the 
+        folder written in streaming mode, as arrays """
+
+        location, filename = os.path.split(os.path.normpath(fullname))
+        log = Logger(location, filename.replace("__log.npz", "").replace("__log", ""))
+        if os.path.isdir(fullname):
+            with open(os.path.join(fullname, "channels.json")) as f:
+                meta = json.load(f)
+            for name in meta:
+                A = np.fromfile(os.path.join(fullname, name + ".f64"))
+                shape = tuple(meta[name]["shape"])
+                size = int(np.prod(shape))
+                n = A.shape[0]//size  # whole samples only, in case of a kill
+                A = A[:n*size].reshape((n,) + shape)
+                setattr(log, name, A*meta[name]["scale"])
+            return log
+        with np.load(fullname) as data:
+            for name in data.files:
+                setattr(log, name, data[name])
+        return log
+
+    def _write_txt(self, suffix, header, columns):
+        # one row per sample, the columns side by side, "% .8f" as the 
+        # former np.array2string( precision = 8, sign=" ", floatmode ="fixed" )
+        location = self.location 
+        if not os.path.exists(location):
+            os.makedirs(location)
+        fullname = location + "/" +  self.basename + suffix
+        n = len(columns[0])
+        data = np.hstack([ np.asarray(c, dtype=float).reshape(n, -1) if n else np.empty((0,1)) 
+                           for c in columns ])
+        np.savetxt(fullname, data, fmt = "% .8f", header = header, comments = "")
 
     # rigid body elements 
     ###################################################
@@ -85,39 +321,17 @@ class Logger:
         self.rb_time.append(t)
         self.rb_pos.append(rb.pos)
         self.rb_vb.append(rb.vb)  
-        self.rb_euler.append(180/math.pi*rb.rpy)
+        self.rb_euler.append(rb.rpy)
         self.rb_ve.append(rb.ve)
-        self.rb_omegab.append(180/math.pi*rb.omegab)
-        self.rb_alphab.append(180/math.pi*rb.d_omegab)
+        self.rb_omegab.append(rb.omegab)
+        self.rb_alphab.append(rb.d_omegab)
      
     def log2file_rigidbody(self):
         
-        location = self.location 
-        if not os.path.exists(location):
-            os.makedirs(location)
-        fullname = location + "/" +  self.basename + "__rigidbody.txt"
-        with open(fullname,"w") as f:
-            f.write("time position ve vb euler_xyz omegab alphab \n")
-            for i in range(len(self.rb_time)):
-                c1 = np.array2string(np.array([self.rb_time[i]]), precision = 8, 
-                        suppress_small=False, sign=" ",floatmode ="fixed")
-                c2 = np.array2string(self.rb_pos[i], precision = 8, 
-                        suppress_small=False, sign=" ",floatmode ="fixed")
-                c3 = np.array2string(self.rb_euler[i],precision = 8, 
-                        suppress_small=False, sign=" ",floatmode ="fixed")
-                c4 = np.array2string(self.rb_vb[i],precision = 8, 
-                        suppress_small=False, sign=" ",floatmode ="fixed")
-                c5 = np.array2string(self.rb_omegab[i],precision = 8, 
-                        suppress_small=False, sign=" ",floatmode ="fixed")
-                c6 = np.array2string(self.rb_ve[i],precision = 8, 
-                        suppress_small=False, sign=" ",floatmode ="fixed")
-                c7 = np.array2string(self.rb_alphab[i],precision = 8, 
-                        suppress_small=False, sign=" ",floatmode ="fixed")   
-                
-                fullline = c1+"  "+c2+"  "+c6+"  "+c4+"  "+c3+"  "+c5+"  "+c7+"\n"
-                fullline = str(fullline).replace('[','').replace(']','')
-                f.write(fullline)
-    
+        self._write_txt("__rigidbody.txt", "time position ve vb euler_xyz omegab alphab ", 
+                        [ self.rb_time, self.rb_pos, self.rb_ve, self.rb_vb, 
+                          self.rb_euler, self.rb_omegab, self.rb_alphab ])
+
     # Command elements 
     ###################################################
     
@@ -128,21 +342,9 @@ class Logger:
    
     def log2file_cmd(self):
         
-        location = self.location 
-        if not os.path.exists(location):
-            os.makedirs(location)
-        fullname = location + "/" +  self.basename + "__cmd.txt"
-        with open(fullname,"w") as f:
-            f.write("time cmd_rotors \n")
-            for i in range(len(self.cmd_time)):
-                c1 = np.array2string(np.array([self.cmd_time[i]]), precision = 8, 
-                        suppress_small=False, sign=" ",floatmode ="fixed")
-                c2 = np.array2string(self.cmd_rotors[i], precision = 8, 
-                        suppress_small=False, sign=" ",floatmode ="fixed")
-                fullline = c1+"  "+c2+"\n"
-                fullline = str(fullline).replace('[','').replace(']','')
-                f.write(fullline)
-                
+        self._write_txt("__cmd.txt", "time cmd_rotors ", 
+                        [ self.cmd_time, self.cmd_rotors ])
+
     # forces and torques 
     ####################################################
 
@@ -156,82 +358,35 @@ class Logger:
              
     def log2file_ftau(self):
         
-        location = self.location 
-        if not os.path.exists(location):
-            os.makedirs(location)
-        fullname = location + "/" +  self.basename + "__ftau.txt"
-        with open(fullname,"w") as f:
-            f.write("time fe taue fb taub \n")
-            for i in range(len(self.ftau_time)):
-                c1 = np.array2string(np.array([self.ftau_time[i]]), precision = 8, 
-                        suppress_small=False, sign=" ",floatmode ="fixed")
-                c2 = np.array2string(self.ftau_fe[i], precision = 8, 
-                        suppress_small=False, sign=" ",floatmode ="fixed")
-                c3 = np.array2string(self.ftau_taue[i], precision = 8, 
-                        suppress_small=False, sign=" ",floatmode ="fixed")
-                c4 = np.array2string(self.ftau_fb[i], precision = 8, 
-                        suppress_small=False, sign=" ",floatmode ="fixed")
-                c5 = np.array2string(self.ftau_taub[i], precision = 8, 
-                        suppress_small=False, sign=" ",floatmode ="fixed")
-                
-                fullline = c1+"  "+c2+"  "+c3+"  "+c4+"  "+c5+"\n"
-                fullline = str(fullline).replace('[','').replace(']','')
-                f.write(fullline)
-    
+        self._write_txt("__ftau.txt", "time fe taue fb taub ", 
+                        [ self.ftau_time, self.ftau_fe, self.ftau_taue, 
+                          self.ftau_fb, self.ftau_taub ])
+
     # controller 
     ########################################
 
     def log_attstab(self,t,angle_ref,omega_ref,tau_ref):
        
         self.attstab_time.append(t)
-        self.attstab_angle_ref.append(180/math.pi*angle_ref)
-        self.attstab_omega_ref.append(180/math.pi*omega_ref)
+        self.attstab_angle_ref.append(angle_ref)
+        self.attstab_omega_ref.append(omega_ref)
         self.attstab_tau_ref.append(tau_ref)
               
     def log2file_attstab(self):
         
-        location = self.location 
-        if not os.path.exists(location):
-            os.makedirs(location)
-            
-        fullname = location + "/" +  self.basename + "__attstab.txt"
-        with open(fullname,"w") as f:
-            f.write("time angle_ref  omega_ref alpha_ref tau_ref \n")
-            for i in range(len(self.attstab_time)):
-                c1 = np.array2string(np.array([self.attstab_time[i]]), precision = 8, 
-                        suppress_small=False, sign=" ",floatmode ="fixed")
-                c2 = np.array2string(self.attstab_angle_ref[i], precision = 8, 
-                        suppress_small=False, sign=" ",floatmode ="fixed")
-                c3 = np.array2string(self.attstab_omega_ref[i], precision = 8, 
-                        suppress_small=False, sign=" ",floatmode ="fixed")
-                c4 = np.array2string(self.attstab_tau_ref[i], precision = 8, 
-                        suppress_small=False, sign=" ",floatmode ="fixed")
-                fullline = c1+"  "+c2+"  "+c3+"  "+c4+"\n"
-                fullline = str(fullline).replace('[','').replace(']','')
-                f.write(fullline)
-                
+        self._write_txt("__attstab.txt", "time angle_ref  omega_ref alpha_ref tau_ref ", 
+                        [ self.attstab_time, self.attstab_angle_ref, 
+                          self.attstab_omega_ref, self.attstab_tau_ref ])
+
     def log_posctrl(self,t,pos_ref):
         self.posctrl_time.append(t)
         self.posctrl_pos_ref.append(pos_ref)
         
     def log2file_posctrl(self):
         
-        location = self.location 
-        if not os.path.exists(location):
-            os.makedirs(location)
-            
-        fullname = location + "/" +  self.basename + "__posctrl.txt"
-        with open(fullname,"w") as f:
-            f.write("time pos_ref \n")
-            for i in range(len(self.posctrl_time)):
-                c1 = np.array2string(np.array([self.posctrl_time[i]]), precision = 8, 
-                        suppress_small=False, sign=" ",floatmode ="fixed")
-                c2 = np.array2string(self.posctrl_pos_ref[i], precision = 8, 
-                        suppress_small=False, sign=" ",floatmode ="fixed")
-                fullline = c1+"  "+c2+"\n"
-                fullline = str(fullline).replace('[','').replace(']','')
-                f.write(fullline)
-        
+        self._write_txt("__posctrl.txt", "time pos_ref ", 
+                        [ self.posctrl_time, self.posctrl_pos_ref ])
+
     # filter 
     ########################################
 
@@ -239,7 +394,7 @@ class Logger:
         
         self.filter_time.append(t)
         self.filter_pos.append(state[0:3])
-        self.filter_euler.append(180/math.pi*state[3:6])
+        self.filter_euler.append(state[3:6])
         self.filter_vel.append(state[6:9]) # either ve or vb
         if len(state)<21: 
                 self.filter_bg.append([0,0,0])
@@ -251,33 +406,15 @@ class Logger:
 
     def log2file_filter(self):
         
-        location = self.location 
-        if not os.path.exists(location):
-            os.makedirs(location)
-            
-        fullname = location + "/" +  self.basename + "__posctrl.txt"
-        with open(fullname,"w") as f:
-            f.write("time pos_ref \n")
-            for i in range(len(self.filter_time)):
-                c1 = np.array2string(np.array([self.filter_time[i]]), precision = 8, 
-                        suppress_small=False, sign=" ",floatmode ="fixed")
-                c2 = np.array2string(self.filter_pos[i], precision = 8, 
-                        suppress_small=False, sign=" ",floatmode ="fixed")
-                c3 = np.array2string(self.filter_euler[i], precision = 8, 
-                        suppress_small=False, sign=" ",floatmode ="fixed")
-                c4 = np.array2string(self.filter_pos[i], precision = 8, 
-                        suppress_small=False, sign=" ",floatmode ="fixed")
-                c5 = np.array2string(self.filter_vel[i], precision = 8, 
-                        suppress_small=False, sign=" ",floatmode ="fixed")
-                fullline = c1+"  "+c2+"  "+c3+"  "+c4+"  "+c5+"\n"
-                fullline = str(fullline).replace('[','').replace(']','')
-                f.write(fullline)
+        self._write_txt("__posctrl.txt", "time pos_ref ", 
+                        [ self.filter_time, self.filter_pos, self.filter_euler, 
+                          self.filter_pos, self.filter_vel ])
 
     def log_filter_ros(self, t, state):
         
         self.filter_time.append(t)
         self.filter_pos.append(state[0:3])
-        self.filter_euler.append(180/math.pi*state[3:6])
+        self.filter_euler.append(state[3:6])
         self.filter_vb.append(state[6:9])
         self.filter_omegab.append(state[9:12])
         self.filter_ae.append(state[12:15])
@@ -286,36 +423,99 @@ class Logger:
 
     def log2file_filter_ros(self):
         
-        location = self.location 
-        if not os.path.exists(location):
-            os.makedirs(location)
-            
-        fullname = location + "/" +  self.basename + "__posctrl.txt"
-        with open(fullname,"w") as f:
-            f.write("time pos_ref \n")
-            for i in range(len(self.filter_time)):
-                c1 = np.array2string(np.array([self.filter_time[i]]), precision = 8, 
-                        suppress_small=False, sign=" ",floatmode ="fixed")
-                c2 = np.array2string(self.filter_pos[i], precision = 8, 
-                        suppress_small=False, sign=" ",floatmode ="fixed")
-                c3 = np.array2string(self.filter_euler[i], precision = 8, 
-                        suppress_small=False, sign=" ",floatmode ="fixed")
-                c4 = np.array2string(self.filter_pos[i], precision = 8, 
-                        suppress_small=False, sign=" ",floatmode ="fixed")
-                c5 = np.array2string(self.filter_vb[i], precision = 8, 
-                        suppress_small=False, sign=" ",floatmode ="fixed")
-                c6 = np.array2string(self.filter_omegab[i], precision = 8, 
-                       suppress_small=False, sign=" ",floatmode ="fixed")
-                c7 = np.array2string(self.filter_ae[i], precision = 8,
-                        suppress_small=False, sign=" ",floatmode ="fixed")
-                fullline = c1+"  "+c2+"  "+c3+"  "+c4+"  "+c5+"  "+c6+"  "+c7+"\n"
-                fullline = str(fullline).replace('[','').replace(']','')
-                f.write(fullline)
+        self._write_txt("__posctrl.txt", "time pos_ref ", 
+                        [ self.filter_time, self.filter_pos, self.filter_euler, 
+                          self.filter_pos, self.filter_vb, self.filter_omegab, 
+                          self.filter_ae ])
 
     # mems
-    def log_mems(self, t, gyro_x, gyro_y, gyro_z, acc_x, acc_y, acc_z):
+    def log_mems(self, t, gyro, acc):
+        # gyro and acc are 3 axis mems.MemsBank
         self.mems_time.append(t)
-        self.gyro_bias.append([gyro_x.bias, gyro_y.bias, gyro_z.bias])
-        self.acc_bias.append([acc_x.bias, acc_y.bias, acc_z.bias])
+        self.gyro_bias.append(gyro.bias)
+        self.acc_bias.append(acc.bias)
+
+        
+class LogReader:
+    """ Read-only access to the channels of a run, from a .npz file written 
+    by Logger.save, a folder written in streaming mode, or a Logger. The 
+    channels are attributes, as for Logger, opened on first access and kept; 
+    from files they are memory-mapped, zero-copy unless a scale applies """
+
+    def __init__(self, source):
+
+        self._cache = {}
+        self._logger = None
+        self._meta = None
+        self._members = None
+        if isinstance(source, Logger):
+            self._logger = source
+            self.location = source.location
+            self.basename = source.basename
+            return
+        self.fullname = source
+        self.location, filename = os.path.split(os.path.normpath(source))
+        self.basename = filename.replace("__log.npz", "").replace("__log", "")
+        if os.path.isdir(source):
+            with open(os.path.join(source, "channels.json")) as f:
+                self._meta = json.load(f)
+        else:
+            with zipfile.ZipFile(source) as z:
+                self._members = { info.filename[:-4]: info for info in z.infolist() }
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        if name not in self._cache:
+            self._cache[name] = self._open(name)
+        return self._cache[name]
+
+    def _open(self, name):
+        if self._logger is not None:
+            return np.asarray(getattr(self._logger, name))
+        if self._meta is not None:
+            return self._open_f64(name)
+        if name not in self._members:
+            raise AttributeError(name)
+        return self._open_npy(self._members[name])
+
+    def _open_f64(self, name):
+        # streaming folder, whole samples only, in case of a kill
+        if name not in self._meta:
+            if name in Logger.channels:
+                return np.empty(0)  # nothing logged
+            raise AttributeError(name)
+        fullname = os.path.join(self.fullname, name + ".f64")
+        shape = tuple(self._meta[name]["shape"])
+        n = os.path.getsize(fullname)//(8*int(np.prod(shape)))
+        if (n == 0):
+            return np.empty((0,) + shape)
+        A = np.memmap(fullname, dtype = float, mode = "r", shape = (n,) + shape)
+        scale = self._meta[name]["scale"]
+        return A if scale == 1.0 else A*scale
+
+    def _open_npy(self, info):
+        # np.savez stores the members uncompressed, the array data of each 
+        # is a contiguous block of the .npz file that can be mapped directly
+        if info.compress_type != zipfile.ZIP_STORED:
+            with np.load(self.fullname) as data:
+                return data[info.filename[:-4]]
+        with open(self.fullname, "rb") as f:
+            f.seek(info.header_offset)
+            n_name, n_extra = struct.unpack("<HH", f.read(30)[26:30])
+            f.seek(info.header_offset + 30 + n_name + n_extra)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            offset = f.tell()
+        if (int(np.prod(shape)) == 0):
+            return np.empty(shape, dtype = dtype)
+        return np.memmap(self.fullname, dtype = dtype, mode = "r", offset = offset, 
+                         shape = shape, order = "F" if fortran_order else "C")
 
-        
\ No newline at end of file
+def open_log(source):
+    """ LogReader of source ( file name, folder or Logger ), or source if it 
+    is a LogReader already """
+    return source if isinstance(source, LogReader) else LogReader(source)
@@ -41,8 +41,10 @@ import envir
 import controllers
 import utils
 import mems
+import noise
 import spkf
 import refs
+import scheduler
 
 # Main Simulation Parameters
 ############################
@@ -58,6 +60,7 @@ dt_vis = 1/30 # visualization frame step
 plus = True # Quadrotor configuration, plus or cross 
 dt_kf_predict = 1.0/100.0 # KF predict rate 
 kf_conv_delay = 0
+write_text_logs = False # also write the .txt logs ( log2file_* ) next to the .npz of logger.save
 
 # Initialization values for the quadrotor
 ##########################################################
@@ -71,19 +74,21 @@ qftau_s = ftaucf.QuadFTau_CF_S(qftau.cT, qftau.cQ, qftau.radius,
                                  qftau.input2omegar_coeff, plus) # Simplified model for the forces and torques (used in control)
 qrb = rigidbody.rigidbody(pos, q, ve, omegab, ab, qftau.mass, qftau.I) # Rigid body motion object
 
+# Initialize noise streams, one named substream per sensor
+##########################################################
+noise_streams = noise.NoiseStreams(seed=0)
+gps_noise = noise_streams.stream("gps", 3)
+vb_noise = noise_streams.stream("vb", 3)
+
 # Initialize MEMS sensors 
 ##########################################################
 gyro_rrw = 0.000023/180.0*math.pi
 gyro_rw = 0.0035/180.0*math.pi
-gyro_x = mems.mems(gyro_rw,gyro_rrw,0)
-gyro_y = mems.mems(gyro_rw,gyro_rrw,0)
-gyro_z = mems.mems(gyro_rw,gyro_rrw,0)
+gyro = mems.MemsBank(gyro_rw,gyro_rrw,np.zeros(3),seed=noise_streams.seed_sequence("gyro"),block=4096)
 
 acc_rrw = 0.0032*(10**-3)*9.80665
 acc_rw = 0.140*(10**-3)*9.80665
-acc_x = mems.mems(acc_rw,acc_rrw,0)
-acc_y = mems.mems(acc_rw,acc_rrw,0)
-acc_z = mems.mems(acc_rw,acc_rrw,0)
+acc = mems.MemsBank(acc_rw,acc_rrw,np.zeros(3),seed=noise_streams.seed_sequence("acc"),block=4096)
 
 # averaging buffers for down-sampling
 meas_gx_av = 0
@@ -108,7 +113,7 @@ ref = np.array([0.0,0.0,3.0,0.0]) #  x,y,z,yaw
 
 # Initialize GPS sensors 
 ##########################################################
-meas_pos = qrb.pos + np.random.normal(0, 0.01, 3) # GPS meas
+meas_pos = qrb.pos + 0.01*gps_noise.next() # GPS meas
 
 # Initialize UKF (using Euler Angles)
 ##########################################################
@@ -138,6 +143,10 @@ arg_parser.add_argument("ref_mode", help=""" Choose between an angle reference
                         template. Values are: step, ramp, sin, manual  """ )
 args = arg_parser.parse_args()
 pos_x_ref, pos_y_ref, pos_z_ref, yaw_ref, name2 = refs.buildCtrlReference(args.ref_mode)
+if pos_x_ref is not None:
+    # compiled once, for the lookups of the main loop
+    pos_x_ref, pos_y_ref, pos_z_ref, yaw_ref = ( utils.Signal(ref) for ref in 
+                                                 (pos_x_ref, pos_y_ref, pos_z_ref, yaw_ref) )
 
 # Initialize the visualization
 #########################################################
@@ -155,6 +164,19 @@ fullname = "logs/" + name
 logger = logger.Logger(fullname, name)
 plotter = plotter.Plotter()
 
+# Initialize the scheduler, all the rates in whole steps of dt_sim
+#########################################################
+scheduler = scheduler.Scheduler(dt_sim)
+scheduler.add("gps", dt_gps)
+scheduler.add("wheels", dt_wheels)
+scheduler.add("pos_p", pos_controller.dt_ctrl_pos_p)
+scheduler.add("pos_v", pos_controller.dt_ctrl_pos_v)
+scheduler.add("angle", att_controller.dt_ctrl_angle)
+scheduler.add("rate", att_controller.dt_ctrl_rate)
+scheduler.add("predict", dt_kf_predict)
+scheduler.add("vis", dt_vis)
+scheduler.add("log", dt_log)
+
 # Initialize others
 #########################################################
 t = 0
@@ -165,13 +187,9 @@ t_last_predict = 0
 while readkeys.exitpressed is False :
 
     #------------------------------------begin sensors -----------------------------------------------
-    meas_gx = gyro_x.run_mems(dt_sim,qrb.omegab[0])  # gyro running at simulation freq
-    meas_gy = gyro_y.run_mems(dt_sim,qrb.omegab[1])
-    meas_gz = gyro_z.run_mems(dt_sim,qrb.omegab[2])
+    meas_gx, meas_gy, meas_gz = gyro.run_mems(dt_sim,qrb.omegab)  # gyro running at simulation freq
 
-    meas_ax = acc_x.run_mems(dt_sim,qrb.abmg[0])  # acc running at simulation freq
-    meas_ay = acc_y.run_mems(dt_sim,qrb.abmg[1])
-    meas_az = acc_z.run_mems(dt_sim,qrb.abmg[2])
+    meas_ax, meas_ay, meas_az = acc.run_mems(dt_sim,qrb.abmg)  # acc running at simulation freq
     
     #-------------------------------------avearge gyroscope meas for kf predict-----------------------
     meas_gx_av += meas_gx 
@@ -184,7 +202,7 @@ while readkeys.exitpressed is False :
 
 
     #---------------------------------------measure GPS------------------------------------------------
-    if abs(t/dt_gps - round(t/dt_gps)) < 0.000001 :
+    if scheduler.due("gps") :
             if (t-t_last_predict >0):
                 filter.predict(np.array([meas_gx_av,meas_gy_av,meas_gz_av,
                     meas_ax_av,meas_ay_av,meas_az_av])/((t-t_last_predict)/dt_sim),
@@ -194,12 +212,12 @@ while readkeys.exitpressed is False :
                 meas_gx_av = 0; meas_gy_av = 0; meas_gz_av = 0
                 meas_ax_av = 0; meas_ay_av = 0; meas_az_av = 0
 
-            meas_pos = qrb.pos + np.random.normal(0, 2*np.sqrt(R_pos[0,0]), 3) # GNSS sensor, simple noise
+            meas_pos = qrb.pos + 2*np.sqrt(R_pos[0,0])*gps_noise.next() # GNSS sensor, simple noise
             filter.update(meas_pos, hx_pos, 0, R_pos, 1) # Joseph Form covariance update 
             filter.x[3:6] = utils.wrap_euler(filter.x[3:6]) # if the innovation has angles, I should wrap those too, but it doesn't 
 
     #---------------------------------------measure odometry ------------------------------------------------    
-    if abs(t/dt_wheels - round(t/dt_wheels)) < 0.000001 :
+    if scheduler.due("wheels") :
         if (t-t_last_predict >0):
             filter.predict(np.array([meas_gx_av,meas_gy_av,meas_gz_av,
                 meas_ax_av,meas_ay_av,meas_az_av])/((t-t_last_predict)/dt_sim),
@@ -209,12 +227,12 @@ while readkeys.exitpressed is False :
             meas_gx_av = 0; meas_gy_av = 0; meas_gz_av = 0
             meas_ax_av = 0; meas_ay_av = 0; meas_az_av = 0
 
-        meas_vb = ( utils.rpy2rotm(qrb.rpy).transpose()@qrb.ve) + np.random.normal(0, 2*np.sqrt(R_vb[0,0]), 3) # Velocity sensor (?), simple noise
+        meas_vb = ( utils.rpy2rotm(qrb.rpy).transpose()@qrb.ve) + 2*np.sqrt(R_vb[0,0])*vb_noise.next() # Velocity sensor (?), simple noise
         filter.update(meas_vb, hx_vb, 0, R_vb, 1) # Joseph form covariance update 
         filter.x[3:6] = utils.wrap_euler(filter.x[3:6]) # if the innovation has angles, I should wrap those too, but it doesn't 
     
     #------------------------------------begin controller --------------------------------------------
-    if abs(t/pos_controller.dt_ctrl_pos_p - round(t/pos_controller.dt_ctrl_pos_p)) < 0.000001 :
+    if scheduler.due("pos_p") :
         
         # reference
         if ( args.ref_mode == "manual" ):
@@ -232,7 +250,7 @@ while readkeys.exitpressed is False :
             est_pos = filter.x[0:3]
         ve_ref = pos_controller.run_pos(pos_ref, est_pos)
         
-    if abs(t/pos_controller.dt_ctrl_pos_v - round(t/pos_controller.dt_ctrl_pos_v)) < 0.000001 :
+    if scheduler.due("pos_v") :
         
         if t < kf_conv_delay:
             est_yaw = qrb.rpy[2]
@@ -247,7 +265,7 @@ while readkeys.exitpressed is False :
         rpy_ref[0] = rp_ref[0]
         rpy_ref[1] = rp_ref[1]
         
-    if abs(t/att_controller.dt_ctrl_angle - round(t/att_controller.dt_ctrl_angle)) < 0.000001 :
+    if scheduler.due("angle") :
          
         # use filter estimates
         if t < kf_conv_delay:
@@ -263,7 +281,7 @@ while readkeys.exitpressed is False :
         # controller call 
         omegab_ref = att_controller.run_angle(rpy_ref, est_rpy)
         
-    if abs(t/att_controller.dt_ctrl_rate - round(t/att_controller.dt_ctrl_rate)) < 0.000001 :
+    if scheduler.due("rate") :
         
         # Controller call 
         tau_ref = att_controller.run_rate(omegab_ref, np.array([meas_gx,meas_gy,meas_gz]) ,qrb.I)
@@ -274,7 +292,7 @@ while readkeys.exitpressed is False :
     #------------------------------------------ end controller --------------------------------------
 
     #------------------------------------------ predict ----------------------------------------
-    if abs(t/dt_kf_predict - round(t/dt_kf_predict)) < 0.000001 and (t-t_last_predict>=1.0/100 ) :
+    if scheduler.due("predict") and (t-t_last_predict>=1.0/100 ) :
             filter.predict(np.array([meas_gx_av,meas_gy_av,meas_gz_av,
                 meas_ax_av,meas_ay_av,meas_az_av])/((t-t_last_predict)/dt_sim),
                 t-t_last_predict, 1) # Euler integration
@@ -293,16 +311,17 @@ while readkeys.exitpressed is False :
     qrb.run_quadrotor_dynamic_quat(dt_sim, fb, taub)
 
     # Time has increased now
-    t = t + dt_sim
+    scheduler.advance()
+    t = scheduler.t
 
     # Visualization frequency    
-    if abs(t/dt_vis - round(t/dt_vis)) < 0.000001 :
+    if scheduler.due("vis") :
         panda3D_app.taskMgr.step()
         panda3D_app.screenText_pos(qrb.pos,qrb.q,filter.x[:3],utils.rpy2q(filter.x[3:6]))
         panda3D_app.screenText_ref(np.append(pos_ref,rpy_ref[2]))
         
     # Logging frequency    
-    if abs(t/dt_log - round(t/dt_log)) < 0.000001 :
+    if scheduler.due("log") :
         logger.log_attstab(t,np.array([rpy_ref[0],rpy_ref[1],rpy_ref[2]]),
                                       np.array([omegab_ref[0],omegab_ref[1],omegab_ref[2]]),
                                       np.array([tau_ref[0],tau_ref[1],tau_ref[2]]) )
@@ -313,17 +332,19 @@ while readkeys.exitpressed is False :
         logger.log_ftau(t,fe,taue,fb,taub)
         logger.log_cmd(t, cmd)
         logger.log_filter(t, filter.x)
-        logger.log_mems(t, gyro_x, gyro_y, gyro_z, acc_x, acc_y, acc_z)
+        logger.log_mems(t, gyro, acc)
 
         
 # End of program, wrap it up with logger and plotter  
 #########################################################
-logger.log2file_rigidbody()
-logger.log2file_cmd()
-logger.log2file_ftau()
-logger.log2file_attstab()
-logger.log2file_posctrl()
-logger.log2file_filter()
+logger.save()
+if write_text_logs:
+    logger.log2file_rigidbody()
+    logger.log2file_cmd()
+    logger.log2file_ftau()
+    logger.log2file_attstab()
+    logger.log2file_posctrl()
+    logger.log2file_filter()
 plotter.plot_rigidbody(logger)
 plotter.plot_cmd(logger)
 plotter.plot_attstab(logger)
@@ -19,6 +19,10 @@
 
 """ Module implements the a mems sensor with white noise and slowly moving bias
 
+mems holds one axis and draws from the global random module. MemsBank holds 
+several axes ( and optionally several vehicles ) as arrays and draws from 
+seeded numpy Generators, one per vehicle.
+
 """
 
 __version__ = "0.1"
@@ -28,6 +32,7 @@ __license__ = "GNU GPLv3"
 
 import random 
 import math 
+import numpy as np
 
 class mems:
     """ Holds the states and parameters of the mems sensor 
@@ -50,4 +55,74 @@ class mems:
         wn = random.gauss(0, self.rw/math.sqrt(dt))
         self.bias = self.bias + random.gauss(0, self.rrw/math.sqrt(dt))
         return (value + self.bias + wn)
-            
\ No newline at end of file
+            
+
+class MemsBank:
+    """ A bank of mems sensors with the model of mems, held as arrays, 
+    e.g. the 3 axes of a gyroscope, or of M gyroscopes on M vehicles
+    """
+
+    def __init__(self, rw, rrw, bias, seed=None, block=1):
+
+        self.bias = np.array(bias, dtype=float, ndmin=1)
+        """ MEMS biases, shape (N,) for N axes or (M,N) for M vehicles. After
+        the first step it is a view into the pregenerated bias path, copy it
+        to keep it """
+
+        self.rw = np.broadcast_to(np.asarray(rw, dtype=float), self.bias.shape)
+        """ Random Walk Parameters (ARW or VRW), per axis """
+
+        self.rrw = np.broadcast_to(np.asarray(rrw, dtype=float), self.bias.shape)
+        """ Rate Random Walk Parameters, per axis """
+
+        self.block = block
+        """ Number of steps of noise drawn in one call per vehicle, e.g. the 
+        number of steps of the whole run """
+
+        if not isinstance(seed, np.random.SeedSequence):
+            seed = np.random.SeedSequence(seed)
+        n_vehicles = 1 if self.bias.ndim == 1 else self.bias.shape[0]
+        self.rngs = [ np.random.default_rng(s) for s in seed.spawn(n_vehicles) ]
+        """ One Generator per vehicle, vehicle m gets the same stream for a 
+        given seed independently of the number of vehicles in the bank """
+
+        # per block: the standard normal draws, and from them the white noise 
+        # and the bias path for the current dt 
+        self._z = np.empty((block, 2) + self.bias.shape)
+        self._wn = np.empty((block,) + self.bias.shape)
+        self._bias = np.empty((block,) + self.bias.shape)
+        self._k = block
+        self._dt = None
+
+    def _draw(self):
+        if (self.bias.ndim == 1):
+            self._z[:] = self.rngs[0].standard_normal(self._z.shape)
+        else:
+            for m, rng in enumerate(self.rngs):
+                self._z[:,:,m] = rng.standard_normal((self.block, 2, self.bias.shape[1]))
+        self._k = 0
+        self._scale()
+
+    def _scale(self):
+        # white noise and bias path from step _k to the end of the block
+        k = self._k
+        sqrt_dt = math.sqrt(self._dt)
+        self._wn[k:] = self._z[k:,0]*(self.rw/sqrt_dt)
+        steps = self._z[k:,1]*(self.rrw/sqrt_dt)
+        steps[0] += self.bias
+        np.cumsum(steps, axis=0, out=self._bias[k:])
+
+    def run_mems(self, dt, value):
+        """ One step for all the axes, value has the shape of bias """
+
+        if (dt != self._dt):
+            self._dt = dt
+            if (self._k < self.block):
+                self._scale()
+        if (self._k == self.block):
+            self._draw()
+
+        k = self._k
+        self._k += 1
+        self.bias = self._bias[k]
+        return (value + self.bias + self._wn[k])
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2019 Luminita-Cristiana Totu
+#
+# Part of the QuadrotorSim aka quadsim package
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this package, in a file called LICENSE.
+# If not, see <https://www.gnu.org/licenses/>.
+
+""" Module implements seeded, named noise streams for the sensor models
+
+Every sensor draws from its own substream, derived from one seed and the
+name of the sensor, so a run is reproduced by its seed and adding a sensor
+does not change the noise of the others. The samples are generated in
+blocks, block i of a stream from its own seed, and can be cached as .npy
+files that later runs load memory-mapped instead of drawing them again.
+
+"""
+
+__version__ = "0.1"
+__author__ = "Luminita-Cristiana Totu"
+__copyright__ = "Copyright (C) 2019 Luminita-Cristiana Totu"
+__license__ = "GNU GPLv3"
+
+import os
+import numpy as np
+
+class NoiseStreams:
+    """ The named substreams of one seed """
+
+    def __init__(self, seed=None, cache_dir=None):
+
+        self.seed = np.random.SeedSequence(seed).entropy
+        """ Seed of all the streams, drawn from the OS if None is given;
+        pass it back to replay the same noise """
+
+        self.cache_dir = cache_dir
+        """ Folder for the .npy cache of the blocks, None for no cache """
+
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok = True)
+
+    def seed_sequence(self, name, *key):
+        """ SeedSequence of substream name, for models that keep their own
+        Generators ( e.g. mems.MemsBank ) """
+        name = name.encode()
+        return np.random.SeedSequence(self.seed,
+                                      spawn_key = (len(name),) + tuple(name) + key)
+
+    def stream(self, name, shape=(), block=4096):
+        """ Standard normal samples of substream name, one of shape per step """
+        return NoiseStream(self, name, shape, block)
+
+class NoiseStream:
+    """ Standard normal samples of one named substream, generated block by
+    block, read one sample at a time with next or several with take """
+
+    def __init__(self, streams, name, shape=(), block=4096):
+
+        self.streams = streams
+        self.name = name
+        self.shape = (shape,) if isinstance(shape, int) else tuple(shape)
+        self.block = block
+
+        self._i = -1
+        self._k = block
+        self._z = None
+
+    def _load(self, i):
+        # block i: from the cache if there, otherwise drawn ( and cached )
+        fullname = None
+        if self.streams.cache_dir is not None:
+            fullname = os.path.join(self.streams.cache_dir, "%s_%d_%s_%d_%d.npy" %
+                (self.name, self.streams.seed,
+                 "x".join(str(n) for n in self.shape), self.block, i))
+            if os.path.exists(fullname):
+                return np.load(fullname, mmap_mode = "r")
+        rng = np.random.default_rng(self.streams.seed_sequence(self.name, 0, i))
+        z = rng.standard_normal((self.block,) + self.shape)
+        if fullname is not None:
+            np.save(fullname, z)
+        return z
+
+    def next(self):
+        """ The next sample """
+        if (self._k == self.block):
+            self._i += 1
+            self._z = self._load(self._i)
+            self._k = 0
+        k = self._k
+        self._k += 1
+        return self._z[k]
+
+    def take(self, n):
+        """ The next n samples, as an (n,)+shape array """
+        Z = np.empty((n,) + self.shape)
+        j = 0
+        while j < n:
+            if (self._k == self.block):
+                self._i += 1
+                self._z = self._load(self._i)
+                self._k = 0
+            m = min(n - j, self.block - self._k)
+            Z[j:j+m] = self._z[self._k:self._k+m]
+            self._k += m
+            j += m
+        return Z
@@ -23,22 +23,31 @@ __version__ = "0.1"
 __author__ = "Luminita-Cristiana Totu"
 __copyright__ = "Copyright (C) 2019 Luminita-Cristiana Totu"
 __license__ = "GNU GPLv3"
+
+import numpy as np
 	
 class PID:
     """ implements a discrete time PID controller 
     
     as described in Small Unmanned Aircraft Theory and Practice
     by  Randal W. Beard and Timothy W. McLain 
+
+    The discretization coefficients are computed once per sample time Ts,
+    and step runs, saturates and does the anti-windup in one call
     """
+
+    __slots__ = ("kp", "_ki", "kd", "limit_up", "limit_down", "_tau",
+                 "integrator", "differentiator", "error_d1", "u", "u_unsat",
+                 "_Ts", "_c_int", "_c_d1", "_c_d2", "_c_aw")
     
-    def __init__(self, kp,ki,kd, limit_up, limit_down, tau):
-        """ Initialize the PID with the kp, ki and kd constants, saturation limits and tau"""
+    def __init__(self, kp,ki,kd, limit_up, limit_down, tau, Ts = None):
+        """ Initialize the PID with the kp, ki and kd constants, saturation 
+        limits and tau, and optionally the sample time Ts of step """
         
         self.kp = kp
         """ Proportional gain """
         
-        self.ki = ki 
-        """ Integral gain """
+        self._ki = ki 
         
         self.kd = kd 
         """ Derivative gain """
@@ -49,10 +58,9 @@ class PID:
         self.limit_down = limit_down 
         """ Lower saturation limit """
         
-        self.tau = tau 
-        """ Time constant of the differentiator """
+        self._tau = tau 
 
-        self .integrator = 0
+        self.integrator = 0
         """ Integrator state """
         
         self.differentiator = 0
@@ -67,7 +75,51 @@ class PID:
         self.u_unsat = 0 
         """ Last output unsaturated """
         
-        self.Ts = 0
+        self._Ts = 0
+        self._c_int = self._c_d1 = self._c_d2 = None
+        self._c_aw = 0.0
+        if Ts is not None:
+            self._discretize(Ts)
+
+    def _discretize(self, Ts):
+        # coefficients of the trapezoid integrator, the dirty derivative 
+        # and the anti-windup for the sample time Ts
+        self._Ts = Ts
+        self._c_int = Ts/2
+        self._c_d1 = (2*self._tau - Ts)/(2*self._tau + Ts)
+        self._c_d2 = 2/(2*self._tau + Ts)
+        self._c_aw = Ts/self._ki if self._ki != 0 else 0.0
+
+    @property
+    def ki(self):
+        """ Integral gain """
+        return self._ki
+
+    @ki.setter
+    def ki(self, value):
+        self._ki = value
+        if self._Ts:
+            self._discretize(self._Ts)
+
+    @property
+    def tau(self):
+        """ Time constant of the differentiator """
+        return self._tau
+
+    @tau.setter
+    def tau(self, value):
+        self._tau = value
+        if self._Ts:
+            self._discretize(self._Ts)
+
+    @property
+    def Ts(self):
+        """ Sample time of the last run, or of step """
+        return self._Ts
+
+    @Ts.setter
+    def Ts(self, value):
+        self._discretize(value)
         
     def reset(self):
 
@@ -77,14 +129,14 @@ class PID:
        
     def run(self,  error, Ts):
     
-        self.integrator = self.integrator + Ts/2*(error + self.error_d1)
-        self.differentiator =(  (2*self.tau - Ts)/(2*self.tau + Ts)*self.differentiator  
-                                          + 2/(2*self.tau +Ts)*(error - self.error_d1)  )
+        if (Ts != self._Ts or self._c_int is None):
+            self._discretize(Ts)
+        self.integrator = self.integrator + self._c_int*(error + self.error_d1)
+        self.differentiator = self._c_d1*self.differentiator + self._c_d2*(error - self.error_d1)
         self.error_d1 = error
         
-        self.u = self.kp*error + self.ki*self.integrator + self.kd*self.differentiator
+        self.u = self.kp*error + self._ki*self.integrator + self.kd*self.differentiator
         self.u_unsat = self.u
-        self.Ts = Ts
         return self.u 
     
     def saturate(self):
@@ -97,7 +149,101 @@ class PID:
 
     def antiwindup(self):
         # Integrator anti-windup
-        if (self.ki != 0):
-            self.integrator = self.integrator +self.Ts/self.ki *(self.u - self.u_unsat)
+        if (self._ki != 0):
+            self.integrator = self.integrator + self._c_aw*(self.u - self.u_unsat)
+
+    def step(self, error):
+        """ run with the sample time Ts, saturate and antiwindup in one 
+        call; returns the saturated output """
+
+        if (self._c_int is None):
+            raise ValueError("PID: step needs the sample time Ts")
+        error_d1 = self.error_d1
+        integrator = self.integrator + self._c_int*(error + error_d1)
+        self.differentiator = self._c_d1*self.differentiator + self._c_d2*(error - error_d1)
+        self.error_d1 = error
+
+        u = u_unsat = self.kp*error + self._ki*integrator + self.kd*self.differentiator
+        if (u > self.limit_up):
+            u = self.limit_up
+        elif (u < self.limit_down):
+            u = self.limit_down
+
+        if (self._ki != 0):
+            integrator = integrator + self._c_aw*(u - u_unsat)
+        self.integrator = integrator
+        self.u = u
+        self.u_unsat = u_unsat
+        return u
+
+class PIDArray:
+    """ PID controllers held as arrays, e.g. (N,3) for the 3 axes of N 
+    vehicles, with the discrete time equations, saturation and anti-windup
+    of PID, all updated at once """
 
-      
\ No newline at end of file
+    def __init__(self, kp, ki, kd, limit_up, limit_down, tau, shape = ()):
+        """ Gains, limits and tau broadcast to shape, e.g. (3,) arrays for
+        one PID per column and shape (N,3) """
+
+        self.shape = tuple(shape)
+
+        self.kp = np.broadcast_to(np.asarray(kp, dtype=float), self.shape).copy()
+        """ Proportional gains """
+
+        self.ki = np.broadcast_to(np.asarray(ki, dtype=float), self.shape).copy()
+        """ Integral gains """
+
+        self.kd = np.broadcast_to(np.asarray(kd, dtype=float), self.shape).copy()
+        """ Derivative gains """
+
+        self.limit_up = np.broadcast_to(np.asarray(limit_up, dtype=float), self.shape).copy()
+        """ Upper saturation limits """
+
+        self.limit_down = np.broadcast_to(np.asarray(limit_down, dtype=float), self.shape).copy()
+        """ Lower saturation limits """
+
+        self.tau = np.broadcast_to(np.asarray(tau, dtype=float), self.shape).copy()
+        """ Time constants of the differentiators """
+
+        self.integrator = np.zeros(self.shape)
+        self.differentiator = np.zeros(self.shape)
+        self.error_d1 = np.zeros(self.shape)
+        self.u = np.zeros(self.shape)
+        self.u_unsat = np.zeros(self.shape)
+        self.Ts = 0
+
+    @staticmethod
+    def from_pids(pids, n):
+        """ PIDArray of shape (n,len(pids)), column j with the gains and 
+        limits of pids[j] """
+        return PIDArray([ p.kp for p in pids ], [ p.ki for p in pids ], [ p.kd for p in pids ],
+                        [ p.limit_up for p in pids ], [ p.limit_down for p in pids ],
+                        [ p.tau for p in pids ], (n, len(pids)))
+
+    def reset(self):
+
+        self.integrator[...] = 0
+        self.differentiator[...] = 0
+        self.error_d1[...] = 0
+
+    def run(self, error, Ts):
+
+        self.integrator = self.integrator + Ts/2*(error + self.error_d1)
+        self.differentiator =(  (2*self.tau - Ts)/(2*self.tau + Ts)*self.differentiator  
+                                          + 2/(2*self.tau +Ts)*(error - self.error_d1)  )
+        self.error_d1 = np.array(error, dtype=float)
+
+        self.u = self.kp*error + self.ki*self.integrator + self.kd*self.differentiator
+        self.u_unsat = self.u
+        self.Ts = Ts
+        return self.u 
+
+    def saturate(self):
+        self.u = np.where(self.u > self.limit_up, self.limit_up,
+                          np.where(self.u < self.limit_down, self.limit_down, self.u))
+        return self.u
+
+    def antiwindup(self):
+        # Integrator anti-windup, only where ki != 0
+        gain = np.divide(self.Ts, self.ki, out=np.zeros(self.shape), where=self.ki != 0)
+        self.integrator = self.integrator + gain*(self.u - self.u_unsat)
@@ -17,7 +17,14 @@
 # along with this package, in a file called LICENSE.
 # If not, see <https://www.gnu.org/licenses/>.
 
-""" This module implements the Graphical Plotter """
+""" This module implements the Graphical Plotter 
+
+The series are reduced to the min and max of each pixel column before they
+are drawn ( minmax_decimate ), a figure whose drawn content is the same as 
+in its existing .png is not rendered again, and plot_all can render the 
+plot_ groups in a pool of processes on the Agg backend.
+
+"""
 
 __version__ = "0.1"
 __author__ = "Luminita-Cristiana Totu"
@@ -27,13 +34,102 @@ __license__ = "GNU GPLv3"
 import numpy as np
 import matplotlib.pyplot as plt
 import os 
+import hashlib
+import concurrent.futures
+import logger
+
+def minmax_decimate(x, y, n_bins):
+    """ x, y reduced to the samples holding the min and the max of y in each 
+    of n_bins consecutive bins, in time order; a line through them looks as 
+    the full series if a bin is not wider than a pixel column """
+
+    n = len(y)
+    if (n <= 2*n_bins):
+        return x, y
+    m = n//n_bins
+    Y = y[:n_bins*m].reshape(n_bins, m)
+    base = np.arange(n_bins)*m
+    idx = np.stack([ base + Y.argmin(axis=1), base + Y.argmax(axis=1) ], axis=1)
+    if (n_bins*m < n):  # tail shorter than a bin
+        tail = y[n_bins*m:]
+        idx = np.vstack([ idx, [[ n_bins*m + tail.argmin(), n_bins*m + tail.argmax() ]] ])
+    idx = np.sort(idx, axis=1).ravel()
+    return x[idx], y[idx]
+
+def _plot_worker(plotter, name, log):
+    plt.switch_backend("Agg")
+    getattr(plotter, "plot_" + name)(log)
 
 class Plotter:
-    """ Handles the plotting from a logger object  """
+    """ Handles the plotting from a logger object, a logger.LogReader, or 
+    the file name of a saved run ( Logger.save or streaming folder ) """
   
     def __init__(self):
         
         self.big_font_size = 25
+
+        self.n_bins = 2000
+        """ Series longer than 2*n_bins samples are decimated to n_bins min/max
+        pairs ( the figures are 2000 pixels wide ), 0 to draw all the samples """
+
+        self.skip_unchanged = True
+        """ If True, a figure is not saved again when its .png holds the same 
+        content, found by the hash kept in the .png metadata """
+
+    def _plot(self, ax, x, y, *args, **kwargs):
+        # ax.plot, of the decimated series; markers only when all the 
+        # samples are drawn 
+        x = np.asarray(x); y = np.asarray(y)
+        if (self.n_bins and len(y) > 2*self.n_bins):
+            x, y = minmax_decimate(x, y, self.n_bins)
+            kwargs.pop("marker", None)
+        return ax.plot(x, y, *args, **kwargs)
+
+    def _savefig(self, fig, fullname):
+        # fig.savefig, skipped if the .png there was made from the same content 
+        h = hashlib.sha1()
+        h.update(repr((fig.get_size_inches().tolist(), fig.dpi, 
+                       [ t.get_text() for t in fig.texts ])).encode())
+        for ax in fig.axes:
+            h.update(repr((ax.get_title(), ax.get_xlabel(), ax.get_ylabel(), 
+                           ax.get_legend_handles_labels()[1])).encode())
+            for line in ax.get_lines():
+                h.update(np.ascontiguousarray(line.get_xydata()).tobytes())
+                h.update(repr((line.get_marker(), line.get_label())).encode())
+        digest = h.hexdigest()
+        if (self.skip_unchanged and os.path.exists(fullname)):
+            try:
+                from PIL import Image
+                with Image.open(fullname) as png:
+                    if png.info.get("quadsim_hash") == digest:
+                        plt.close(fig)
+                        return False
+            except (ImportError, OSError):
+                pass
+        fig.savefig(fullname, metadata = { "quadsim_hash": digest })
+        plt.close(fig)
+        return True
+
+    def plot_all(self, log, names = ("rigidbody", "cmd", "attstab", "posctrl", "mems"), 
+                 processes = 1):
+        """ plot_<name>(log) for all names, here, or in parallel in a pool of 
+        processes if processes is not 1 ( None for one per CPU ). The 
+        decimation and skip_unchanged leave the pool little to gain on a 
+        few groups, it is worth it for many large runs. log is best a file 
+        name ( a Logger is saved first ), so that each process maps the run 
+        instead of receiving it. As with any process pool, the calling script
+        needs a if __name__ == "__main__" guard unless the start method is 
+        fork """
+
+        if isinstance(log, logger.Logger):
+            log = log.save()
+        if (processes == 1):
+            for name in names:
+                getattr(self, "plot_" + name)(log)
+            return
+        with concurrent.futures.ProcessPoolExecutor(processes) as pool:
+            for result in [ pool.submit(_plot_worker, self, name, log) for name in names ]:
+                result.result()
         
     def fig_style_1(self, fig, ax_lst):
         
@@ -49,6 +145,8 @@ class Plotter:
 
     def plot_mems(self, log):
 
+        log = logger.open_log(log)
+
         # saving location 
         location = log.location 
         if not os.path.exists(location):
@@ -63,28 +161,27 @@ class Plotter:
         time_filter = np.asarray(log.filter_time)
         gyro_bias_filter = np.asarray(log.filter_bg)
         
-        ax_lst[0].plot( time, gyro_bias[:,0], marker = "o", label = 'true' )
-        ax_lst[0].plot( time_filter, gyro_bias_filter[:,0], marker = "x", label='filter' )
+        self._plot(ax_lst[0], time, gyro_bias[:,0], marker = "o", label = 'true' )
+        self._plot(ax_lst[0], time_filter, gyro_bias_filter[:,0], marker = "x", label='filter' )
         ax_lst[0].set_title("X-axis")
         ax_lst[0].set_xlabel('Time [s]');ax_lst[0].set_ylabel(' Ang Velocity [rad/s]')
         ax_lst[0].legend(loc="upper left")
         
-        ax_lst[1].plot( time, gyro_bias[:,1], marker = "o", label = 'true' )
-        ax_lst[1].plot( time_filter, gyro_bias_filter[:,1], marker = "x", label = 'filter' )
+        self._plot(ax_lst[1], time, gyro_bias[:,1], marker = "o", label = 'true' )
+        self._plot(ax_lst[1], time_filter, gyro_bias_filter[:,1], marker = "x", label = 'filter' )
         ax_lst[1].set_title("X-axis")
         ax_lst[1].set_xlabel('Time [s]');ax_lst[1].set_ylabel(' Ang Velocity [rad/s]')
         ax_lst[1].legend(loc="upper left")
 
-        ax_lst[2].plot( time, gyro_bias[:,2], marker = "o", label='true')
-        ax_lst[2].plot( time_filter, gyro_bias_filter[:,2], marker = "x", label = 'filter' )
+        self._plot(ax_lst[2], time, gyro_bias[:,2], marker = "o", label='true')
+        self._plot(ax_lst[2], time_filter, gyro_bias_filter[:,2], marker = "x", label = 'filter' )
         ax_lst[2].set_title("X-axis")
         ax_lst[2].set_xlabel('Time [s]');ax_lst[2].set_ylabel(' Ang Velocity [rad/s]')
         ax_lst[2].legend(loc="upper left")
         self.fig_style_1(fig, ax_lst)
         
         fullname = location + "/" +  log.basename + "__mems_gyro_bias.png"
-        fig.savefig(fullname)
-        plt.close(fig)
+        self._savefig(fig, fullname)
 
         # Acc Bias plot
         ################################################
@@ -95,21 +192,21 @@ class Plotter:
         time_filter = np.asarray(log.filter_time)
         acc_bias_filter = np.asarray(log.filter_ba)
         
-        ax_lst[0].plot( time, acc_bias[:,0], marker = "o", label = 'true' )
-        ax_lst[0].plot( time_filter, acc_bias_filter[:,0], marker = "x", label='filter' )
+        self._plot(ax_lst[0], time, acc_bias[:,0], marker = "o", label = 'true' )
+        self._plot(ax_lst[0], time_filter, acc_bias_filter[:,0], marker = "x", label='filter' )
         ax_lst[0].set_title("X-axis")
         ax_lst[0].set_xlabel('Time [s]');ax_lst[0].set_ylabel(' Acc [m/s2]')
         ax_lst[0].legend(loc="upper left")
 
-        ax_lst[1].plot( time, acc_bias[:,1], marker = "o", label='true' )
-        ax_lst[1].plot( time_filter, acc_bias_filter[:,1], marker = "x", label='filter' )
+        self._plot(ax_lst[1], time, acc_bias[:,1], marker = "o", label='true' )
+        self._plot(ax_lst[1], time_filter, acc_bias_filter[:,1], marker = "x", label='filter' )
         ax_lst[1].set_title("X-axis")
         ax_lst[1].set_xlabel('Time [s]');ax_lst[1].set_ylabel(' Acc [m/s2]')
         ax_lst[1].legend(loc="upper left")
 
 
-        ax_lst[2].plot( time, acc_bias[:,2], marker = "o", label='true')
-        ax_lst[2].plot( time_filter, acc_bias_filter[:,2], marker = "x", label='filter' )
+        self._plot(ax_lst[2], time, acc_bias[:,2], marker = "o", label='true')
+        self._plot(ax_lst[2], time_filter, acc_bias_filter[:,2], marker = "x", label='filter' )
         ax_lst[2].set_title("X-axis")
         ax_lst[2].set_xlabel('Time [s]');ax_lst[2].set_ylabel(' Acc [m/s2]')
         ax_lst[2].legend(loc="upper left")
@@ -117,10 +214,11 @@ class Plotter:
         self.fig_style_1(fig, ax_lst)
         
         fullname = location + "/" +  log.basename + "__mems_acc_bias.png"
-        fig.savefig(fullname)
-        plt.close(fig)
+        self._savefig(fig, fullname)
 
     def plot_rigidbody(self, log):
+
+        log = logger.open_log(log)
         
         # saving location 
         location = log.location 
@@ -136,24 +234,23 @@ class Plotter:
         time_filter = np.asarray(log.filter_time)
         pos_filter = np.asarray(log.filter_pos)
         
-        ax_lst[0].plot( time, pos[:,0], marker = "o" )
-        ax_lst[0].plot( time, pos_filter[:,0], marker = "x" )
+        self._plot(ax_lst[0], time, pos[:,0], marker = "o" )
+        self._plot(ax_lst[0], time, pos_filter[:,0], marker = "x" )
         ax_lst[0].set_title("X-axis")
         ax_lst[0].set_xlabel('Time [s]');ax_lst[0].set_ylabel('Distance [m]')
-        ax_lst[1].plot( time, pos[:,1], marker = "o" )
-        ax_lst[1].plot( time_filter, pos_filter[:,1], marker = "x" )
+        self._plot(ax_lst[1], time, pos[:,1], marker = "o" )
+        self._plot(ax_lst[1], time_filter, pos_filter[:,1], marker = "x" )
         ax_lst[1].set_title("Y-axis")
         ax_lst[1].set_xlabel('Time [s]');ax_lst[1].set_ylabel('Distance [m]')
-        ax_lst[2].plot( time, pos[:,2], marker = "o" ) 
-        ax_lst[2].plot( time_filter, pos_filter[:,2], marker = "x" ) 
+        self._plot(ax_lst[2], time, pos[:,2], marker = "o" ) 
+        self._plot(ax_lst[2], time_filter, pos_filter[:,2], marker = "x" ) 
         ax_lst[2].set_title("Z-axis")
         ax_lst[2].set_xlabel('Time [s]');ax_lst[2].set_ylabel('Distance [m]')
         
         self.fig_style_1(fig, ax_lst)
         
         fullname = location + "/" +  log.basename + "__rigidbody_pos.png"
-        fig.savefig(fullname)
-        plt.close(fig)
+        self._savefig(fig, fullname)
         
         # Euler Angles plot 
         ################################################
@@ -164,18 +261,18 @@ class Plotter:
         time_filter = np.asarray(log.filter_time)
         euler_filter = np.asarray(log.filter_euler)
         
-        ax_lst[0].plot( time, euler[:,0], marker = "o", label='true' )
-        ax_lst[0].plot( time_filter, euler_filter[:,0], marker = "x", label='filter' )
+        self._plot(ax_lst[0], time, euler[:,0], marker = "o", label='true' )
+        self._plot(ax_lst[0], time_filter, euler_filter[:,0], marker = "x", label='filter' )
         ax_lst[0].legend(loc="upper left")
         ax_lst[0].set_title("Roll - rotation around the X-axis")
         ax_lst[0].set_xlabel('Time [s]');ax_lst[0].set_ylabel('Angles [$^\circ$]')
-        ax_lst[1].plot( time, euler[:,1], marker = "o", label='true' )
-        ax_lst[1].plot( time_filter, euler_filter[:,1], marker = "x", label='filter' )
+        self._plot(ax_lst[1], time, euler[:,1], marker = "o", label='true' )
+        self._plot(ax_lst[1], time_filter, euler_filter[:,1], marker = "x", label='filter' )
         ax_lst[1].legend(loc="upper left")
         ax_lst[1].set_title("Pitch - rotation around the Y-axis")
         ax_lst[1].set_xlabel('Time [s]');ax_lst[1].set_ylabel('Angles [$^\circ$]')
-        ax_lst[2].plot( time, euler[:,2], marker = "o", label='true' ) 
-        ax_lst[2].plot( time_filter, euler_filter[:,2], marker = "x", label='filter' ) 
+        self._plot(ax_lst[2], time, euler[:,2], marker = "o", label='true' ) 
+        self._plot(ax_lst[2], time_filter, euler_filter[:,2], marker = "x", label='filter' ) 
         ax_lst[2].legend(loc="upper left")
         ax_lst[2].set_title("Yaw - rotation around the Z-axis")
         ax_lst[2].set_xlabel('Time [s]');ax_lst[2].set_ylabel('Angles [$^\circ$]')
@@ -183,10 +280,11 @@ class Plotter:
         self.fig_style_1(fig, ax_lst)
         
         fullname = location + "/" +  log.basename+ "__rigidbody_eulerXYZ.png"
-        fig.savefig(fullname)
-        plt.close(fig)
+        self._savefig(fig, fullname)
         
     def plot_cmd(self, log):
+
+        log = logger.open_log(log)
         
         # saving location 
         location = log.location 
@@ -199,29 +297,30 @@ class Plotter:
         time = np.asarray(log.cmd_time)
         cmd_rotors = np.asarray(log.cmd_rotors)
         
-        ax_lst[0].plot( time, cmd_rotors[:,0], marker = "o" )
+        self._plot(ax_lst[0], time, cmd_rotors[:,0], marker = "o" )
         ax_lst[0].set_title("Rotor 1")
         ax_lst[0].set_xlabel('Time [s]');ax_lst[0].set_ylabel('16-bit number')
         
-        ax_lst[1].plot( time, cmd_rotors[:,1], marker = "o" )
+        self._plot(ax_lst[1], time, cmd_rotors[:,1], marker = "o" )
         ax_lst[1].set_title("Rotor 2")
         ax_lst[1].set_xlabel('Time [s]');ax_lst[1].set_ylabel('16-bit number')
         
-        ax_lst[2].plot( time, cmd_rotors[:,2], marker = "o" ) 
+        self._plot(ax_lst[2], time, cmd_rotors[:,2], marker = "o" ) 
         ax_lst[2].set_title("Rotor 3")
         ax_lst[2].set_xlabel('Time [s]');ax_lst[2].set_ylabel('16-bit number')
         
-        ax_lst[3].plot( time, cmd_rotors[:,3], marker = "o" ) 
+        self._plot(ax_lst[3], time, cmd_rotors[:,3], marker = "o" ) 
         ax_lst[3].set_title("Rotor 4")
         ax_lst[3].set_xlabel('Time [s]');ax_lst[3].set_ylabel('16-bit number')
         
         self.fig_style_1(fig, ax_lst)
         
         fullname = location + "/" +  log.basename + "__cmd_rotors.png"
-        fig.savefig(fullname)
-        plt.close(fig)
+        self._savefig(fig, fullname)
         
     def plot_attstab(self, log):        
+
+        log = logger.open_log(log)
         
         # saving location 
         location = log.location 
@@ -235,20 +334,20 @@ class Plotter:
         angle_ref = np.asarray(log.attstab_angle_ref)
         angle = np.asarray(log.rb_euler)
         
-        ax_lst[0].plot( time, angle_ref[:,0])
-        ax_lst[0].plot( time, angle[:,0] )
+        self._plot(ax_lst[0], time, angle_ref[:,0])
+        self._plot(ax_lst[0], time, angle[:,0] )
         ax_lst[0].set_title("Roll")
         ax_lst[0].legend(("Roll Ref","Roll"))
         ax_lst[0].set_xlabel('Time [s]');ax_lst[0].set_ylabel('Angles [$^\circ$]')
         
-        ax_lst[1].plot( time, angle_ref[:,1] )
-        ax_lst[1].plot( time, angle[:,1])
+        self._plot(ax_lst[1], time, angle_ref[:,1] )
+        self._plot(ax_lst[1], time, angle[:,1])
         ax_lst[1].set_title("Pitch")
         ax_lst[1].legend(("Pitch Ref","Pitch"))
         ax_lst[1].set_xlabel('Time [s]');ax_lst[1].set_ylabel('Angles [$^\circ$]')
         
-        ax_lst[2].plot( time, angle_ref[:,2])
-        ax_lst[2].plot( time, angle[:,2])
+        self._plot(ax_lst[2], time, angle_ref[:,2])
+        self._plot(ax_lst[2], time, angle[:,2])
         ax_lst[2].set_title("Yaw")
         ax_lst[2].legend(("Yaw Ref","Yaw"))
         ax_lst[2].set_xlabel('Time [s]');ax_lst[2].set_ylabel('Angles [$^\circ$]')
@@ -256,8 +355,7 @@ class Plotter:
         self.fig_style_1(fig, ax_lst)
         
         fullname = location + "/" +  log.basename + "__attstab_angle_ref.png"
-        fig.savefig(fullname)
-        plt.close(fig)
+        self._savefig(fig, fullname)
         
         # omega ref 
         fig, ax_lst = plt.subplots(3, 1)
@@ -266,20 +364,20 @@ class Plotter:
         omega_ref = np.asarray(log.attstab_omega_ref)
         omega = np.asarray(log.rb_omegab)
         
-        ax_lst[0].plot( time, omega_ref[:,0])
-        ax_lst[0].plot( time, omega[:,0])
+        self._plot(ax_lst[0], time, omega_ref[:,0])
+        self._plot(ax_lst[0], time, omega[:,0])
         ax_lst[0].set_title("Omega X")
         ax_lst[0].legend(("Omega X Ref","Omega X"))
         ax_lst[0].set_xlabel('Time [s]');ax_lst[0].set_ylabel(' Ang. Vel [$^\circ$/s]')
         
-        ax_lst[1].plot( time, omega_ref[:,1] )
-        ax_lst[1].plot( time, omega[:,1] )
+        self._plot(ax_lst[1], time, omega_ref[:,1] )
+        self._plot(ax_lst[1], time, omega[:,1] )
         ax_lst[1].set_title("Omega Y")
         ax_lst[1].legend(("Omega Y Ref","Omega Y"))
         ax_lst[1].set_xlabel('Time [s]');ax_lst[1].set_ylabel(' Ang. Vel [$^\circ$/s]')
         
-        ax_lst[2].plot( time, omega_ref[:,2])
-        ax_lst[2].plot( time, omega[:,2] )
+        self._plot(ax_lst[2], time, omega_ref[:,2])
+        self._plot(ax_lst[2], time, omega[:,2] )
         ax_lst[2].set_title("Omega Z")
         ax_lst[2].legend(("Omega Z Ref","Omega Z"))
         ax_lst[2].set_xlabel('Time [s]');ax_lst[2].set_ylabel(' Ang. Vel [$^\circ$/s]')
@@ -287,8 +385,7 @@ class Plotter:
         self.fig_style_1(fig, ax_lst)
         
         fullname = location + "/" +  log.basename + "__attstab_omega_ref.png"
-        fig.savefig(fullname)
-        plt.close(fig)
+        self._savefig(fig, fullname)
         
         # tau ref 
         
@@ -298,20 +395,20 @@ class Plotter:
         tau_ref = np.asarray(log.attstab_tau_ref)
         tau = np.asarray(log.ftau_taub)
         
-        ax_lst[0].plot( time, tau_ref[:,0])
-        ax_lst[0].plot( time, tau[:,0])
+        self._plot(ax_lst[0], time, tau_ref[:,0])
+        self._plot(ax_lst[0], time, tau[:,0])
         ax_lst[0].set_title("Tau X")
         ax_lst[0].legend(("Tau X Ref","Tau X"))
         ax_lst[0].set_xlabel('Time [s]');ax_lst[0].set_ylabel(' Torque [N$\cdot$m]')
         
-        ax_lst[1].plot( time, tau_ref[:,1])
-        ax_lst[1].plot( time, tau[:,1])
+        self._plot(ax_lst[1], time, tau_ref[:,1])
+        self._plot(ax_lst[1], time, tau[:,1])
         ax_lst[1].set_title("Tau Y")
         ax_lst[1].legend(("Tau Y Ref","Tau Y"))
         ax_lst[1].set_xlabel('Time [s]');ax_lst[1].set_ylabel(' Torque [N$\cdot$m]')
         
-        ax_lst[2].plot( time, tau_ref[:,2])
-        ax_lst[2].plot( time, tau[:,2])
+        self._plot(ax_lst[2], time, tau_ref[:,2])
+        self._plot(ax_lst[2], time, tau[:,2])
         ax_lst[2].set_title("Tau Z")
         ax_lst[2].legend(("Tau Z Ref","Tau Z"))
         ax_lst[2].set_xlabel('Time [s]');ax_lst[2].set_ylabel(' Torque [N$\cdot$m]')
@@ -319,10 +416,11 @@ class Plotter:
         self.fig_style_1(fig, ax_lst)
         
         fullname = location + "/" +  log.basename + "__attstab_tau_ref.png"
-        fig.savefig(fullname)
-        plt.close(fig)
+        self._savefig(fig, fullname)
     
     def plot_posctrl(self, log):
+
+        log = logger.open_log(log)
         
          # saving location 
         location = log.location 
@@ -335,20 +433,20 @@ class Plotter:
         pos_ref = np.asarray(log.posctrl_pos_ref)
         pos = np.asarray(log.rb_pos)
         
-        ax_lst[0].plot( time, pos_ref[:,0])
-        ax_lst[0].plot( time, pos[:,0])
+        self._plot(ax_lst[0], time, pos_ref[:,0])
+        self._plot(ax_lst[0], time, pos[:,0])
         ax_lst[0].set_title(" X")
         ax_lst[0].legend((" X Ref"," X"))
         ax_lst[0].set_xlabel('Time [s]');ax_lst[0].set_ylabel(' Distance [m]')
         
-        ax_lst[1].plot( time, pos_ref[:,1])
-        ax_lst[1].plot( time, pos[:,1])
+        self._plot(ax_lst[1], time, pos_ref[:,1])
+        self._plot(ax_lst[1], time, pos[:,1])
         ax_lst[1].set_title("Y")
         ax_lst[1].legend(("Y Ref","Y"))
         ax_lst[1].set_xlabel('Time [s]');ax_lst[1].set_ylabel(' Distance [m]')
         
-        ax_lst[2].plot( time, pos_ref[:,2])
-        ax_lst[2].plot( time, pos[:,2])
+        self._plot(ax_lst[2], time, pos_ref[:,2])
+        self._plot(ax_lst[2], time, pos[:,2])
         ax_lst[2].set_title("Z")
         ax_lst[2].legend(("Z Ref","Z"))
         ax_lst[2].set_xlabel('Time [s]');ax_lst[2].set_ylabel(' Distance [m]')
@@ -356,5 +454,4 @@ class Plotter:
         self.fig_style_1(fig, ax_lst)
         
         fullname = location + "/" +  log.basename + "__posctrl_pos_ref.png"
-        fig.savefig(fullname)
-        plt.close(fig)
\ No newline at end of file
+        self._savefig(fig, fullname)
\ No newline at end of file
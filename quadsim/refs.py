@@ -1,129 +1,204 @@
-import utils
+""" Reference trajectories for the position controller
+
+The references are declared in a json file ( res/references.json by
+default ), one entry per name with the four controlled axes x, y, z, yaw.
+An axis is either a breakpoint table built by utils.build_signal_*
+( types step, ramp, sin, or table for a table given as is ) or a smooth
+curve through timed points ( types spline, cubic, and minsnap, minimum snap
+polynomials of degree 7 ), with analytic derivatives for feedforward.
+
+A definition is compiled once into a Trajectory, cached by the hash of the
+definition, and evaluated on arrays of times. buildCtrlReference keeps
+returning the breakpoint tables of the main scripts.
+
+"""
+
+import os
+import json
 import math
+import hashlib
 from dataclasses import dataclass
+import numpy as np
+from scipy.interpolate import CubicSpline, PPoly
+
+import utils
 
 @dataclass
 class StepAndRampMetaSignal:
     t_start: float
-    t_end: float 
+    t_end: float
     value: float
 
 @dataclass
 class SinMetaSignal:
     t_start: float
     amplitude: float
-    no_periods: float 
-    period: float 
-    no_points_per_period: float 
+    no_periods: float
+    period: float
+    no_points_per_period: float
+
+library_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "res", "references.json")
+""" Default file of reference definitions """
+
+axes = ("x", "y", "z", "yaw")
+""" The axes of a trajectory, in the order of the evaluated columns """
+
+class TableAxis:
+    """ An axis given by a breakpoint table, linear in between ( give_signal ) """
+
+    def __init__(self, table):
+        self.signal = utils.Signal(table)
+        self.t_end = self.signal.t_end
+
+    def table(self, dt = None):
+        return self.signal.table.copy()
+
+    def evaluate(self, t, der = 0):
+        return self.signal.evaluate(t, der)
+
+class PolyAxis:
+    """ An axis given by a piecewise polynomial ( scipy PPoly ), held at its
+    end values outside of its time span """
+
+    def __init__(self, ppoly):
+        self.ppoly = ppoly
+        self.t_start = ppoly.x[0]
+        self.t_end = ppoly.x[-1]
+
+    def table(self, dt = 0.01):
+        t = np.append(np.arange(self.t_start, self.t_end, dt), self.t_end)
+        return np.column_stack((t, self.evaluate(t)))
+
+    def evaluate(self, t, der = 0):
+        t = np.asarray(t, dtype=float)
+        value = self.ppoly(np.clip(t, self.t_start, self.t_end), der)
+        if (der > 0):
+            value = np.where((t < self.t_start) | (t > self.t_end), 0.0, value)
+        return value
+
+def minsnap(points):
+    """ Minimum snap curve through points [ [t, value], ... ], as a PPoly.
+    Degree 7 polynomials between the points, continuous up to the 6th
+    derivative ( the optimality conditions of the minimum snap ), and at
+    rest ( velocity, acceleration, jerk zero ) at both ends """
+
+    points = np.asarray(points, dtype=float)
+    T = points[:,0]; V = points[:,1]
+    m = len(T) - 1
+    D = np.diff(T)
+    # p_i(s) = sum_j c[i,j] s^j, s = (t - T_i)/D_i in [0,1]
+    def row(i, k, s):
+        r = np.zeros(8*m)
+        for j in range(k, 8):
+            r[8*i+j] = math.factorial(j)/math.factorial(j-k)*s**(j-k)/D[i]**k
+        return r
+    A = []; b = []
+    for i in range(m):
+        A.append(row(i, 0, 0.0)); b.append(V[i])
+        A.append(row(i, 0, 1.0)); b.append(V[i+1])
+    for i in range(1, m):
+        for k in range(1, 7):
+            A.append(row(i-1, k, 1.0) - row(i, k, 0.0)); b.append(0.0)
+    for k in range(1, 4):
+        A.append(row(0, k, 0.0)); b.append(0.0)
+        A.append(row(m-1, k, 1.0)); b.append(0.0)
+    c = np.linalg.solve(np.array(A), np.array(b)).reshape(m, 8)
+    # PPoly: coefficients of (t - T_i)^j, highest power first
+    c = c/D[:,None]**np.arange(8)
+    return PPoly(c[:,::-1].transpose().copy(), T)
+
+def _compile_axis(definition):
+
+    kind = definition["type"]
+    deg = definition.get("unit") == "deg"
+    unit = lambda value: value*math.pi/180 if deg else value
+    if kind in ("step", "ramp", "sin"):
+        if kind == "sin":
+            segments = [ SinMetaSignal(seg[0], unit(seg[1]), *seg[2:]) for seg in definition["segments"] ]
+            build = utils.build_signal_sin
+        else:
+            segments = [ StepAndRampMetaSignal(seg[0], seg[1], unit(seg[2])) for seg in definition["segments"] ]
+            build = utils.build_signal_step if kind == "step" else utils.build_signal_ramp
+        return TableAxis(build(definition["t_start"], definition["t_end"],
+                               unit(definition["base"]), *segments))
+    if kind == "table":
+        table = np.array(definition["table"], dtype=float)
+        table[:,1] = unit(table[:,1])
+        return TableAxis(table)
+    points = np.array(definition["points"], dtype=float)
+    points[:,1] = unit(points[:,1])
+    if kind == "spline":
+        return PolyAxis(CubicSpline(points[:,0], points[:,1], bc_type="clamped"))
+    if kind == "cubic":
+        return PolyAxis(CubicSpline(points[:,0], points[:,1], bc_type="natural"))
+    if kind == "minsnap":
+        return PolyAxis(minsnap(points))
+    raise ValueError("Unknown reference type: {}".format(kind))
+
+def definition_hash(definition):
+    """ Key of a definition in the cache of compiled trajectories """
+    return hashlib.sha1(json.dumps(definition, sort_keys=True).encode()).hexdigest()
+
+class Trajectory:
+    """ x, y, z, yaw reference compiled from a definition """
+
+    def __init__(self, definition, name = None):
+
+        self.name = name
+        self.definition = definition
+        self.key = definition_hash(definition)
+        """ Hash of the definition """
+
+        self.axes = [ _compile_axis(definition[axis]) for axis in axes ]
+        """ TableAxis or PolyAxis, for x, y, z, yaw """
+
+        self.t_end = max(axis.t_end for axis in self.axes[:3])
+        """ End of the position reference """
+
+    def evaluate(self, t, der = 0):
+        """ Reference ( der = 0 ) or its derivative der at the times t, an
+        (n,4) array of x, y, z, yaw, or (4,) for one time """
+        return np.stack([ axis.evaluate(t, der) for axis in self.axes ], axis=-1)
+
+    def sample(self, t):
+        """ Position, velocity and acceleration references at the times t """
+        return self.evaluate(t, 0), self.evaluate(t, 1), self.evaluate(t, 2)
+
+    def tables(self, dt = 0.01):
+        """ Breakpoint tables of x, y, z, yaw, for give_signal; the smooth
+        axes are sampled every dt """
+        return tuple(axis.table(dt) for axis in self.axes)
+
+_compiled = {}
+_libraries = {}
+
+def compile_trajectory(definition, name = None):
+    """ The Trajectory of a definition, compiled only the first time """
+    key = definition_hash(definition)
+    if key not in _compiled:
+        _compiled[key] = Trajectory(definition, name)
+    return _compiled[key]
+
+def load_library(fullname = library_file):
+    """ Name -> definition, of a json file; read again only if modified """
+    mtime = os.path.getmtime(fullname)
+    if fullname not in _libraries or _libraries[fullname][0] != mtime:
+        with open(fullname) as f:
+            _libraries[fullname] = (mtime, json.load(f))
+    return _libraries[fullname][1]
+
+def trajectory(name, fullname = library_file):
+    """ The compiled Trajectory called name in the file fullname """
+    library = load_library(fullname)
+    if name not in library:
+        raise ValueError("Unknown reference: {}".format(name))
+    return compile_trajectory(library[name], name)
 
 def buildCtrlReference(ref_mode):
+    """ pos_x_ref, pos_y_ref, pos_z_ref, yaw_ref breakpoint tables and the
+    name of ref_mode; the tables are None for manual ( or unknown ) modes """
 
-    if ref_mode == "step":
-      
-        name = "step"
-    
-        step_1 = StepAndRampMetaSignal(3,13,20)
-        step_2 = StepAndRampMetaSignal(63,73,-20)
-        pos_x_ref = utils.build_signal_step(0,90,0,step_1, step_2)
-
-        step_1 = StepAndRampMetaSignal(23,33,20)
-        step_2 = StepAndRampMetaSignal(63,73,-20)
-        pos_y_ref = utils.build_signal_step(0,90,0,step_1, step_2)
-
-        step_1 = StepAndRampMetaSignal(43,53,15)
-        step_2 = StepAndRampMetaSignal(63,73,2)
-        pos_z_ref = utils.build_signal_step(0,90,3,step_1, step_2)
-
-        step_1 = StepAndRampMetaSignal(3,13,45*math.pi/180)
-        step_2 = StepAndRampMetaSignal(23,33,45*math.pi/180)
-        step_3 = StepAndRampMetaSignal(43,53,45*math.pi/180)
-        step_4 = StepAndRampMetaSignal(63,73,-45*math.pi/180)
-        yaw_ref = utils.build_signal_step(0,90,0,step_1, step_2,step_3,step_4)
-
-    elif ref_mode == "shortstep":
-      
-        name = "shortstep"
-    
-        step_1 = StepAndRampMetaSignal(1,20,20)
-        pos_x_ref = utils.build_signal_step(0,20,0,step_1)
-
-        step_1 = StepAndRampMetaSignal(1,20,20)
-        pos_y_ref = utils.build_signal_step(0,20,0,step_1)
-
-        step_1 = StepAndRampMetaSignal(10,20,6)
-        pos_z_ref = utils.build_signal_step(0,20,6,step_1)
-
-        step_1 = StepAndRampMetaSignal(10,20,0*math.pi/180)
-        yaw_ref = utils.build_signal_step(0,20,0,step_1)
-
-    elif ref_mode == "ramp":
-    
-        name = "ramp"
-     
-        ramp_1 = StepAndRampMetaSignal(3,13,20)
-        ramp_2 = StepAndRampMetaSignal(63,73,-20)
-        pos_x_ref = utils.build_signal_ramp(0,90,0,ramp_1, ramp_2)
-
-        ramp_1 = StepAndRampMetaSignal(23,33,20)
-        ramp_2 = StepAndRampMetaSignal(63,73,-20)
-        pos_y_ref = utils.build_signal_ramp(0,90,0,ramp_1, ramp_2)
-
-        ramp_1 = StepAndRampMetaSignal(43,53,20)
-        ramp_2 = StepAndRampMetaSignal(63,73,20)
-        pos_z_ref = utils.build_signal_ramp(0,90,3,ramp_1, ramp_2)
-
-        ramp_1 = StepAndRampMetaSignal(3,13,120*math.pi/180)
-        ramp_2 = StepAndRampMetaSignal(23,33,120*math.pi/180)
-        ramp_3 = StepAndRampMetaSignal(43,53,120*math.pi/180)
-        ramp_4 = StepAndRampMetaSignal(63,73,-120*math.pi/180)
-        yaw_ref = utils.build_signal_ramp(0,90,0,ramp_1, ramp_2, ramp_3, ramp_4)
-
-    elif ref_mode == "sin":
-    
-        name = "sin"
-    
-        f = 1.0/10.0
-    
-        sin_1 = SinMetaSignal(3,10,1,1/f,20)
-        sin_2 = SinMetaSignal(63,10,1,1/f,20)
-        pos_x_ref = utils.build_signal_sin(0,27,0,sin_1, sin_2)
-
-        sin_1 = SinMetaSignal(23,10,1,1/f,20)
-        sin_2 = SinMetaSignal(63,10,1,1/f,20)
-        pos_y_ref = utils.build_signal_sin(0,90,0,sin_1, sin_2)
-
-        sin_1 = SinMetaSignal(43,10,1,1/f,20)
-        sin_2 = SinMetaSignal(63,10,1,1/f,20)
-        pos_z_ref = utils.build_signal_sin(0,90,3,sin_1, sin_2)
-    
-        sin_1 = SinMetaSignal(3,60*math.pi/180,1,1/f,20)
-        sin_2 = SinMetaSignal(23,60*math.pi/180,1,1/f,20)
-        sin_3 = SinMetaSignal(43,60*math.pi/180,1,1/f,20)
-        sin_4 = SinMetaSignal(63,60*math.pi/180,1,1/f,20)
-        yaw_ref = utils.build_signal_sin(0,90,0,sin_1, sin_2, sin_3, sin_4)
-    
-    elif ref_mode == "hover":
-      
-        name = "hover"
-    
-        step_1 = StepAndRampMetaSignal(3,13,0)
-        step_2 = StepAndRampMetaSignal(63,73,0)
-        pos_x_ref = utils.build_signal_step(0,90,0,step_1, step_2)
-
-        step_1 = StepAndRampMetaSignal(3,13,0)
-        step_2 = StepAndRampMetaSignal(63,73,0)
-        pos_y_ref = utils.build_signal_step(0,90,0,step_1, step_2)
-
-        step_1 = StepAndRampMetaSignal(3,13,4)
-        step_2 = StepAndRampMetaSignal(63,73,4)
-        pos_z_ref = utils.build_signal_step(0,90,3,step_1, step_2)
-
-        step_1 = StepAndRampMetaSignal(3,13,0*math.pi/180)
-        step_2 = StepAndRampMetaSignal(63,73,0*math.pi/180)
-        yaw_ref = utils.build_signal_step(0,90,0,step_1, step_2)
-
-    else:
-
-        name = "manual"
-
-    return pos_x_ref, pos_y_ref, pos_z_ref, yaw_ref, name
\ No newline at end of file
+    if ref_mode not in load_library():
+        return None, None, None, None, "manual"
+    pos_x_ref, pos_y_ref, pos_z_ref, yaw_ref = trajectory(ref_mode).tables()
+    return pos_x_ref, pos_y_ref, pos_z_ref, yaw_ref, ref_mode
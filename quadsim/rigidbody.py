@@ -77,14 +77,65 @@ def quadrotor_dt_dynamic_quat(X, t, mass, I, invI, fb, taub):
            )
 
     return np.concatenate([ d_pos, d_q, d_ve, d_omegab ])
-##########################################################    
+##########################################################
+
+def quadrotor_dt_dynamic_quat_out(X, mass, I, invI, fb, taub, out):
+    # Same as quadrotor_dt_dynamic_quat, but writes the result into out
+    # and does the arithmetic on plain floats. I and invI are nested lists
+    # ( I.tolist() ). Used by the fixed step integrators of rigidbody.
+
+    _, _, _, q0, q1, q2, q3, vx, vy, vz, wx, wy, wz = X.tolist()
+    nq = math.sqrt(q0*q0 + q1*q1 + q2*q2 + q3*q3)
+    q0 /= nq; q1 /= nq; q2 /= nq; q3 /= nq
+
+    out[0] = vx
+    out[1] = vy
+    out[2] = vz
+
+    out[3] = 0.5*(-q1*wx - q2*wy - q3*wz)
+    out[4] = 0.5*( q0*wx - q3*wy + q2*wz)
+    out[5] = 0.5*( q3*wx + q0*wy - q1*wz)
+    out[6] = 0.5*(-q2*wx + q1*wy + q0*wz)
+
+    # dve/dt = 1/m*Rbe*fb + g
+    fx = fb[0]; fy = fb[1]; fz = fb[2]
+    out[7] = 2*((q0*q0+q1*q1-0.5)*fx + (q1*q2-q0*q3)*fy + (q1*q3+q0*q2)*fz)/mass
+    out[8] = 2*((q1*q2+q0*q3)*fx + (q0*q0+q2*q2-0.5)*fy + (q2*q3-q0*q1)*fz)/mass
+    out[9] = 2*((q1*q3-q0*q2)*fx + (q2*q3+q0*q1)*fy + (q0*q0+q3*q3-0.5)*fz)/mass - envir.g
+
+    # domegab/dt = I^(-1)*(-skew(omegab)*I*omegabb + taub)
+    Iwx = I[0][0]*wx + I[0][1]*wy + I[0][2]*wz
+    Iwy = I[1][0]*wx + I[1][1]*wy + I[1][2]*wz
+    Iwz = I[2][0]*wx + I[2][1]*wy + I[2][2]*wz
+    mx = Iwy*wz - Iwz*wy + taub[0]
+    my = Iwz*wx - Iwx*wz + taub[1]
+    mz = Iwx*wy - Iwy*wx + taub[2]
+    out[10] = invI[0][0]*mx + invI[0][1]*my + invI[0][2]*mz
+    out[11] = invI[1][0]*mx + invI[1][1]*my + invI[1][2]*mz
+    out[12] = invI[2][0]*mx + invI[2][1]*my + invI[2][2]*mz
+
+    return out
+##########################################################
 
 class rigidbody:
-    """ Holds the states and parameters to describe a Rigid Body, 
+    """ Holds the states and parameters to describe a Rigid Body,
     and implements the kinematics  using quaternions
+
+    The integration method is selected with the integrator argument:
+        "odeint"   - scipy LSODA over [0, dt], the reference ( default )
+        "rk4"      - classic Runge-Kutta 4, one fixed step
+        "euler_si" - semi-implicit ( symplectic ) Euler, first order
+        "lie"      - quaternion exponential for the attitude, RK4 for
+                     the angular rate and trapezoidal rule for the
+                     translation; |q| = 1 is kept by construction
+    The fixed step methods compute their stages in buffers allocated once,
+    here. Each step then copies the new state out of them, one 13 vector, 
+    as pos, q, ve and omegab are views into it that callers may keep.
     """
-    
-    def __init__(self,pos,q,ve,omegab,ab,mass,I):
+
+    integrators = ("odeint", "rk4", "euler_si", "lie")
+
+    def __init__(self,pos,q,ve,omegab,ab,mass,I,integrator="odeint"):
     
         self.pos = pos   
         """ Position vector, float in R3, meters """
@@ -95,13 +146,12 @@ class rigidbody:
         self.rotmb2e = utils.quat2rotm(q)
         """ the rotation matrix """
         
-        self.rpy = utils.rotm2rpy(utils.quat2rotm(self.q),1) 
-        
         self.ve = ve 
         """ velocity vector in earth frame, float in R3, m/s """     
        
-        self.vb = np.transpose(self.rotmb2e)@self.ve
-        """ velocity vector in body frame, float in R3, m/s """     
+        # derived quantities, computed on first read after each step 
+        self._rpy = None
+        self._vb = None
        
         self.omegab = omegab 
         """ angular velocity vector, float in R3, rad/s"""
@@ -133,27 +183,308 @@ class rigidbody:
         self.d_q = np.zeros(4)
         self.d_ve = np.zeros(3)
         self.d_omegab = np.zeros(3)
-        
+
+        if integrator not in self.integrators:
+            raise ValueError("Unknown integrator: {}".format(integrator))
+        self.integrator = integrator
+        """ Integration method, one of rigidbody.integrators """
+
+        # work buffers of the fixed step integrators
+        self._Il = self.I.tolist()
+        self._invIl = self.invI.tolist()
+        self._X = np.zeros(13)
+        self._Y = np.zeros(13)
+        self._Xs = np.zeros(13)
+        self._k = np.zeros((4,13))
+
+    @property
+    def rpy(self):
+        """ Euler angles ( xyz ), in rad, from rotmb2e """
+        if self._rpy is None:
+            self._rpy = utils.rotm2rpy(self.rotmb2e)
+        return self._rpy
+
+    @rpy.setter
+    def rpy(self, value):
+        self._rpy = value
+
+    @property
+    def vb(self):
+        """ velocity vector in body frame, float in R3, m/s """
+        if self._vb is None:
+            self._vb = np.transpose(self.rotmb2e)@self.ve
+        return self._vb
+
+    @vb.setter
+    def vb(self, value):
+        self._vb = value
+
+    def _step_rk4(self, dt, fb, taub):
+        X = self._X; Y = self._Y; Xs = self._Xs; k = self._k
+        args = (self.mass, self._Il, self._invIl, fb, taub)
+
+        quadrotor_dt_dynamic_quat_out(X, *args, k[0])
+        np.multiply(k[0], 0.5*dt, out=Xs); Xs += X
+        quadrotor_dt_dynamic_quat_out(Xs, *args, k[1])
+        np.multiply(k[1], 0.5*dt, out=Xs); Xs += X
+        quadrotor_dt_dynamic_quat_out(Xs, *args, k[2])
+        np.multiply(k[2], dt, out=Xs); Xs += X
+        quadrotor_dt_dynamic_quat_out(Xs, *args, k[3])
+
+        # Y = X + dt/6*(k1 + 2*k2 + 2*k3 + k4)
+        k[1] += k[2]; k[1] *= 2; k[1] += k[0]; k[1] += k[3]
+        np.multiply(k[1], dt/6.0, out=Y); Y += X
+
+    def _step_euler_si(self, dt, fb, taub):
+        # velocities first, then attitude and position with the new velocities
+        X = self._X; Y = self._Y; Xs = self._Xs; k = self._k
+        args = (self.mass, self._Il, self._invIl, fb, taub)
+
+        quadrotor_dt_dynamic_quat_out(X, *args, k[0])
+        np.multiply(k[0], dt, out=Y); Y += X
+
+        Xs[:] = X; Xs[10:13] = Y[10:13]
+        quadrotor_dt_dynamic_quat_out(Xs, *args, k[1])
+        np.multiply(k[1][3:7], dt, out=Y[3:7]); Y[3:7] += X[3:7]
+        np.multiply(Y[7:10], dt, out=Y[0:3]); Y[0:3] += X[0:3]
+
+    def _step_lie(self, dt, fb, taub):
+        X = self._X; Y = self._Y; Xs = self._Xs; k = self._k
+        args = (self.mass, self._Il, self._invIl, fb, taub)
+
+        # angular rate, RK4 on the Euler equation only
+        Xs[:] = X
+        w = Xs[10:13]
+        quadrotor_dt_dynamic_quat_out(Xs, *args, k[0])
+        np.multiply(k[0][10:13], 0.5*dt, out=w); w += X[10:13]
+        quadrotor_dt_dynamic_quat_out(Xs, *args, k[1])
+        np.multiply(k[1][10:13], 0.5*dt, out=w); w += X[10:13]
+        quadrotor_dt_dynamic_quat_out(Xs, *args, k[2])
+        np.multiply(k[2][10:13], dt, out=w); w += X[10:13]
+        quadrotor_dt_dynamic_quat_out(Xs, *args, k[3])
+        k[1] += k[2]; k[1] *= 2; k[1] += k[0]; k[1] += k[3]
+        np.multiply(k[1][10:13], dt/6.0, out=Y[10:13]); Y[10:13] += X[10:13]
+
+        # attitude, q(k+1) = q(k) * exp(0.5*omega_mid*dt)
+        q0, q1, q2, q3 = X[3:7].tolist()
+        wx, wy, wz = X[10:13].tolist()
+        wx1, wy1, wz1 = Y[10:13].tolist()
+        wx = 0.5*(wx + wx1); wy = 0.5*(wy + wy1); wz = 0.5*(wz + wz1)
+        wn = math.sqrt(wx*wx + wy*wy + wz*wz)
+        c = math.cos(0.5*wn*dt)
+        s = 0.5*dt if wn*dt < 1e-12 else math.sin(0.5*wn*dt)/wn
+        ex = s*wx; ey = s*wy; ez = s*wz
+        Y[3] = q0*c - q1*ex - q2*ey - q3*ez
+        Y[4] = q1*c + q0*ex + q2*ez - q3*ey
+        Y[5] = q2*c + q0*ey - q1*ez + q3*ex
+        Y[6] = q3*c + q0*ez + q1*ey - q2*ex
+
+        # translation, trapezoidal rule with the start and end attitude
+        Y[0:3] = X[0:3]; Y[7:10] = X[7:10]
+        quadrotor_dt_dynamic_quat_out(Y, *args, k[1])
+        k[1] += k[0]
+        np.multiply(k[1][7:10], 0.5*dt, out=Xs[7:10]); Y[7:10] += Xs[7:10]
+        np.add(X[7:10], Y[7:10], out=Xs[0:3]); Xs[0:3] *= 0.5*dt
+        Y[0:3] += Xs[0:3]
+
     def run_quadrotor_dynamic_quat(self,dt,fb,taub):
         """ Dynamic/Differential equations for rigid body motion/flight """
-    
-        # ODE Integration
-        X = np.concatenate([self.pos, self.q, self.ve, self.omegab])
-        Y = odeint(quadrotor_dt_dynamic_quat,X,np.array([0, dt]),args=(self.mass,self.I,self.invI,fb,taub,))
-        Y = Y[1] # Y[0] = X(t=t0) 
+
+        if self.integrator == "odeint":
+            # ODE Integration
+            X = np.concatenate([self.pos, self.q, self.ve, self.omegab])
+            Y = odeint(quadrotor_dt_dynamic_quat,X,np.array([0, dt]),args=(self.mass,self.I,self.invI,fb,taub,))
+            Y = Y[1] # Y[0] = X(t=t0)
+        else:
+            # Fixed step integration in the work buffers
+            X = self._X
+            X[0:3] = self.pos; X[3:7] = self.q; X[7:10] = self.ve; X[10:13] = self.omegab
+            if self.integrator == "rk4":
+                self._step_rk4(dt, fb, taub)
+            elif self.integrator == "euler_si":
+                self._step_euler_si(dt, fb, taub)
+            else:
+                self._step_lie(dt, fb, taub)
+            # the one allocation of the step: pos, q, ve, omegab are views 
+            # into Y and may be kept by reference, so not the work buffer
+            Y = self._Y.copy()
 
         # unpack the vector state
         self.pos = Y[1-1:3]
         self.q = Y[4-1:7] / np.linalg.norm(Y[4-1:7])  # update and normalize 
         self.rotmb2e = utils.quat2rotm(self.q)
-        self.rpy = utils.rotm2rpy(self.rotmb2e)
         self.ve = Y[8-1:10]
-        self.vb = np.transpose(self.rotmb2e)@self.ve
         self.omegab = Y[11-1:13]
         
+        # rpy and vb are recomputed only if read 
+        self._rpy = None
+        self._vb = None
+        
         # Get the acceleration, need it for accelerometer sensors
-        dvemg = quadrotor_dt_dynamic_quat(Y, 0, self.mass, self.I, self.invI, fb, taub)[7:10] - np.array([0,0,-envir.g])  # minus gravity 
-        self.abmg = np.transpose(self.rotmb2e)@(dvemg)
+        # Rbe^T*(dve/dt - g) = Rbe^T*Rbe*fb/m = fb/m, no need to 
+        # evaluate the dynamics again at the new state 
+        self.abmg = np.asarray(fb, dtype=float)/self.mass
+##########################################################       
+
+def quadrotor_dt_dynamic_quat_batch(X, t, mass, I, invI, fb, taub):
+    # Vectorized version of quadrotor_dt_dynamic_quat
+    # X = [pos, qeb, ve, omegab], one row per vehicle, shape (N,13)
+    # mass (N,), I and invI (N,3,3), fb and taub (N,3)
+
+    q = X[:,3:7] / np.linalg.norm(X[:,3:7],axis=1)[:,None]  # normalize 
+    ve = X[:,7:10]
+    omegab = X[:,10:13]
+    
+    d_X = np.empty_like(X)
+    
+    d_X[:,0:3] = ve
+    
+    # same unfolded form as in quadrotor_dt_dynamic_quat
+    d_X[:,3] = 0.5*(-q[:,1]*omegab[:,0] - q[:,2]*omegab[:,1] - q[:,3]*omegab[:,2])
+    d_X[:,4] = 0.5*( q[:,0]*omegab[:,0] - q[:,3]*omegab[:,1] + q[:,2]*omegab[:,2])
+    d_X[:,5] = 0.5*( q[:,3]*omegab[:,0] + q[:,0]*omegab[:,1] - q[:,1]*omegab[:,2])
+    d_X[:,6] = 0.5*(-q[:,2]*omegab[:,0] + q[:,1]*omegab[:,1] + q[:,0]*omegab[:,2])
+
+    # dve/dt = 1/m*Rbe*fb + g
+    Rbe = utils.quat2rotm_batch(q)
+    d_X[:,7:10] = np.einsum('nij,nj->ni', Rbe, fb) / mass[:,None]
+    d_X[:,9] -= envir.g
+    
+    # domegab/dt = I^(-1)*(-skew(omegab)*I*omegabb + taub)
+    Iomegab = np.einsum('nij,nj->ni', I, omegab)
+    d_X[:,10:13] = np.einsum('nij,nj->ni', invI, np.cross(Iomegab, omegab) + taub)
+    
+    return d_X
+##########################################################    
+
+# Dormand-Prince 5(4) tableau, used by the rk45 method of RigidBodyBatch
+_DP_C = np.array([0, 1/5, 3/10, 4/5, 8/9, 1, 1])
+_DP_A = [ [],
+          [1/5],
+          [3/40, 9/40],
+          [44/45, -56/15, 32/9],
+          [19372/6561, -25360/2187, 64448/6561, -212/729],
+          [9017/3168, -355/33, 46732/5247, 49/176, -5103/18656],
+          [35/384, 0, 500/1113, 125/192, -2187/6784, 11/84] ]
+_DP_B = np.array([35/384, 0, 500/1113, 125/192, -2187/6784, 11/84, 0])
+_DP_E = _DP_B - np.array([5179/57600, 0, 7571/16695, 393/640, 
+                          -92097/339200, 187/2100, 1/40])
+
+class RigidBodyBatch:
+    """ Holds the states of N rigid bodies as arrays ( struct of arrays ) 
+    and advances all of them at once using quaternions. Same equations 
+    as the rigidbody class, for Monte Carlo runs over many airframes. 
+    """
+    
+    def __init__(self, pos, q, ve, omegab, mass, I):
+        """ pos, ve, omegab are (N,3), q is (N,4). mass is a scalar or (N,),
+        I is (3,3) or (N,3,3) """
+        
+        q = np.asarray(q, dtype=float)
+        self.N = q.shape[0]
+        """ Number of vehicles """
+        
+        self.X = np.concatenate([ np.asarray(pos, dtype=float), 
+                                  q / np.linalg.norm(q,axis=1)[:,None], 
+                                  np.asarray(ve, dtype=float), 
+                                  np.asarray(omegab, dtype=float) ], axis = 1)
+        """ State matrix, one row [pos, q, ve, omegab] per vehicle """
+        
+        self.mass = np.broadcast_to(np.asarray(mass, dtype=float), (self.N,)).copy()
+        """ body masses, in kg """
+        
+        self.I = np.broadcast_to(np.asarray(I, dtype=float), (self.N,3,3)).copy()
+        """ Inertia matrices in the body frame """
+        
+        self.invI = np.linalg.inv(self.I)
+        
+        self.rotmb2e = utils.quat2rotm_batch(self.q)
+        """ the rotation matrices, (N,3,3) """
+        
+        self.abmg = np.zeros((self.N,3))
+        """ body frame accelerations ( without gravity ) """
+    
+    # views into the state matrix 
+    @property
+    def pos(self):
+        return self.X[:,0:3]
+    
+    @property
+    def q(self):
+        return self.X[:,3:7]
+    
+    @property
+    def ve(self):
+        return self.X[:,7:10]
+    
+    @property
+    def omegab(self):
+        return self.X[:,10:13]
+    
+    @property
+    def vb(self):
+        """ velocity vectors in body frame, (N,3) """
+        return np.einsum('nji,nj->ni', self.rotmb2e, self.ve)
+    
+    @property
+    def rpy(self):
+        """ Euler angles, (N,3) """
+        return utils.rotm2rpy(self.rotmb2e)
+    
+    def _rk4_step(self, X, h, fb, taub):
+        args = (self.mass, self.I, self.invI, fb, taub)
+        k1 = quadrotor_dt_dynamic_quat_batch(X, 0, *args)
+        k2 = quadrotor_dt_dynamic_quat_batch(X + 0.5*h*k1, 0, *args)
+        k3 = quadrotor_dt_dynamic_quat_batch(X + 0.5*h*k2, 0, *args)
+        k4 = quadrotor_dt_dynamic_quat_batch(X + h*k3, 0, *args)
+        return X + h/6.0*(k1 + 2*k2 + 2*k3 + k4)
+    
+    def _dopri_step(self, X, h, fb, taub):
+        args = (self.mass, self.I, self.invI, fb, taub)
+        K = [ quadrotor_dt_dynamic_quat_batch(X, 0, *args) ]
+        for i in range(1,7):
+            Xi = X + h*sum(a*k for a, k in zip(_DP_A[i], K) if a != 0)
+            K.append(quadrotor_dt_dynamic_quat_batch(Xi, 0, *args))
+        Y = X + h*sum(b*k for b, k in zip(_DP_B, K) if b != 0)
+        err = h*sum(e*k for e, k in zip(_DP_E, K))
+        return Y, err
+        
+    def run_quadrotor_dynamic_quat(self, dt, fb, taub, method = "rk4", 
+                                   rtol = 1e-6, atol = 1e-9):
+        """ Advances all the vehicles by dt. fb and taub are (3,) or (N,3).
+        method is "rk4" ( one fixed step ) or "rk45" ( Dormand-Prince with 
+        adaptive sub-steps inside dt, common step size for the whole batch )
+        """
+        
+        fb = np.broadcast_to(np.asarray(fb, dtype=float), (self.N,3))
+        taub = np.broadcast_to(np.asarray(taub, dtype=float), (self.N,3))
+        
+        if method == "rk4":
+            X = self._rk4_step(self.X, dt, fb, taub)
+        elif method == "rk45":
+            X = self.X
+            t = 0.0
+            h = dt
+            while t < dt:
+                h = min(h, dt - t)
+                Y, err = self._dopri_step(X, h, fb, taub)
+                scale = atol + rtol*np.maximum(np.abs(X), np.abs(Y))
+                err_norm = np.max(np.sqrt(np.mean((err/scale)**2, axis=1)))
+                if err_norm <= 1.0:
+                    t += h
+                    X = Y
+                h = h*min(5.0, max(0.2, 0.9*(err_norm + 1e-16)**-0.2))
+        else:
+            raise ValueError("Unknown integration method: {}".format(method))
+        
+        # normalize the quaternions 
+        X[:,3:7] /= np.linalg.norm(X[:,3:7],axis=1)[:,None]
+        self.X = X
+        self.rotmb2e = utils.quat2rotm_batch(self.q)
+        
+        # Get the acceleration, need it for accelerometer sensors
+        # Rbe^T*(dve/dt - g) reduces to fb/m 
+        self.abmg = fb / self.mass[:,None]
 ##########################################################       
 
 # ************************************************
@@ -284,8 +615,9 @@ def motion3d_ros(X, t, u):
 
     return np.concatenate([ d_pos, d_rpy, d_vb, d_ob, d_ae ])
     
-def motion3d_ros_dFXdX(X,u):
-    # X = [ pos, euler, vb, ob, ae ]
+def _motion3d_ros_dFXdX_rows(X, n):
+    # X = [ pos, euler, vb, ob, ae, ... ], the first 9 rows of dFXdX, the 
+    # other rows ( ob, ae and any states after ) are zero
  
     # util exprs
     roll = X[3];  pitch = X[4]; yaw = X[5]
@@ -301,47 +633,86 @@ def motion3d_ros_dFXdX(X,u):
     cy = cos(yaw)
     cpi = 1.0/cp
     tp = sp/cp
- 
-    # From symbolic
-    return np.array([
-[0 , 0 , 0 , vby*(sp*cr*cy + sr*sy) + vbz*(-sp*sr*cy + sy*cr) , -vbx*sp*cy + vby*sr*cp*cy + vbz*cp*cr*cy , -vbx*sy*cp + vby*(-sp*sr*sy - cr*cy) + vbz*(-sp*sy*cr + sr*cy) , cp*cy , sp*sr*cy - sy*cr , sp*cr*cy + sr*sy , 0 , 0 , 0 , 0 , 0 , 0  ], 
-[0 , 0 , 0 , vby*(sp*sy*cr - sr*cy) + vbz*(-sp*sr*sy - cr*cy) , -vbx*sp*sy + vby*sr*sy*cp + vbz*sy*cp*cr , vbx*cp*cy + vby*(sp*sr*cy - sy*cr) + vbz*(sp*cr*cy + sr*sy) , sy*cp , sp*sr*sy + cr*cy , sp*sy*cr - sr*cy , 0 , 0 , 0 , 0 , 0 , 0  ] , 
-[0 , 0 , 0 , vby*cp*cr - vbz*sr*cp , -vbx*cp - vby*sp*sr - vbz*sp*cr , 0 , -sp , sr*cp , cp*cr , 0 , 0 , 0 , 0 , 0 , 0  ] , 
-[0 , 0 , 0 , oy*tp*cr - oz*tp*sr , oy*tp**2*sr + oy*sr + oz*tp**2*cr + oz*cr , 0 , 0 , 0 , 0 , 1 , tp*sr , tp*cr , 0 , 0 , 0  ] , 
-[0 , 0 , 0 , -oy*sr - oz*cr , 0 , 0 , 0 , 0 , 0 , 0 , cr , -sr , 0 , 0 , 0 ], 
-[0 , 0 , 0 , oy*cr*cpi - oz*sr*cpi , oy*tp*sr*cpi + oz*tp*cr*cpi , 0 , 0 , 0 , 0 , 0 , sr*cpi , cr*cpi , 0 , 0 , 0 ], 
-[0 , 0 , 0 , 0 , -ax*sp*cy - ay*sp*sy - az*cp , -ax*sy*cp + ay*cp*cy , 0 , oz , -oy , 0 , -vbz , vby , cp*cy , sy*cp , -sp ], 
-[0 , 0 , 0 , ax*(sp*cr*cy + sr*sy) + ay*(sp*sy*cr - sr*cy) + az*cp*cr , ax*sr*cp*cy + ay*sr*sy*cp - az*sp*sr , ax*(-sp*sr*sy - cr*cy) + ay*(sp*sr*cy - sy*cr) , -oz , 0 , ox , vbz , 0 , -vbx , sp*sr*cy - sy*cr , sp*sr*sy + cr*cy , sr*cp ], 
-[0 , 0 , 0 , ax*(-sp*sr*cy + sy*cr) + ay*(-sp*sr*sy - cr*cy) - az*sr*cp , ax*cp*cr*cy + ay*sy*cp*cr - az*sp*cr , ax*(-sp*sy*cr + sr*cy) + ay*(sp*cr*cy + sr*sy) , oy , -ox , 0 , -vby , vbx , 0 , sp*cr*cy + sr*sy , sp*sy*cr - sr*cy , cp*cr  ], 
-[0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0  ], 
-[0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0  ], 
-[0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0  ], 
-[0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0  ], 
-[0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0  ], 
-[0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0  ] 
-    ])
+
+    # From symbolic, only the non-zero entries 
+    F = np.zeros((9,n))
+    F[0,3:9] = [ vby*(sp*cr*cy + sr*sy) + vbz*(-sp*sr*cy + sy*cr) , -vbx*sp*cy + vby*sr*cp*cy + vbz*cp*cr*cy , -vbx*sy*cp + vby*(-sp*sr*sy - cr*cy) + vbz*(-sp*sy*cr + sr*cy) , cp*cy , sp*sr*cy - sy*cr , sp*cr*cy + sr*sy ]
+    F[1,3:9] = [ vby*(sp*sy*cr - sr*cy) + vbz*(-sp*sr*sy - cr*cy) , -vbx*sp*sy + vby*sr*sy*cp + vbz*sy*cp*cr , vbx*cp*cy + vby*(sp*sr*cy - sy*cr) + vbz*(sp*cr*cy + sr*sy) , sy*cp , sp*sr*sy + cr*cy , sp*sy*cr - sr*cy ]
+    F[2,3:9] = [ vby*cp*cr - vbz*sr*cp , -vbx*cp - vby*sp*sr - vbz*sp*cr , 0 , -sp , sr*cp , cp*cr ]
+    F[3,3:5] = [ oy*tp*cr - oz*tp*sr , oy*tp**2*sr + oy*sr + oz*tp**2*cr + oz*cr ]
+    F[3,9:12] = [ 1 , tp*sr , tp*cr ]
+    F[4,3] = -oy*sr - oz*cr
+    F[4,10:12] = [ cr , -sr ]
+    F[5,3:5] = [ oy*cr*cpi - oz*sr*cpi , oy*tp*sr*cpi + oz*tp*cr*cpi ]
+    F[5,10:12] = [ sr*cpi , cr*cpi ]
+    F[6:9,3:6] = _dRbeTa_drpy(sr, cr, sp, cp, sy, cy, ax, ay, az)
+    F[6,7:15] = [ oz , -oy , 0 , -vbz , vby , cp*cy , sy*cp , -sp ]
+    F[7,6:15] = [ -oz , 0 , ox , vbz , 0 , -vbx , sp*sr*cy - sy*cr , sp*sr*sy + cr*cy , sr*cp ]
+    F[8,6:15] = [ oy , -ox , 0 , -vby , vbx , 0 , sp*cr*cy + sr*sy , sp*sy*cr - sr*cy , cp*cr ]
+    return F
+
+def _dRbeTa_drpy(sr, cr, sp, cp, sy, cy, ax, ay, az):
+    # d(Reb'*a)/d(euler), shared by dFXdX and the imu dhdx
+    return [
+[ 0 , -ax*sp*cy - ay*sp*sy - az*cp , -ax*sy*cp + ay*cp*cy ],
+[ ax*(sp*cr*cy + sr*sy) + ay*(sp*sy*cr - sr*cy) + az*cp*cr , ax*sr*cp*cy + ay*sr*sy*cp - az*sp*sr , ax*(-sp*sr*sy - cr*cy) + ay*(sp*sr*cy - sy*cr) ],
+[ ax*(-sp*sr*cy + sy*cr) + ay*(-sp*sr*sy - cr*cy) - az*sr*cp , ax*cp*cr*cy + ay*sy*cp*cr - az*sp*cr , ax*(-sp*sy*cr + sr*cy) + ay*(sp*cr*cy + sr*sy) ] ]
+
+def _motion3d_ros_meas_imu_dhdx_fill(X, H):
+    # writes the state dependent block of the imu Jacobian into H
+    roll = X[3];  pitch = X[4]; yaw = X[5]
+    ax = X[12]; ay = X[13]; az = X[14]
+
+    sr = sin(roll)
+    cr = cos(roll)
+    sp = sin(pitch)
+    cp = cos(pitch)
+    sy = sin(yaw)
+    cy = cos(yaw)
+
+    H[3:6,3:6] = _dRbeTa_drpy(sr, cr, sp, cp, sy, cy, ax, ay, az + 9.81)
+    H[3:6,12:15] = [
+[ cp*cy , sy*cp , -sp ],
+[ sp*sr*cy - sy*cr , sp*sr*sy + cr*cy , sr*cp ],
+[ sp*cr*cy + sr*sy , sp*sy*cr - sr*cy , cp*cr ] ]
+    return H
+
+def _read_only(A):
+    A.flags.writeable = False
+    return A
+
+motion3d_ros_F_rows = np.arange(9)
+""" Rows of motion3d_ros_dFXdX that can be non-zero, see ekf.EKF F_rows """
+
+def motion3d_ros_dFXdX(X,u):
+    # X = [ pos, euler, vb, ob, ae ]
+    F = np.zeros((15,15))
+    F[0:9] = _motion3d_ros_dFXdX_rows(X, 15)
+    return F
+
+def motion3d_ros_dFXdX_rows(X,u):
+    """ Rows motion3d_ros_F_rows of motion3d_ros_dFXdX, 9x15 """
+    return _motion3d_ros_dFXdX_rows(X, 15)
 
 def motion3d_ros_meas_pos(X):
     H1 = X[0:3]
     return H1
 
+_motion3d_ros_meas_pos_H = _read_only(np.eye(3,15))
+
 def motion3d_ros_meas_pos_dhdx(X):
-    return np.array([
-[1 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 ], 
-[0 , 1 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 ], 
-[0 , 0 , 1 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 ]       
-    ])
+    """ Constant, the returned array is shared and read-only """
+    return _motion3d_ros_meas_pos_H
 
 def motion3d_ros_meas_vb(X):
     H2 = X[6:9]
     return H2 
 
+_motion3d_ros_meas_vb_H = _read_only(np.eye(3,15,6))
+
 def motion3d_ros_meas_vb_dhdx(X):
-    return np.array([
-[0 , 0 , 0 , 0 , 0 , 0 , 1 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 ], 
-[0 , 0 , 0 , 0 , 0 , 0 , 0 , 1 , 0 , 0 , 0 , 0 , 0 , 0 , 0 ], 
-[0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 1 , 0 , 0 , 0 , 0 , 0 , 0 ] 
-    ])
+    """ Constant, the returned array is shared and read-only """
+    return _motion3d_ros_meas_vb_H
 
 def motion3d_ros_meas_imu(X):
     # utils 
@@ -353,30 +724,65 @@ def motion3d_ros_meas_imu(X):
     H4 = Reb.transpose()@(ae-np.array([0,0,-9.81]))
     return np.concatenate([ H3, H4]) 
 
+_motion3d_ros_meas_imu_H = _read_only(np.eye(6,15,9)*np.repeat([1,0],3)[:,None])
+""" Constant part of motion3d_ros_meas_imu_dhdx, d(ob)/d(ob) """
+
 def motion3d_ros_meas_imu_dhdx(X):
     # X = [ pos, euler, vb, ob, ae ]
- 
-    # util exprs
-    roll = X[3];  pitch = X[4]; yaw = X[5]
-    vbx = X[6]; vby = X[7];  vbz = X[8]
-    ox = X[9]; oy = X[10]; oz = X[11]
-    ax = X[12]; ay = X[13]; az = X[14]
+    return _motion3d_ros_meas_imu_dhdx_fill(X, _motion3d_ros_meas_imu_H.copy())
+
+# *********************************************** 
+# Batched versions of the motion3d_ros models, X holds one state per row,
+# used by the SPKF in batch mode to propagate all sigma points at once
+
+def motion3d_ros_batch(X, t, u):
+    # X = [pos,euler,vb,ob,ae, ...], the derivative of the states after ae 
+    # ( e.g. the biases ) is zero, so it also serves motion3d_ros_biases
+
+    Reb = utils.rpy2rotm_batch(X[:,3:6])
+
+    vb = X[:,6:9]
+    omegab = X[:,9:12]
+    ae = X[:,12:15]
+
+    cr = np.cos(X[:,3])
+    sr = np.sin(X[:,3])
+    cp = np.cos(X[:,4])
+    sp = np.sin(X[:,4])
     
-    sr = sin(roll)
-    cr = cos(roll)
-    sp = sin(pitch)
-    cp = cos(pitch)
-    sy = sin(yaw)
-    cy = cos(yaw)
+    d_X = np.zeros(X.shape)
+    d_X[:,0:3] = np.einsum('nij,nj->ni', Reb, vb)
+    # Einv@omegab, unfolded
+    sroy_croz = sr*omegab[:,1] + cr*omegab[:,2]
+    d_X[:,3] = omegab[:,0] + sp/cp*sroy_croz
+    d_X[:,4] = cr*omegab[:,1] - sr*omegab[:,2]
+    d_X[:,5] = sroy_croz/cp
+    d_X[:,6:9] = np.cross(vb, omegab) + np.einsum('nji,nj->ni', Reb, ae)
+    
+    return d_X
 
-    return np.array([
-[0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 1 , 0 , 0 , 0 , 0 , 0 ], 
-[0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 1 , 0 , 0 , 0 , 0 ], 
-[0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 1 , 0 , 0 , 0 ], 
-[0 , 0 , 0 , 0 , -ax*sp*cy - ay*sp*sy - (az + 9.81)*cp , -ax*sy*cp + ay*cp*cy , 0 , 0 , 0 , 0 , 0 , 0 , cp*cy , sy*cp , -sp ], 
-[0 , 0 , 0 , ax*(sp*cr*cy + sr*sy) + ay*(sp*sy*cr - sr*cy) + (az + 9.81)*cp*cr , ax*sr*cp*cy + ay*sr*sy*cp - (az + 9.81)*sp*sr , ax*(-sp*sr*sy - cr*cy) + ay*(sp*sr*cy - sy*cr) , 0 , 0 , 0 , 0 , 0 , 0 , sp*sr*cy - sy*cr , sp*sr*sy + cr*cy , sr*cp  ], 
-[0 , 0 , 0 , ax*(-sp*sr*cy + sy*cr) + ay*(-sp*sr*sy - cr*cy) - (az + 9.81)*sr*cp , ax*cp*cr*cy + ay*sy*cp*cr - (az + 9.81)*sp*cr , ax*(-sp*sy*cr + sr*cy) + ay*(sp*cr*cy + sr*sy) , 0 , 0 , 0 , 0 , 0 , 0 , sp*cr*cy + sr*sy , sp*sy*cr - sr*cy , cp*cr ] 
-    ])
+def motion3d_ros_meas_pos_batch(X):
+    return X[:,0:3]
+
+def motion3d_ros_meas_vb_batch(X):
+    return X[:,6:9]
+
+def motion3d_ros_meas_imu_batch(X):
+    Reb = utils.rpy2rotm_batch(X[:,3:6])
+    H = np.empty((X.shape[0],6))
+    H[:,0:3] = X[:,9:12]
+    H[:,3:6] = np.einsum('nji,nj->ni', Reb, X[:,12:15]-np.array([0,0,-9.81]))
+    return H
+
+motion3d_ros_biases_batch = motion3d_ros_batch
+motion3d_ros_biases_meas_pos_batch = motion3d_ros_meas_pos_batch
+motion3d_ros_biases_meas_vb_batch = motion3d_ros_meas_vb_batch
+
+def motion3d_ros_biases_meas_imu_batch(X):
+    H = motion3d_ros_meas_imu_batch(X)
+    H[:,0:3] += X[:,15:18]
+    H[:,3:6] += X[:,18:21]
+    return H
 
 # *********************************************** 
  
@@ -405,70 +811,38 @@ def motion3d_ros_biases(X, t, u):
     
     return np.concatenate([ d_pos, d_rpy, d_vb, d_ob, d_ae, d_bg, d_ba ])
     
+motion3d_ros_biases_F_rows = np.arange(9)
+""" Rows of motion3d_ros_biases_dFXdX that can be non-zero, see ekf.EKF F_rows """
+
 def motion3d_ros_biases_dFXdX(X,u):
     # X = [pos,euler,vb,ob,ae,bg,ba]
- 
-    # util exprs
-    roll = X[3];  pitch = X[4]; yaw = X[5]
-    vbx = X[6]; vby = X[7];  vbz = X[8]
-    ox = X[9]; oy = X[10]; oz = X[11]
-    ax = X[12]; ay = X[13]; az = X[14]
-    
-    sr = sin(roll)
-    cr = cos(roll)
-    sp = sin(pitch)
-    cp = cos(pitch)
-    sy = sin(yaw)
-    cy = cos(yaw)
-    cpi = 1.0/cp
-    tp = sp/cp
- 
-    # From symbolic
-    return np.array([
-[0 , 0 , 0 , vby*(sp*cr*cy + sr*sy) + vbz*(-sp*sr*cy + sy*cr) , -vbx*sp*cy + vby*sr*cp*cy + vbz*cp*cr*cy , -vbx*sy*cp + vby*(-sp*sr*sy - cr*cy) + vbz*(-sp*sy*cr + sr*cy) , cp*cy , sp*sr*cy - sy*cr , sp*cr*cy + sr*sy , 0 , 0 , 0 , 0 , 0 , 0, 0 , 0 , 0 , 0 , 0 , 0  ], 
-[0 , 0 , 0 , vby*(sp*sy*cr - sr*cy) + vbz*(-sp*sr*sy - cr*cy) , -vbx*sp*sy + vby*sr*sy*cp + vbz*sy*cp*cr , vbx*cp*cy + vby*(sp*sr*cy - sy*cr) + vbz*(sp*cr*cy + sr*sy) , sy*cp , sp*sr*sy + cr*cy , sp*sy*cr - sr*cy , 0 , 0 , 0 , 0 , 0 , 0, 0 , 0 , 0 , 0 , 0 , 0  ] , 
-[0 , 0 , 0 , vby*cp*cr - vbz*sr*cp , -vbx*cp - vby*sp*sr - vbz*sp*cr , 0 , -sp , sr*cp , cp*cr , 0 , 0 , 0 , 0 , 0 , 0, 0 , 0 , 0 , 0 , 0 , 0  ] , 
-[0 , 0 , 0 , oy*tp*cr - oz*tp*sr , oy*tp**2*sr + oy*sr + oz*tp**2*cr + oz*cr , 0 , 0 , 0 , 0 , 1 , tp*sr , tp*cr , 0 , 0 , 0, 0 , 0 , 0 , 0 , 0 , 0  ] , 
-[0 , 0 , 0 , -oy*sr - oz*cr , 0 , 0 , 0 , 0 , 0 , 0 , cr , -sr , 0 , 0 , 0, 0 , 0 , 0 , 0 , 0 , 0 ], 
-[0 , 0 , 0 , oy*cr*cpi - oz*sr*cpi , oy*tp*sr*cpi + oz*tp*cr*cpi , 0 , 0 , 0 , 0 , 0 , sr*cpi , cr*cpi , 0 , 0 , 0, 0 , 0 , 0 , 0 , 0 , 0 ], 
-[0 , 0 , 0 , 0 , -ax*sp*cy - ay*sp*sy - az*cp , -ax*sy*cp + ay*cp*cy , 0 , oz , -oy , 0 , -vbz , vby , cp*cy , sy*cp , -sp, 0 , 0 , 0 , 0 , 0 , 0 ], 
-[0 , 0 , 0 , ax*(sp*cr*cy + sr*sy) + ay*(sp*sy*cr - sr*cy) + az*cp*cr , ax*sr*cp*cy + ay*sr*sy*cp - az*sp*sr , ax*(-sp*sr*sy - cr*cy) + ay*(sp*sr*cy - sy*cr) , -oz , 0 , ox , vbz , 0 , -vbx , sp*sr*cy - sy*cr , sp*sr*sy + cr*cy , sr*cp, 0 , 0 , 0 , 0 , 0 , 0 ], 
-[0 , 0 , 0 , ax*(-sp*sr*cy + sy*cr) + ay*(-sp*sr*sy - cr*cy) - az*sr*cp , ax*cp*cr*cy + ay*sy*cp*cr - az*sp*cr , ax*(-sp*sy*cr + sr*cy) + ay*(sp*cr*cy + sr*sy) , oy , -ox , 0 , -vby , vbx , 0 , sp*cr*cy + sr*sy , sp*sy*cr - sr*cy , cp*cr, 0 , 0 , 0 , 0 , 0 , 0  ], 
-[0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0,  0 , 0 , 0 , 0 , 0 , 0  ], 
-[0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0,  0 , 0 , 0 , 0 , 0 , 0  ], 
-[0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0,  0 , 0 , 0 , 0 , 0 , 0  ], 
-[0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0,  0 , 0 , 0 , 0 , 0 , 0  ], 
-[0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0,  0 , 0 , 0 , 0 , 0 , 0  ], 
-[0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0,  0 , 0 , 0 , 0 , 0 , 0  ],
-[0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0,  0 , 0 , 0 , 0 , 0 , 0  ], 
-[0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0,  0 , 0 , 0 , 0 , 0 , 0  ], 
-[0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0,  0 , 0 , 0 , 0 , 0 , 0  ],
-[0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0,  0 , 0 , 0 , 0 , 0 , 0  ], 
-[0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0,  0 , 0 , 0 , 0 , 0 , 0  ], 
-[0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0,  0 , 0 , 0 , 0 , 0 , 0  ]   
-    ])
+    F = np.zeros((21,21))
+    F[0:9] = _motion3d_ros_dFXdX_rows(X, 21)
+    return F
+
+def motion3d_ros_biases_dFXdX_rows(X,u):
+    """ Rows motion3d_ros_biases_F_rows of motion3d_ros_biases_dFXdX, 9x21 """
+    return _motion3d_ros_dFXdX_rows(X, 21)
 
 def motion3d_ros_biases_meas_pos(X):
     H1 = X[0:3]
     return H1
 
+_motion3d_ros_biases_meas_pos_H = _read_only(np.eye(3,21))
+
 def motion3d_ros_biases_meas_pos_dhdx(X):
-    return np.array([
-[1 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0, 0 , 0 , 0 , 0 , 0 , 0 ], 
-[0 , 1 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0, 0 , 0 , 0 , 0 , 0 , 0 ], 
-[0 , 0 , 1 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0, 0 , 0 , 0 , 0 , 0 , 0 ]
-])
+    """ Constant, the returned array is shared and read-only """
+    return _motion3d_ros_biases_meas_pos_H
 
 def motion3d_ros_biases_meas_vb(X):
     H2 = X[6:9]
     return H2 
 
+_motion3d_ros_biases_meas_vb_H = _read_only(np.eye(3,21,6))
+
 def motion3d_ros_biases_meas_vb_dhdx(X):
-    return np.array([
-[0 , 0 , 0 , 0 , 0 , 0 , 1 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 ], 
-[0 , 0 , 0 , 0 , 0 , 0 , 0 , 1 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 ], 
-[0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 1 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 ] 
-    ])
+    """ Constant, the returned array is shared and read-only """
+    return _motion3d_ros_biases_meas_vb_H
 
 def motion3d_ros_biases_meas_imu(X):
     # X = [pos,euler,vb,ob,ae,bg,ba]
@@ -486,27 +860,11 @@ def motion3d_ros_biases_meas_imu(X):
 
     return np.concatenate([ H3, H4]) 
 
+_motion3d_ros_biases_meas_imu_H = _read_only(np.eye(6,21,15) 
+                                  + np.eye(6,21,9)*np.repeat([1,0],3)[:,None])
+""" Constant part of motion3d_ros_biases_meas_imu_dhdx, d(ob+bg)/d(ob,bg) 
+and d(ba)/d(ba) """
+
 def motion3d_ros_biases_meas_imu_dhdx(X):
     # X = [pos,euler,vb,ob,ae,bg,ba]
- 
-    # util exprs
-    roll = X[3];  pitch = X[4]; yaw = X[5]
-    vbx = X[6]; vby = X[7];  vbz = X[8]
-    ox = X[9]; oy = X[10]; oz = X[11]
-    ax = X[12]; ay = X[13]; az = X[14]
-    
-    sr = sin(roll)
-    cr = cos(roll)
-    sp = sin(pitch)
-    cp = cos(pitch)
-    sy = sin(yaw)
-    cy = cos(yaw)
-
-    return np.array([
-[0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 1 , 0 , 0 , 0 , 0 , 0 , 1 , 0 , 0 , 0 , 0 , 0 ], 
-[0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 1 , 0 , 0 , 0 , 0 , 0 , 1 , 0 , 0 , 0 , 0 ], 
-[0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 0 , 1 , 0 , 0 , 0 , 0 , 0 , 1 , 0 , 0 , 0 ], 
-[0 , 0 , 0 , 0 , -ax*sp*cy - ay*sp*sy - (az + 9.81)*cp , -ax*sy*cp + ay*cp*cy , 0 , 0 , 0 , 0 , 0 , 0 , cp*cy , sy*cp , -sp, 0 , 0 , 0 , 1 , 0 , 0 ], 
-[0 , 0 , 0 , ax*(sp*cr*cy + sr*sy) + ay*(sp*sy*cr - sr*cy) + (az + 9.81)*cp*cr , ax*sr*cp*cy + ay*sr*sy*cp - (az + 9.81)*sp*sr , ax*(-sp*sr*sy - cr*cy) + ay*(sp*sr*cy - sy*cr) , 0 , 0 , 0 , 0 , 0 , 0 , sp*sr*cy - sy*cr , sp*sr*sy + cr*cy , sr*cp, 0 , 0 , 0 , 0 , 1 , 0  ], 
-[0 , 0 , 0 , ax*(-sp*sr*cy + sy*cr) + ay*(-sp*sr*sy - cr*cy) - (az + 9.81)*sr*cp , ax*cp*cr*cy + ay*sy*cp*cr - (az + 9.81)*sp*cr , ax*(-sp*sy*cr + sr*cy) + ay*(sp*cr*cy + sr*sy) , 0 , 0 , 0 , 0 , 0 , 0 , sp*cr*cy + sr*sy , sp*sy*cr - sr*cy , cp*cr, 0 , 0 , 0 , 0 , 0 , 1 ] 
-    ])
+    return _motion3d_ros_meas_imu_dhdx_fill(X, _motion3d_ros_biases_meas_imu_H.copy())
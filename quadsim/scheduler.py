@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2021 Luminita-Cristiana Totu
+#
+# Part of the QuadrotorSim aka quadsim package
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this package, in a file called LICENSE.
+# If not, see <https://www.gnu.org/licenses/>.
+
+""" Multi-rate scheduler on an integer tick clock
+
+Every rate of the main loop ( sensors, controllers, filter predict, logging,
+visualization ) is a period of an integer number of ticks of the base clock,
+the simulation step. A task is due when tick % period == offset, so there is
+no float drift however long the run. The scheduler either answers due(name)
+for the if blocks of a script, or calls the functions of the due tasks in
+step(), timing each of them.
+
+"""
+
+__version__ = "0.1"
+__author__ = "Luminita-Cristiana Totu"
+__copyright__ = "Copyright (C) 2019 Luminita-Cristiana Totu"
+__license__ = "GNU GPLv3"
+
+import math
+import time
+
+class Task:
+    """ A periodic task of the scheduler """
+
+    def __init__(self, name, period, offset = 0, fn = None):
+
+        self.name = name
+        self.period = period
+        """ Period, in ticks """
+        self.offset = offset
+        """ Due at the ticks with tick % period == offset """
+        self.fn = fn
+        """ Function called by Scheduler.step, None for due checks only """
+
+        self.calls = 0
+        self.time = 0.0
+        """ Total time in fn, seconds """
+
+class Scheduler:
+    """ Periodic tasks on the base clock of step dt """
+
+    max_table = 100000
+    """ The due tasks of each tick of the hyperperiod ( the least common
+    multiple of the periods ) are listed once if it is at most this long """
+
+    def __init__(self, dt):
+
+        self.dt = dt
+        """ Base clock step, seconds """
+
+        self.tick = 0
+        """ Ticks since the start """
+
+        self.tasks = {}
+        """ Name -> Task, in the order they were added, also the order of
+        the calls in step """
+
+        self._table = None
+
+    @property
+    def t(self):
+        """ Time of the current tick, seconds """
+        return self.tick*self.dt
+
+    def add(self, name, dt, fn = None, offset = 0):
+        """ Adds task name of period dt ( seconds ), rounded to whole ticks.
+        With offset k the task is due k ticks after the multiples of its
+        period ( e.g. -1 for the ticks before them ) """
+        period = int(round(dt/self.dt))
+        if period < 1:
+            raise ValueError("Scheduler: %s is faster than the base clock" % name)
+        task = Task(name, period, offset % period, fn)
+        self.tasks[name] = task
+        self._table = None
+        return task
+
+    def period(self, name):
+        """ Period of task name, in ticks """
+        return self.tasks[name].period
+
+    def due(self, name):
+        """ True if task name is due at the current tick """
+        task = self.tasks[name]
+        return self.tick % task.period == task.offset
+
+    def due_tasks(self):
+        """ Tasks due at the current tick, in the order they were added """
+        if self._table is None:
+            tasks = list(self.tasks.values())
+            n = 1
+            for task in tasks:
+                n = n*task.period//math.gcd(n, task.period)
+                if n > self.max_table:
+                    break
+            if n <= self.max_table:
+                self._table = [ tuple(task for task in tasks if k % task.period == task.offset)
+                                for k in range(n) ]
+            else:
+                self._table = False
+        if self._table is False:
+            return tuple(task for task in self.tasks.values()
+                         if self.tick % task.period == task.offset)
+        return self._table[self.tick % len(self._table)]
+
+    def advance(self):
+        """ Next tick """
+        self.tick += 1
+
+    def step(self):
+        """ Calls the functions of the due tasks, then advances one tick """
+        for task in self.due_tasks():
+            if task.fn is not None:
+                t0 = time.perf_counter()
+                task.fn()
+                task.time += time.perf_counter() - t0
+                task.calls += 1
+        self.tick += 1
+
+    def timing(self):
+        """ Name -> dict of rate ( Hz ), calls, total and mean time ( s ) """
+        return { name: { "rate": 1.0/(task.period*self.dt), "calls": task.calls,
+                         "total": task.time,
+                         "mean": task.time/task.calls if task.calls else 0.0 }
+                 for name, task in self.tasks.items() }
+
+    def report(self):
+        """ timing as a text table """
+        lines = [ "%-12s %9s %9s %10s %10s" % ("task", "rate Hz", "calls", "total s", "mean us") ]
+        for name, row in self.timing().items():
+            lines.append("%-12s %9.2f %9d %10.3f %10.2f" %
+                         (name, row["rate"], row["calls"], row["total"], 1e6*row["mean"]))
+        return "\n".join(lines)
@@ -0,0 +1,568 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2021 Luminita-Cristiana Totu
+#
+# Part of the QuadrotorSim aka quadsim package
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this package, in a file called LICENSE.
+# If not, see <https://www.gnu.org/licenses/>.
+
+""" Headless simulation engine
+
+The main loop of the main_estim_with_ukf_model* scripts, without the Panda3D
+window. Sensors, estimator, controllers and reference are set by a SimConfig;
+run(config) simulates until the end of the reference ( or config.t_end ) and
+returns a SimResults. Nothing here imports pandaapp, so runs can be made on
+machines without a display and in worker processes.
+
+    python simulation.py step --estimator model2-ekf --t_end 20
+
+"""
+
+__version__ = "0.1"
+__author__ = "Luminita-Cristiana Totu"
+__copyright__ = "Copyright (C) 2019 Luminita-Cristiana Totu"
+__license__ = "GNU GPLv3"
+
+import math
+import time
+import argparse
+from dataclasses import dataclass
+from typing import Optional
+import numpy as np
+
+import ftaucf
+import rigidbody
+import logger
+import envir
+import controllers
+import utils
+import mems
+import noise
+import ekf
+import spkf
+import refs
+import scheduler
+
+estimators = { "model0":     (0, False),
+               "model1":     (1, False),
+               "model1-ekf": (1, True),
+               "model2":     (2, False),
+               "model2-ekf": (2, True),
+               "model3":     (3, False),
+               "model3-ekf": (3, True) }
+""" Name -> ( model number, True for the EKF, False for the UKF ) of the 
+estimators, after the main_estim_with_ukf_* scripts; model3 is the UKF on 
+the model of model3-ekf """
+
+@dataclass
+class SimConfig:
+    """ Everything that defines one run """
+
+    ref_mode: str = "hover"
+    """ Name of the reference in refs.library_file; manual holds ref, up 
+    to t_end """
+    ref: tuple = (0.0, 0.0, 3.0, 0.0)
+    """ x,y,z,yaw reference of the manual mode """
+    reference: object = None
+    """ In place of ref_mode, a refs.Trajectory, a definition of one ( as
+    in refs.library_file ), or the ( pos_x_ref, pos_y_ref, pos_z_ref, 
+    yaw_ref ) breakpoint tables of utils.build_signal_* """
+    t_end: Optional[float] = None
+    """ Duration of the run, None for the end of the reference """
+
+    estimator: str = "model3-ekf"
+    """ One of simulation.estimators """
+    variant: int = 1
+    """ UKF variant, see spkf.SPKF; 0 - UKF, 1 - IUKF, 2 - UKFz """
+    joseph: int = 1
+    """ 1 for the Joseph form covariance update, 0 for the simple one """
+    kf_conv_delay: float = 0
+    """ Time the controllers use the true state before the estimates """
+
+    att_controller: type = controllers.AttController_01
+    """ Attitude controller class, built with freq_ctrl_rate, freq_ctrl_angle """
+    pos_controller: type = controllers.PosController_02
+    """ Position controller class, built with freq_ctrl_pos_v, freq_ctrl_pos_p """
+
+    seed: int = 0
+    """ Seed of the sensor noise, see noise.NoiseStreams """
+    gyro_rw: float = 0.0035/180.0*math.pi
+    gyro_rrw: float = 0.000023/180.0*math.pi
+    acc_rw: float = 0.140*(10**-3)*9.80665
+    acc_rrw: float = 0.0032*(10**-3)*9.80665
+    std_pos: tuple = (0.02, 0.02, 0.05)
+    """ GPS standard deviation, for the filter; the sensor uses twice the x one """
+    std_vb: float = 0.1
+    """ Body velocity standard deviation, for the filter; the sensor uses twice """
+
+    dt_gps: float = 1.0/20.0
+    dt_wheels: float = 1.0/50.0
+    dt_imu: float = 1.0/100.0
+    dt_kf_predict: float = 1.0/100.0
+    freq_ctrl_rate: float = 400
+    freq_ctrl_angle: float = 200
+    freq_ctrl_pos_v: float = 10
+    freq_ctrl_pos_p: float = 10
+    dt_sim: float = 1.0/800.0
+    dt_log: float = 0.1
+
+    plus: bool = True
+    """ Quadrotor configuration, plus or cross """
+    pos0: tuple = (0.0, 0.0, 3.0)
+    integrator: str = "odeint"
+    """ One of rigidbody.rigidbody.integrators """
+
+    name: Optional[str] = None
+    """ Name of the run, None for estimator_refmode """
+    log_folder: Optional[str] = None
+    """ Folder of the log file, None to keep the log in memory only """
+    stream: bool = False
+    """ Write the log during the run, see logger.Logger """
+
+@dataclass
+class SimResults:
+    """ What a run returns """
+
+    config: SimConfig
+    log: logger.Logger
+    """ Log of the run, as in the scripts """
+    log_file: Optional[str]
+    """ .npz file ( or stream folder ) of the log, None if not saved """
+    t: float
+    """ Simulated time, seconds """
+    steps: int
+    """ Number of simulation steps """
+    runtime: float
+    """ Wall clock time of the run, seconds """
+    x: np.ndarray
+    """ Final filter state """
+    P: np.ndarray
+    """ Final filter covariance """
+    rmse_pos: float = math.nan
+    """ RMS of the position estimation error, at the logging steps, meters """
+    rmse_euler: float = math.nan
+    """ RMS of the roll, pitch, yaw estimation error, radians """
+    nees: float = math.nan
+    """ Average normalized estimation error squared of position and euler 
+    angles, 6 for a consistent filter """
+    timing: Optional[dict] = None
+    """ Time spent in each task of the step, see scheduler.Scheduler.timing """
+
+# measurement models of models 0 and 1, where the filter state is [pos,euler,v]
+def _meas_pos(x):
+    return x[0:3]
+
+def _meas_ve2vb(x):
+    return utils.rpy2rotm(x[3:6]).transpose()@x[6:9]
+
+def _meas_vb(x):
+    return x[6:9]
+
+def _vb2ve(x):
+    return utils.rpy2rotm(x[3:6])@x[6:9]
+
+def _ve(x):
+    return x[6:9]
+
+class Estimator:
+    """ A filter with its measurement models, as used in the main loop """
+
+    def __init__(self, filter, meas, ve, imu_input = False, bias_rrw = None, var = 1):
+
+        self.filter = filter
+        """ ekf.EKF or spkf.SPKF """
+
+        self.meas = meas
+        """ Measurement name ( pos, vb, imu ) -> ( h, dhdx, R ) """
+
+        self.ve = ve
+        """ Function of the state, velocity in the earth frame """
+
+        self.imu_input = imu_input
+        """ If True the averaged IMU is the input of predict ( models 0, 1 ),
+        otherwise it is a measurement """
+
+        self.bias_rrw = bias_rrw
+        """ ( gyro_rrw, acc_rrw ) for models with MEMS biases in the state,
+        their process noise is set from the predict step """
+
+        self.var = var
+
+    def predict(self, u, dt):
+        if self.bias_rrw is not None:
+            Q = self.filter.Q
+            i = np.arange(15,18)
+            Q[i,i] = (1.5*self.bias_rrw[0]/math.sqrt(dt))**2
+            Q[i+3,i+3] = (1.5*self.bias_rrw[1]/math.sqrt(dt))**2
+        self.filter.predict(u if self.imu_input else 0, dt, 1) # Euler integration
+        self.filter.x[3:6] = utils.wrap_euler(self.filter.x[3:6])
+
+    def update(self, name, y):
+        h, dhdx, R = self.meas[name]
+        self.filter.update(y, h, dhdx, R, self.var)
+        self.filter.x[3:6] = utils.wrap_euler(self.filter.x[3:6])
+
+def make_estimator(config, meas_pos):
+    """ The estimator of config, initialized at the position meas_pos """
+
+    c = config
+    if c.estimator not in estimators:
+        raise ValueError("Unknown estimator: {}, one of {}".format(c.estimator, 
+                                                                 ", ".join(estimators)))
+    model, ekf_kind = estimators[c.estimator]
+    n = (9, 9, 15, 21)[model]
+
+    # x = [pos, euler, vb ( ve for model0 ), ob, ae, bg, ba]
+    x0 = np.zeros(n)
+    x0[0:3] = meas_pos
+    P0 = np.diag([100.0,100.0,100.0, 0.01,0.01,9.0, 9.0,9.0,9.0, 0.1,0.1,0.1, 1,1,1, 1e-9,1e-9,1e-9, 1e-9,1e-9,1e-9][:n])
+    Q = np.diag([0.0001,0.0001,0.0001, 0.0001,0.0001,0.0001, 0.01,0.01,0.01, 0.1,0.1,0.1, 1,1,1, 1,1,1, 1,1,1][:n])
+    R_pos = np.diag(np.square(c.std_pos))
+    R_vb = np.diag([c.std_vb**2]*3)
+    gyro_cov = (1.5*c.gyro_rw/math.sqrt(c.dt_imu))**2; acc_cov = (1.5*c.acc_rw/math.sqrt(c.dt_imu))**2
+    R_imu = np.diag([gyro_cov, gyro_cov, gyro_cov, acc_cov, acc_cov, acc_cov])
+
+    dfdx = None; bias_rrw = None
+    if model == 0:
+        dfx = rigidbody.quadrotor_dt_kinematic_euler
+        meas = { "pos": (_meas_pos, 0, R_pos), "vb": (_meas_ve2vb, 0, R_vb) }
+        ve = _ve
+    elif model == 1:
+        dfx = rigidbody.quadrotor_dt_kinematic_euler_vb
+        dfdx = rigidbody.quadrotor_dt_kinematic_euler_vb_dFXdX
+        if ekf_kind:
+            meas = { "pos": (rigidbody.quadrotor_dt_kinematic_euler_vb_meas_pos,
+                             rigidbody.quadrotor_dt_kinematic_euler_vb_meas_pos_dHXdX, R_pos),
+                     "vb": (rigidbody.quadrotor_dt_kinematic_euler_vb_meas_vb,
+                            rigidbody.quadrotor_dt_kinematic_euler_vb_meas_vb_dHXdX, R_vb) }
+        else:
+            meas = { "pos": (_meas_pos, 0, R_pos), "vb": (_meas_vb, 0, R_vb) }
+        ve = _vb2ve
+    elif model == 2:
+        dfx = rigidbody.motion3d_ros
+        dfdx = rigidbody.motion3d_ros_dFXdX
+        meas = { "pos": (rigidbody.motion3d_ros_meas_pos, rigidbody.motion3d_ros_meas_pos_dhdx, R_pos),
+                 "vb": (rigidbody.motion3d_ros_meas_vb, rigidbody.motion3d_ros_meas_vb_dhdx, R_vb),
+                 "imu": (rigidbody.motion3d_ros_meas_imu, rigidbody.motion3d_ros_meas_imu_dhdx, R_imu) }
+        ve = _vb2ve
+    else:
+        dfx = rigidbody.motion3d_ros_biases
+        dfdx = rigidbody.motion3d_ros_biases_dFXdX
+        meas = { "pos": (rigidbody.motion3d_ros_biases_meas_pos, rigidbody.motion3d_ros_biases_meas_pos_dhdx, R_pos),
+                 "vb": (rigidbody.motion3d_ros_biases_meas_vb, rigidbody.motion3d_ros_biases_meas_vb_dhdx, R_vb),
+                 "imu": (rigidbody.motion3d_ros_biases_meas_imu, rigidbody.motion3d_ros_biases_meas_imu_dhdx, R_imu) }
+        ve = _vb2ve
+        bias_rrw = (c.gyro_rrw, c.acc_rrw)
+
+    if ekf_kind:
+        filter = ekf.EKF(dfx,dfdx,np.eye(n),Q,x0,P0)
+    else:
+        meas = { name: (h, 0, R) for name, (h, dhdx, R) in meas.items() }
+        sut =  spkf.SUT(1*10**(-3), 2.0, 0, n)
+        filter = spkf.SPKF(dfx,np.eye(n),Q,x0,P0,sut,variant=c.variant)
+
+    return Estimator(filter, meas, ve, imu_input = model < 2, bias_rrw = bias_rrw, var = c.joseph)
+
+class Simulation:
+    """ One run of the quadrotor with sensors, estimator and position control """
+
+    def __init__(self, config):
+
+        self.config = c = config
+
+        # Quadrotor
+        self.qftau = ftaucf.QuadFTau_CF(0,c.plus) # Model for the forces and torques (used in simulation)
+        self.qftau_s = ftaucf.QuadFTau_CF_S(self.qftau.cT, self.qftau.cQ, self.qftau.radius,
+                                            self.qftau.input2omegar_coeff, c.plus) # Simplified model (used in control)
+        self.qrb = rigidbody.rigidbody(np.array(c.pos0, dtype=float), np.array([1.0,0,0,0]),
+                                       np.zeros(3), np.zeros(3), np.zeros(3),
+                                       self.qftau.mass, self.qftau.I, c.integrator)
+
+        # Sensors
+        noise_streams = noise.NoiseStreams(seed=c.seed)
+        self.gps_noise = noise_streams.stream("gps", 3)
+        self.vb_noise = noise_streams.stream("vb", 3)
+        self.gyro = mems.MemsBank(c.gyro_rw,c.gyro_rrw,np.zeros(3),seed=noise_streams.seed_sequence("gyro"),block=4096)
+        self.acc = mems.MemsBank(c.acc_rw,c.acc_rrw,np.zeros(3),seed=noise_streams.seed_sequence("acc"),block=4096)
+        self.meas_g = np.zeros(3)
+        self.imu_sum = np.zeros(6)
+        """ Sum of the MEMS samples since the last IMU measurement ( or
+        predict, models 0 and 1 ), for down-sampling """
+        self.gps_std = 2*c.std_pos[0]
+        self.vb_std = 2*c.std_vb
+
+        # Controllers
+        self.att_controller = c.att_controller(c.freq_ctrl_rate, c.freq_ctrl_angle)
+        self.pos_controller = c.pos_controller(c.freq_ctrl_pos_v, c.freq_ctrl_pos_p)
+        self.omegab_ref = np.zeros(3)
+        self.tau_ref = np.zeros(3)
+        self.thrust_ref = self.qrb.mass*envir.g
+        self.rpy_ref = np.zeros(3)
+        self.pos_ref = np.zeros(3)
+        self.ve_ref = np.zeros(3)
+        self.cmd = np.zeros(4)
+
+        # Reference
+        if isinstance(c.reference, refs.Trajectory):
+            self.trajectory = c.reference
+        elif isinstance(c.reference, dict):
+            self.trajectory = refs.compile_trajectory(c.reference)
+        elif c.reference is not None:
+            self.trajectory = refs.compile_trajectory(
+                { axis: { "type": "table", "table": np.asarray(table).tolist() }
+                  for axis, table in zip(refs.axes, c.reference) })
+        elif c.ref_mode == "manual":
+            self.trajectory = None
+        else:
+            self.trajectory = refs.trajectory(c.ref_mode)
+        """ refs.Trajectory of the run, None for manual """
+        self.t_ref_end = None
+        if self.trajectory is not None:
+            self.t_ref_end = self.trajectory.t_end
+        elif c.t_end is None:
+            raise ValueError("Simulation: manual reference needs t_end")
+
+        # Estimator
+        meas_pos = self.qrb.pos + 0.01*self.gps_noise.next() # GPS meas
+        self.estimator = make_estimator(c, meas_pos)
+        self.filter = self.estimator.filter
+
+        # Logger
+        self.name = c.name if c.name is not None else c.estimator + "_" + c.ref_mode
+        self.logger = logger.Logger(c.log_folder if c.log_folder is not None else "logs",
+                                    self.name, stream = c.stream and c.log_folder is not None)
+
+        # Scheduler, the tasks of one step in the order of the main loop
+        self.scheduler = sched = scheduler.Scheduler(c.dt_sim)
+        sched.add("mems", c.dt_sim, self._task_mems)
+        sched.add("gps", c.dt_gps, self._task_gps)
+        sched.add("wheels", c.dt_wheels, self._task_wheels)
+        sched.add("pos_p", self.pos_controller.dt_ctrl_pos_p, self._task_pos_p)
+        sched.add("pos_v", self.pos_controller.dt_ctrl_pos_v, self._task_pos_v)
+        sched.add("angle", self.att_controller.dt_ctrl_angle, self._task_angle)
+        sched.add("rate", self.att_controller.dt_ctrl_rate, self._task_rate)
+        sched.add("predict", c.dt_kf_predict, self._task_predict)
+        if not self.estimator.imu_input:
+            sched.add("imu", c.dt_imu, self._task_imu)
+        sched.add("dynamics", c.dt_sim, self._task_dynamics)
+        sched.add("log", c.dt_log, self._task_log, offset = -1) # after the step
+
+        # The reference on the ticks of the position and angle controllers
+        if self.trajectory is not None:
+            t_stop = self.t_ref_end if c.t_end is None else c.t_end
+            p = sched.period("pos_p")
+            t_grid = np.arange(int(t_stop/(p*c.dt_sim)) + 2)*p*c.dt_sim
+            self._ref_pos = self.trajectory.evaluate(t_grid)
+            a = sched.period("angle")
+            t_grid = np.arange(int(t_stop/(a*c.dt_sim)) + 2)*a*c.dt_sim
+            self._ref_yaw = self.trajectory.axes[3].evaluate(t_grid)
+
+        self.t = 0
+        self.tick_last_predict = 0
+        self.tick_end = None if c.t_end is None else int(round(c.t_end/c.dt_sim))
+        self.done = False
+        """ Set when the reference, or t_end, is over """
+
+        self.err_sq = np.zeros(3)
+        """ Sums over the logging steps of the squared position error, 
+        squared euler error and NEES """
+        self.n_err = 0
+
+    @property
+    def steps(self):
+        """ Number of simulation steps done """
+        return self.scheduler.tick
+
+    def _predict(self):
+        ticks = self.scheduler.tick - self.tick_last_predict
+        if (ticks == 0):
+            return
+        u = 0
+        if self.estimator.imu_input:
+            u = self.imu_sum/ticks
+            self.imu_sum[:] = 0 # Reset down-sampling buffer
+        self.estimator.predict(u, ticks*self.config.dt_sim)
+        self.tick_last_predict = self.scheduler.tick
+
+    #------------------------------------ sensors -----------------------------------------------
+    def _task_mems(self):
+        qrb = self.qrb
+        self.meas_g = self.gyro.run_mems(self.config.dt_sim,qrb.omegab)  # gyro running at simulation freq
+        meas_a = self.acc.run_mems(self.config.dt_sim,qrb.abmg)  # acc running at simulation freq
+        self.imu_sum[0:3] += self.meas_g
+        self.imu_sum[3:6] += meas_a
+
+    def _task_gps(self):
+        self._predict()
+        meas_pos = self.qrb.pos + self.gps_std*self.gps_noise.next() # GNSS sensor, simple noise
+        self.estimator.update("pos", meas_pos)
+
+    def _task_wheels(self):
+        qrb = self.qrb
+        self._predict()
+        meas_vb = ( utils.rpy2rotm(qrb.rpy).transpose()@qrb.ve) + self.vb_std*self.vb_noise.next() # Velocity sensor, simple noise
+        self.estimator.update("vb", meas_vb)
+
+    #------------------------------------ controller --------------------------------------------
+    def _task_pos_p(self):
+        c = self.config
+        t = self.t
+        if self.trajectory is None:
+            self.pos_ref[:] = c.ref[0:3]
+        else:
+            k = self.scheduler.tick//self.scheduler.period("pos_p")
+            if (k < len(self._ref_pos)):
+                ref = self._ref_pos[k]
+            else:
+                ref = self.trajectory.evaluate(t)
+            self.pos_ref[:] = ref[0:3]
+            if ( t > self.t_ref_end ):
+                self.done = True
+        est_pos = self.qrb.pos if t < c.kf_conv_delay else self.filter.x[0:3]
+        self.ve_ref = self.pos_controller.run_pos(self.pos_ref, est_pos)
+
+    def _task_pos_v(self):
+        qrb = self.qrb
+        x = self.filter.x
+        if self.t < self.config.kf_conv_delay:
+            est_yaw = qrb.rpy[2]
+            est_vel = qrb.ve
+        else:
+            est_yaw = x[5]
+            est_vel = self.estimator.ve(x)  # ve, velocity earth frame
+        rp_ref, self.thrust_ref = self.pos_controller.run_vel(self.ve_ref, est_vel, est_yaw, qrb.mass)
+        self.rpy_ref[0] = rp_ref[0]
+        self.rpy_ref[1] = rp_ref[1]
+
+    def _task_angle(self):
+        c = self.config
+        est_rpy = self.qrb.rpy if self.t < c.kf_conv_delay else self.filter.x[3:6]
+        if self.trajectory is None:
+            self.rpy_ref[2] = c.ref[3]
+        else:
+            k = self.scheduler.tick//self.scheduler.period("angle")
+            if (k < len(self._ref_yaw)):
+                self.rpy_ref[2] = self._ref_yaw[k]
+            else:
+                self.rpy_ref[2] = self.trajectory.axes[3].evaluate(self.t)
+        self.omegab_ref = self.att_controller.run_angle(self.rpy_ref, est_rpy)
+
+    def _task_rate(self):
+        self.tau_ref = self.att_controller.run_rate(self.omegab_ref, self.meas_g, self.qrb.I)
+        # Control allocation; use qftau_s model
+        self.cmd = self.qftau_s.fztau2cmd(np.array([self.thrust_ref,self.tau_ref[0],self.tau_ref[1],self.tau_ref[2]]))
+
+    #------------------------------------ predict and IMU ---------------------------------------
+    def _task_predict(self):
+        if (self.scheduler.tick - self.tick_last_predict >= self.scheduler.period("predict")):
+            self._predict()
+
+    def _task_imu(self):
+        self._predict()
+        meas_imu = self.imu_sum/self.scheduler.period("imu") # IMU
+        self.imu_sum[:] = 0 # Reset down-sampling buffer
+        self.estimator.update("imu", meas_imu)
+
+    #------------------------------------ simulation --------------------------------------------
+    def _task_dynamics(self):
+        self.fb, self.taub = self.qftau.input2ftau(self.cmd,self.qrb.vb)
+        self.qrb.run_quadrotor_dynamic_quat(self.config.dt_sim, self.fb, self.taub)
+        self.t = (self.scheduler.tick + 1)*self.config.dt_sim
+
+    def _task_log(self):
+        self._log(self.fb, self.taub)
+
+    def step(self):
+        """ One simulation step, dt_sim """
+        self.t = self.scheduler.t
+        self.scheduler.step()
+        if self.tick_end is not None and self.scheduler.tick >= self.tick_end:
+            self.done = True
+
+    def _log(self, fb, taub):
+        t = self.t
+        qrb = self.qrb
+        log = self.logger
+        log.log_attstab(t, self.rpy_ref.copy(), np.array(self.omegab_ref), np.array(self.tau_ref))
+        log.log_posctrl(t, self.pos_ref.copy())
+        log.log_rigidbody(t, qrb)
+        fe = qrb.rotmb2e@fb + qrb.mass*np.array([0,0,-envir.g])
+        taue = qrb.rotmb2e@taub
+        log.log_ftau(t,fe,taue,fb,taub)
+        log.log_cmd(t, self.cmd)
+        log.log_filter(t, self.filter.x)
+        log.log_mems(t, self.gyro, self.acc)
+
+        # estimation error of the states common to all the models, [pos, euler]
+        x = self.filter.x
+        e = np.empty(6)
+        e[0:3] = x[0:3] - qrb.pos
+        e[3:6] = x[3:6] - qrb.rpy
+        for i in range(3,6):
+            e[i] = utils.clampRotation(e[i])
+        P = np.asarray(self.filter.P)[0:6,0:6]
+        self.err_sq[0] += e[0:3]@e[0:3]
+        self.err_sq[1] += e[3:6]@e[3:6]
+        self.err_sq[2] += e@np.linalg.solve(P, e)
+        self.n_err += 1
+
+    def run(self):
+        """ Steps until done, returns the SimResults """
+
+        t_start = time.perf_counter()
+        while not self.done:
+            self.step()
+        runtime = time.perf_counter() - t_start
+
+        log_file = None
+        if self.config.log_folder is not None:
+            if self.logger.writer is not None:
+                self.logger.close()
+                log_file = self.logger.writer.folder
+            else:
+                log_file = self.logger.save()
+
+        n = max(self.n_err, 1)
+        return SimResults(self.config, self.logger, log_file, self.t, self.steps,
+                          runtime, self.filter.x.copy(), np.array(self.filter.P),
+                          math.sqrt(self.err_sq[0]/n), math.sqrt(self.err_sq[1]/n),
+                          self.err_sq[2]/n, self.scheduler.timing())
+
+def run(config = None, **kwargs):
+    """ Simulates config, a SimConfig or a dict of its fields ( kwargs
+    override them ), and returns the SimResults """
+
+    if config is None:
+        config = SimConfig(**kwargs)
+    elif isinstance(config, dict):
+        config = SimConfig(**dict(config, **kwargs))
+    elif kwargs:
+        config = SimConfig(**dict(vars(config), **kwargs))
+    return Simulation(config).run()
+
+if __name__ == "__main__":
+
+    arg_parser = argparse.ArgumentParser(description = "Headless simulation run")
+    arg_parser.add_argument("ref_mode", help=""" Reference name in 
+                            res/references.json ( step, shortstep, ramp, sin, 
+                            hover, square_spline, square_minsnap ), or manual """)
+    arg_parser.add_argument("--estimator", default = "model3-ekf", choices = list(estimators))
+    arg_parser.add_argument("--t_end", type = float, default = None)
+    arg_parser.add_argument("--seed", type = int, default = 0)
+    arg_parser.add_argument("--log_folder", default = "logs")
+    args = arg_parser.parse_args()
+
+    results = run(vars(args))
+    print("%s: %.2f s simulated in %.2f s, log %s" %
+          (results.config.estimator, results.t, results.runtime, results.log_file))
@@ -27,6 +27,64 @@ __copyright__ = "Copyright (C) 2019 Luminita-Cristiana Totu"
 __license__ = "GNU GPLv3"
 
 import numpy as np
+import math
+from scipy.integrate import odeint
+from scipy.linalg import solve_triangular
+from scipy.linalg.lapack import dgeqrf, dpotrs
+
+import kernels
+
+def cholupdate(L, X, sign = 1.0):
+    """ Rank k update ( sign = 1 ) or downdate ( sign = -1 ) of a square
+    root L of a covariance ( for a downdate, its lower triangular Cholesky 
+    factor with a positive diagonal ), X a vector or the (n,k) matrix of the
+    k columns: returns the lower triangular L1 with L1@L1' = L@L' + sign*X@X'.
+    An update is one QR of [L, X]; a downdate is k rank 1 downdates, each a 
+    sweep of hyperbolic rotations down the columns of L. Raises LinAlgError
+    if the downdate is not positive definite """
+    X = np.array(X, dtype=float).reshape(L.shape[0], -1)
+    if sign > 0:
+        return qr_factor(np.hstack([L, X]))
+    L = np.array(L, dtype=float)
+    if not _chol_downdate(L, X):
+        raise np.linalg.LinAlgError("cholupdate: the downdate is not positive definite")
+    return L
+
+def _chol_downdate_numpy(L, X):
+    # kernels.chol_downdate, one row of rotations at a time
+    n = L.shape[0]
+    for j in range(X.shape[1]):
+        x = X[:,j]
+        for k in range(n):
+            xk = x[k]
+            if xk == 0:
+                continue
+            Lkk = L[k,k]
+            r2 = (Lkk - xk)*(Lkk + xk)
+            if not r2 > 0:
+                return False
+            r = math.sqrt(r2)
+            c = r/Lkk
+            s = xk/Lkk
+            L[k,k] = r
+            col = L[k+1:,k]
+            col -= s*x[k+1:]
+            col /= c
+            x[k+1:] *= c
+            x[k+1:] -= s*col
+    return True
+
+_chol_downdate = kernels.chol_downdate if kernels.compiled else _chol_downdate_numpy
+
+def qr_factor(A):
+    """ Lower triangular S with S@S' = A@A', from the QR of A' """
+    # LAPACK geqrf on A' ( Fortran ordered, no copy ), R in its upper triangle
+    QR = dgeqrf(A.T)[0]
+    S = np.tril(QR[:min(A.shape)].T)
+    # make the diagonal positive, flipping a column does not change S@S'
+    d = np.sign(np.diagonal(S))
+    d[d == 0] = 1
+    return S*d
 
 class SUT: 
     """ Scaled Unscented Transform """
@@ -45,14 +103,38 @@ class SUT:
         self.W0c = self.W0m + 1 - self.alpha**2 + self.beta
         self.Wi = 0.5/(self.n + self.l)
         """ sigma points weights """
+        
+        self.Wm = np.full(2*self.n+1, self.Wi)
+        self.Wm[0] = self.W0m
+        self.Wc = np.full(2*self.n+1, self.Wi)
+        self.Wc[0] = self.W0c
+        """ the weights as vectors, same order as the sigma points """
     
-    def create_points(self, x, P):
+    def create_points(self, x, P, matrix = False):
+        """ Returns the 2n+1 sigma points [x, x+s1, x-s1, x+s2, ...] as a list,
+        or as the rows of a (2n+1,n) array if matrix is True """
         sr_P = np.linalg.cholesky((self.n + self.l)*P)
+        if matrix:
+            S = np.empty((2*self.n+1, self.n))
+            S[0] = x
+            S[1::2] = x + sr_P.T
+            S[2::2] = x - sr_P.T
+            return S
         S = [x]
         for i in range(self.n):
             S.append(x+sr_P[:,i])
             S.append(x-sr_P[:,i])
         return S
+    
+    def create_points_sr(self, x, S):
+        """ Same points as create_points(x, S@S', True), from the lower
+        triangular factor S, without a Cholesky factorization """
+        sr_P = math.sqrt(self.n + self.l)*S
+        X = np.empty((2*self.n+1, self.n))
+        X[0] = x
+        X[1::2] = x + sr_P.T
+        X[2::2] = x - sr_P.T
+        return X
 ##########################################################
 
 #class CDT:       
@@ -62,7 +144,7 @@ class SUT:
 class SPKF:
     """ Sigma Point Kalman Filter """
 
-    def __init__(self,f,G,Q,x0,P0,spt,variant=0):
+    def __init__(self,f,G,Q,x0,P0,spt,variant=0,batch=False):
 
         self.f = f
         """ Continous state dynamics; dot(x) =  f(x,u) """
@@ -87,8 +169,16 @@ class SPKF:
 
         self.variant = variant # 0 - normal UKF, 1 - IUKF, 2 - UKFz
 
+        self.batch = batch
+        """ If True, f and the measurement functions h take all the sigma 
+        points at once, as the rows of a (2n+1,n) array ( see the *_batch 
+        models in rigidbody ), and the statistics are matrix products """
+
     def predict(self,u,dt,simple = 1):
 
+        if (self.batch):
+            return self.predict_batch(u,dt,simple)
+
         S = self.spt.create_points(self.x, self.P)
   
         # propagate the points 
@@ -114,8 +204,31 @@ class SPKF:
         self.x = Xm
         self.P = Cx
 
+    def predict_batch(self,u,dt,simple = 1):
+
+        S = self.spt.create_points(self.x, self.P, True)
+  
+        # propagate the points 
+        if (simple):
+            # Euler faster
+            Sp = S + self.f(S,0,u)*dt
+        else:
+            # ODE Int integration of all the points as one stacked system
+            shape = S.shape
+            f_flat = lambda z, t, u: self.f(z.reshape(shape),t,u).ravel()
+            Sp = odeint(f_flat,S.ravel(),np.array([0, dt]),args=(u,))[1].reshape(shape)
+     
+        # calculate the mean and covariance of the set
+        Xm = self.spt.Wm@Sp
+        D = Sp - Xm
+        self.x = Xm
+        self.P = (D.T*self.spt.Wc)@D + dt*self.Q
+
     def update(self,meas, h, _empty_, R, var=0):
 
+        if (self.batch):
+            return self.update_batch(meas, h, _empty_, R, var)
+
         X = self.spt.create_points(self.x, self.P)
         
         Y = [ ]
@@ -156,5 +269,162 @@ class SPKF:
             self.H = Cxy.transpose()@np.linalg.inv(self.P)
             IKH =  np.eye(self.n) - K@self.H
             self.P = IKH@self.P@IKH.transpose()+K@R@K.transpose() # Joseph Form
+
+    def update_batch(self,meas, h, _empty_, R, var=0):
+
+        X = self.spt.create_points(self.x, self.P, True)
+        Y = h(X)
+
+        # calculate the mean and covariance of the set
+        if (self.variant == 2): # UKFz
+            Ym = h(self.x[None,:])[0]
+        else:  
+            Ym = self.spt.Wm@Y
+        
+        DY = Y - Ym
+        DYw = DY.T*self.spt.Wc
+        Cy = DYw@DY
+        Cxy = DYw@(X - self.x)
+        Cxy = Cxy.T
+
+        # Kalman Gain
+        K = Cxy@np.linalg.inv(Cy + R)
+
+        # Update mean and covarince
+        if (self.variant == 1): # IUKF
+            inn = meas - h(self.x[None,:])[0]
+        else:
+            inn = meas - Ym
+
+        self.x = self.x + K@inn
+        
+        if (var == 0):
+            # Simple Covariance Update
+            self.P = self.P - K@(Cy+R)@np.transpose(K)
+        else:
+            # -> Joseph Form Covariance Update
+            self.H = Cxy.transpose()@np.linalg.inv(self.P)
+            IKH =  np.eye(self.n) - K@self.H
+            self.P = IKH@self.P@IKH.transpose()+K@R@K.transpose() # Joseph Form
 ##########################################################
 
+class SRSPKF:
+    """ Square Root Sigma Point Kalman Filter 
+    
+    Propagates the lower triangular Cholesky factor S of the covariance, 
+    P = S@S', with QR factorizations and up/downdates, and gets the gain 
+    with triangular solves [ van der Merwe, Wan - 2001 ]. Same interface 
+    as SPKF; P is available as a property. 
+    """
+
+    def __init__(self,f,G,Q,x0,P0,spt,variant=0,batch=False):
+
+        self.f = f
+        """ Continous state dynamics; dot(x) =  f(x,u) """
+
+        self.G = G
+        """ Noise input matrix """
+
+        self.x = x0
+        """ Initial State """
+
+        self.S = np.linalg.cholesky(P0)
+        """ Cholesky factor of the covariance, lower triangular """
+
+        self.Q = Q
+        """ Propagation noise matrix """
+
+        self.spt = spt
+        """ Sigma point transform and parameters """
+
+        self.n = x0.size
+        """ State dimensionality """
+
+        self.variant = variant # 0 - normal UKF, 1 - IUKF, 2 - UKFz
+        
+        self.batch = batch
+        """ If True, f and h take all the sigma points at once, see SPKF """
+
+    @property
+    def P(self):
+        return self.S@self.S.T
+
+    @P.setter
+    def P(self, P):
+        self.S = np.linalg.cholesky(P)
+
+    def sqrt_cov(self, C):
+        """ A square root of a noise covariance, cheap when C is diagonal """
+        d = np.diagonal(C)
+        if np.count_nonzero(C - np.diag(d)) == 0:
+            return np.diag(np.sqrt(d))
+        return np.linalg.cholesky(C)
+
+    def _apply(self, g, X, *args):
+        if (self.batch):
+            return g(X, *args)
+        return np.array([ g(X[i], *args) for i in range(X.shape[0]) ])
+
+    def _sr_cov(self, D, sqrt_noise):
+        """ Factor of sum_i Wc_i*D_i'*D_i + noise, D holds one deviation per row """
+        W0c = self.spt.W0c
+        if W0c < 0:
+            # negative weight: the factor of the other terms, downdated
+            S = qr_factor(np.hstack([ math.sqrt(self.spt.Wi)*D[1:].T, sqrt_noise ]))
+            return cholupdate(S, math.sqrt(-W0c)*D[0], -1.0)
+        return qr_factor(np.hstack([ math.sqrt(W0c)*D[0][:,None], 
+                                     math.sqrt(self.spt.Wi)*D[1:].T, sqrt_noise ]))
+
+    def predict(self,u,dt,simple = 1):
+
+        X = self.spt.create_points_sr(self.x, self.S)
+  
+        # propagate the points 
+        if (simple):
+            # Euler faster
+            Xp = X + self._apply(self.f, X, 0, u)*dt
+        else:
+            Xp = np.array([ odeint(self.f,X[i],np.array([0, dt]),args=(u,))[1] 
+                            for i in range(X.shape[0]) ])
+     
+        # calculate the mean and covariance factor of the set
+        self.x = self.spt.Wm@Xp
+        self.S = self._sr_cov(Xp - self.x, math.sqrt(dt)*self.sqrt_cov(self.Q))
+
+    def update(self,meas, h, _empty_, R, var=0):
+        """ var = 0 for the simple covariance update, a downdate by K*Sy, 
+        else the Joseph form, one QR of [(I-KH)*S, K*sqrt(R)] """
+
+        X = self.spt.create_points_sr(self.x, self.S)
+        Y = self._apply(h, X)
+
+        # calculate the mean and covariance factor of the set
+        if (self.variant == 2): # UKFz
+            Ym = self._apply(h, self.x[None,:])[0]
+        else:  
+            Ym = self.spt.Wm@Y
+        DY = Y - Ym
+        sqrt_R = self.sqrt_cov(R)
+        Sy = self._sr_cov(DY, sqrt_R)
+        Cxy = ((X - self.x).T*self.spt.Wc)@DY
+
+        # Kalman Gain, K = Cxy*(Sy*Sy')^-1 with two triangular solves
+        K = dpotrs(Sy, Cxy.T, lower=1)[0].T
+
+        # Update mean and covariance factor
+        if (self.variant == 1): # IUKF
+            inn = meas - self._apply(h, self.x[None,:])[0]
+        else:
+            inn = meas - Ym
+
+        self.x = self.x + K@inn
+        
+        if (var == 0):
+            # P = P - K*Sy*Sy'*K', one rank 1 downdate per column of K*Sy
+            self.S = cholupdate(self.S, K@Sy, -1.0)
+        else:
+            # Joseph form, with the stochastic linearization H = Cxy'*P^-1,
+            # (I-K*H)*S = S - K*(S^-1*Cxy)' with one triangular solve
+            HS = solve_triangular(self.S, Cxy, lower=True, check_finite=False).T
+            self.S = qr_factor(np.hstack([ self.S - K@HS, K@sqrt_R ]))
+##########################################################
@@ -63,6 +63,23 @@ def rpy2rotm(rpy):
     r = Rot.from_euler('xyz',rpy)
     return r.as_matrix()
 
+def rpy2rotm_batch(rpy):
+    """ rpy2rotm for a (N,3) array of Euler angles, returns (N,3,3) """
+    cr = np.cos(rpy[:,0]); sr = np.sin(rpy[:,0])
+    cp = np.cos(rpy[:,1]); sp = np.sin(rpy[:,1])
+    cy = np.cos(rpy[:,2]); sy = np.sin(rpy[:,2])
+    R = np.empty((rpy.shape[0],3,3))
+    R[:,0,0] = cy*cp
+    R[:,0,1] = cy*sp*sr - sy*cr
+    R[:,0,2] = cy*sp*cr + sy*sr
+    R[:,1,0] = sy*cp
+    R[:,1,1] = sy*sp*sr + cy*cr
+    R[:,1,2] = sy*sp*cr - cy*sr
+    R[:,2,0] = -sp
+    R[:,2,1] = cp*sr
+    R[:,2,2] = cp*cr
+    return R
+
 def rotm2rpy(R,sol=1):
 #   That is input matrix R = Rx(psi)*Ry(theta)*Rz(phi)
     r = Rot.from_matrix(R)
@@ -126,6 +143,24 @@ def quat2rotm(q):
                     ])  
 ##########################################################
 
+def quat2rotm_batch(q):
+    """ Takes a (N,4) array of quaternions and returns the (N,3,3) 
+    rotation matrices, same convention as quat2rotm """
+    
+    q0 = q[:,0]; q1 = q[:,1]; q2 = q[:,2]; q3 = q[:,3]
+    R = np.empty((q.shape[0],3,3))
+    R[:,0,0] = 2*(q0*q0+q1*q1)-1
+    R[:,0,1] = 2*(q1*q2-q0*q3)
+    R[:,0,2] = 2*(q1*q3+q0*q2)
+    R[:,1,0] = 2*(q1*q2+q0*q3)
+    R[:,1,1] = 2*(q0*q0+q2*q2)-1
+    R[:,1,2] = 2*(-q0*q1+q2*q3)
+    R[:,2,0] = 2*(q1*q3-q0*q2)
+    R[:,2,1] = 2*(q2*q3+q0*q1)
+    R[:,2,2] = 2*(q0*q0+q3*q3)-1
+    return R
+##########################################################
+
     
 def skew(X):
     """  Returns the skew-symmetric matrix form of the input vector """
@@ -240,17 +275,86 @@ def build_signal_sin(t_start, t_end, base_value, *arg):
     return ref
     
 def give_signal(ref, t):
-    
+    """ Value at t of the breakpoint table ref ( build_signal_* ), linear
+    between the breakpoints, or of a Signal """
+
+    if isinstance(ref, Signal):
+        return ref(t)
+    # first k with ref[k,0] >= t, the last one if none; for lookups in a
+    # loop, compile the table once into a Signal
     k = 0
     n = len(ref)
     while (ref[k,0] < t) and (k < n-1):
         k+=1 
     
-    if (k==0) or (k == n):
+    if (k==0):
         return ref[k,1] 
     else:
         return( ((ref[k,1]-ref[k-1,1])*t + (ref[k-1,1]*ref[k,0]-ref[k,1]*ref[k-1,0]))
                      /(ref[k,0] - ref[k-1,0]) )
+
+class Signal:
+    """ A breakpoint table ( build_signal_* ) compiled for lookup, with the
+    values of give_signal. Called with times that do not decrease, the 
+    segment is found by moving a cursor, O(1); called with an array of times,
+    all of them are evaluated at once, e.g. a run's reference on its time grid """
+
+    def __init__(self, ref):
+
+        self.table = np.array(ref, dtype=float)
+        """ The breakpoint table, (n,2) of time, value """
+
+        self.t_end = self.table[-1,0]
+        """ Time of the last breakpoint """
+
+        self._t = self.table[:,0].tolist()
+        self._v = self.table[:,1].tolist()
+        self._tmax = np.maximum.accumulate(self.table[:,0])
+        """ Running maximum of the times, sorted even if the table is not, 
+        the first k with tmax[k] >= t is the first with t[k] >= t """
+        self._tmax_list = self._tmax.tolist()
+        self._n = len(self._t)
+        self._k = 0
+
+    def __len__(self):
+        return self._n
+
+    def __getitem__(self, index):
+        return self.table[index]
+
+    def __call__(self, t):
+        """ Value at t, a float, or at each of the times of an array """
+
+        if not np.isscalar(t):
+            return self.evaluate(t)
+        tmax = self._tmax_list
+        k = self._k
+        if (k > 0) and (tmax[k-1] >= t):
+            # back in time, search again
+            k = min(int(np.searchsorted(self._tmax, t)), self._n-1)
+        else:
+            while (tmax[k] < t) and (k < self._n-1):
+                k += 1
+        self._k = k
+        if (k == 0):
+            return self._v[0]
+        T = self._t; V = self._v
+        return ( ((V[k]-V[k-1])*t + (V[k-1]*T[k]-V[k]*T[k-1]))/(T[k] - T[k-1]) )
+
+    def evaluate(self, t, der = 0):
+        """ Values at the times of the array t, or with der = 1 the slopes,
+        the derivative of the linear interpolation """
+
+        t = np.asarray(t, dtype=float)
+        T = self.table[:,0]; V = self.table[:,1]
+        k = np.minimum(np.searchsorted(self._tmax, t), self._n-1)
+        j = np.maximum(k-1, 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            if (der == 0):
+                value = ((V[k]-V[j])*t + (V[j]*T[k]-V[k]*T[j]))/(T[k] - T[j])
+                return np.where(k == 0, V[0], value)
+            slope = (V[k]-V[j])/(T[k] - T[j])
+        return np.where(k == 0, 0.0, slope) if der == 1 else np.zeros(t.shape)
         
 def clampRotation(angle):
     
@@ -266,3 +370,48 @@ def wrap_euler(euler):
     for i in range(3):    
         euler[i] = clampRotation(euler[i])
     return euler     
+
+# Compiled kernels
+##########################################################
+# kernels.py has element by element versions of the rotation helpers above.
+# If numba is installed they are jit compiled and used in place of the
+# numpy versions for single float64 arrays ( and rotm2rpy with sol = 1 ); 
+# other inputs, e.g. lists or stacked arrays, still go to the numpy 
+# versions, which stay available in numpy_kernels.
+
+import kernels
+
+numpy_kernels = { "quat2rotm": quat2rotm,
+                  "skew": skew,
+                  "quaternion_multiply": quaternion_multiply,
+                  "rpy2q": rpy2q,
+                  "rpy2rotm": rpy2rotm,
+                  "rotm2rpy": rotm2rpy }
+""" The numpy versions of the functions replaced by kernels """
+
+def _compiled(name, *shapes):
+    # the kernel for float64 arrays of the given shapes, the numpy version 
+    # for anything else ( lists, stacked inputs, other dtypes )
+    kernel = getattr(kernels, name)
+    numpy_fn = numpy_kernels[name]
+    def fn(*args):
+        if len(args) == len(shapes) and all(type(a) is np.ndarray and a.dtype == np.float64 
+                                            and a.shape == shape for a, shape in zip(args, shapes)):
+            return kernel(*args)
+        return numpy_fn(*args)
+    fn.__name__ = numpy_fn.__name__
+    fn.__doc__ = numpy_fn.__doc__
+    return fn
+
+if kernels.compiled:
+    quat2rotm = _compiled("quat2rotm", (4,))
+    skew = _compiled("skew", (3,))
+    quaternion_multiply = _compiled("quaternion_multiply", (4,), (4,))
+    rpy2q = _compiled("rpy2q", (3,))
+    rpy2rotm = _compiled("rpy2rotm", (3,))
+
+    def rotm2rpy(R, sol=1):
+        if (sol != 1 or type(R) is not np.ndarray or R.dtype != np.float64 
+                or R.shape != (3,3)):
+            return numpy_kernels["rotm2rpy"](R, sol)
+        return kernels.rotm2rpy(R)
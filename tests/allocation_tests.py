@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+# 
+# Copyright 2019 Luminita-Cristiana Totu
+#
+# Part of the QuadrotorSim aka quadsim package
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this package, in a file called LICENSE.
+# If not, see <https://www.gnu.org/licenses/>.
+
+
+""" Unit Tests for the control allocation of QuadFTau_CF_S """
+
+__version__ = "0.1"
+__author__ = "Luminita-Cristiana Totu"
+__copyright__ = "Copyright (C) 2019 Luminita-Cristiana Totu"
+__license__ = "GNU GPLv3"
+
+import numpy as np
+
+from context import qftau_cf
+
+qftau = qftau_cf.QuadFTau_CF(0.5)
+rng = np.random.default_rng(3)
+N = 1000
+
+def cmd2omegar2(qftau_s, cmd):
+    # squared rotor velocities, the commands being out of the dead-band
+    assert np.all(cmd >= 1001)
+    return np.polyval(qftau_s.input2omegar_coeff, cmd)**2
+
+for plus in (True, False):
+    qftau_s = qftau_cf.QuadFTau_CF_S(qftau.cT, qftau.cQ, qftau.radius,
+                                     qftau.input2omegar_coeff, plus)
+    Gamma = qftau_s.Gamma
+    fmax = 4*qftau.cT*qftau_s.omegar2_max
+
+    name = "1700_fztau2cmd_batch_plus_%s" % plus
+    print("Running Test Case: %s" % name)
+    fztau = np.column_stack((rng.uniform(0, 0.7, N), rng.normal(0, 2e-3, (N, 2)), 
+                             rng.normal(0, 2e-4, N)))
+    cmd = qftau_s.fztau2cmd(fztau)
+    assert cmd.shape == (N, 4) and np.all(cmd == np.trunc(cmd))
+    assert np.all((cmd >= 0) & (cmd <= 65535))
+    for i in range(0, N, 50):
+        omegar2 = qftau_s.invGamma@fztau[i]
+        omegar2[omegar2 < 0] = 0
+        expected = [ min(max(int(qftau_s.omegar2input_poly(w)), 0), 65535) for w in np.sqrt(omegar2) ]
+        assert np.array_equal(qftau_s.fztau2cmd(fztau[i]), expected)
+        assert np.array_equal(cmd[i], expected)
+    assert np.array_equal(qftau_s.fztau2cmd([np.nan, 0, 0, 0]), np.zeros(4))
+    assert np.array_equal(qftau_s.fztau2cmd([np.inf, 0, 0, 0]), np.zeros(4))
+    assert np.array_equal(qftau_s.omegar2input([np.inf, -np.inf, 1e9, -1e9]), [0, 0, 65535, 0])
+    print("  passed")
+
+    name = "1701_fztau2cmd_sat_unsaturated_plus_%s" % plus
+    print("Running Test Case: %s" % name)
+    # hover with small torques, the rotors within their range
+    fztau = np.column_stack((rng.uniform(0.2, 0.4, N), rng.normal(0, 2e-4, (N, 2)), 
+                             rng.normal(0, 2e-5, N)))
+    assert np.all(qftau_s.invGamma@fztau.T > 0)
+    assert np.all(abs(qftau_s.fztau2cmd_sat(fztau) - qftau_s.fztau2cmd(fztau)) <= 1)
+    print("  passed")
+
+    name = "1702_fztau2cmd_sat_attitude_first_plus_%s" % plus
+    print("Running Test Case: %s" % name)
+    # the thrust is above or below what the rotors give with these torques
+    tau = rng.normal(0, 1e-3, (N, 3))
+    fz = np.where(rng.random(N) < 0.5, 0.0, 1.2*fmax)
+    fztau = np.column_stack((fz, tau))
+    omegar2 = cmd2omegar2(qftau_s, qftau_s.fztau2cmd_sat(fztau))
+    achieved = omegar2@Gamma.T
+    assert np.all(omegar2 <= qftau_s.omegar2_max*(1 + 1e-9))
+    spread = np.ptp(tau@qftau_s.invGamma[:,1:4].T, axis=1)
+    fits = spread < 0.95*(qftau_s.omegar2_max - qftau_s.omegar2_min)
+    # the torques within one command per rotor of the request, only the 
+    # thrust moved
+    tol = np.sum(abs(Gamma[1:4]), axis=1)*2*np.sqrt(qftau_s.omegar2_max)/qftau_s.omegar2input_coeff[0]
+    assert np.any(fits) and np.all(abs(achieved[fits,1:4] - tau[fits]) <= tol)
+    assert np.all(achieved[fits & (fz == 0),0] > 0) 
+    assert np.all(achieved[fits & (fz > 0),0] < fmax)
+    # too large torques, scaled down in the same direction
+    big = 1e4*tau[0:10]
+    omegar2 = cmd2omegar2(qftau_s, qftau_s.fztau2cmd_sat(np.column_stack((np.full(10, 0.3), big))))
+    achieved = omegar2@Gamma.T
+    for i in range(10):
+        cos = achieved[i,1:4]@big[i]/np.linalg.norm(achieved[i,1:4])/np.linalg.norm(big[i])
+        assert cos > 0.999
+    print("  passed")
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2019 Luminita-Cristiana Totu
+#
+# Part of the QuadrotorSim aka quadsim package
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this package, in a file called LICENSE.
+# If not, see <https://www.gnu.org/licenses/>.
+
+""" Unit Tests for the Monte Carlo campaigns """
+
+__version__ = "0.1"
+__author__ = "Luminita-Cristiana Totu"
+__copyright__ = "Copyright (C) 2019 Luminita-Cristiana Totu"
+__license__ = "GNU GPLv3"
+
+import os
+import numpy as np
+
+from context import campaign, simulation
+
+folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "testresults")
+
+if __name__ == "__main__":
+
+    name = "1100_campaign_table"
+    print("Running Test Case: %s" % name)
+    fullname = os.path.join(folder, name + ".csv")
+    if os.path.exists(fullname):
+        os.remove(fullname)
+    mc = campaign.Campaign(fullname, seeds=range(2), filters=("model2-ekf", "model3-ekf"),
+                           ref_modes=("hover", "shortstep"), t_end=1.0)
+    table = mc.run(processes=2)
+    assert len(table["run"]) == 8 and np.all(table["error"] == "")
+    assert np.all(table["rmse_pos"] > 0) and np.all(table["nees"] > 0)
+    # same numbers as a run by hand
+    results = simulation.run(estimator="model3-ekf", ref_mode="shortstep", seed=1, t_end=1.0)
+    k = list(table["run"]).index("model3-ekf/shortstep/1")
+    assert np.isclose(table["rmse_pos"][k], results.rmse_pos)
+    assert np.isclose(table["nees"][k], results.nees)
+    stats = campaign.summary(table)
+    assert stats[("model2-ekf", "hover")]["runs"] == 2
+    print("  passed")
+
+    name = "1101_campaign_resume"
+    print("Running Test Case: %s" % name)
+    # an interruption: two rows lost and the last one cut in the middle
+    with open(fullname) as f:
+        lines = f.readlines()
+    with open(fullname, "w") as f:
+        f.writelines(lines[:-3] + [ lines[-3][:20] ])
+    assert len(campaign.read_rows(fullname)) == 5
+    table2 = mc.run(processes=1)
+    assert sorted(table2["run"]) == sorted(table["run"])
+    for run in table["run"]:
+        k = list(table["run"]).index(run); k2 = list(table2["run"]).index(run)
+        assert table["nees"][k] == table2["nees"][k2]
+    # nothing left to run
+    n_lines = len(open(fullname).readlines())
+    mc.run(processes=1)
+    assert len(open(fullname).readlines()) == n_lines
+    # the table is rewritten through a temporary file, replaced when complete
+    assert not os.path.exists(fullname + ".tmp")
+    print("  passed")
+
+    name = "1102_campaign_failed_run"
+    print("Running Test Case: %s" % name)
+    fullname = os.path.join(folder, name + ".csv")
+    if os.path.exists(fullname):
+        os.remove(fullname)
+    table = campaign.Campaign(fullname, seeds=[0], filters={ "bad": { "estimator": "model9" } },
+                              t_end=0.1).run(processes=1)
+    assert table["error"][0].startswith("ValueError") and np.isnan(table["nees"][0])
+    assert campaign.summary(table)[("bad", "hover")]["failed"] == 1
+    print("  passed")
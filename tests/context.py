@@ -25,16 +25,25 @@ __license__ = "GNU GPLv3"
 import os
 import sys
 sys.path.insert(
-    0,os.path.abspath(os.path.join(os.path.dirname(__file__), '..\quadsim')) 
+    0,os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'quadsim')) 
                )
 
 import rigidbody as rb
 import plotter as plt
 import logger as log
-import qutils as ut
-import quadftau_cf as qftau_cf
-import cts
+import utils as ut
+import ftaucf as qftau_cf
 import envir
+import kernels
+import spkf
+import ekf
+import mems
+import noise
 import plotter as plot
 import pid
+import controllers
+import simulation
+import campaign
+import scheduler
+import refs
 
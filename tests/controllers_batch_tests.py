@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+# 
+# Copyright 2019 Luminita-Cristiana Totu
+#
+# Part of the QuadrotorSim aka quadsim package
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this package, in a file called LICENSE.
+# If not, see <https://www.gnu.org/licenses/>.
+
+
+""" Checks the batch controllers against one controller object per vehicle """
+
+__version__ = "0.1"
+__author__ = "Luminita-Cristiana Totu"
+__copyright__ = "Copyright (C) 2019 Luminita-Cristiana Totu"
+__license__ = "GNU GPLv3"
+
+import math
+import timeit
+import numpy as np
+
+from context import controllers, pid, envir
+
+N = 20
+steps = 200
+rng = np.random.default_rng(1)
+J = np.diag([1.4e-5, 1.4e-5, 2.17e-5])
+mass = 0.03 + 0.005*rng.random(N)
+
+name = "1500_pidarray_vs_pid"
+print("Running Test Case: %s" % name)
+# with integral action, to go through the anti-windup
+pids = [ pid.PID(2, 5, 0.1, 1, -1, 0.01), pid.PID(1, 0, 0.5, 0.5, -2, 0.05) ]
+bank = pid.PIDArray.from_pids(pids, N)
+loop = [ [ pid.PID(p.kp, p.ki, p.kd, p.limit_up, p.limit_down, p.tau) for p in pids ] 
+         for i in range(N) ]
+for k in range(steps):
+    error = rng.normal(0, 1, (N, 2))
+    bank.run(error, 0.01); u = bank.saturate(); bank.antiwindup()
+    for i in range(N):
+        for j in range(2):
+            loop[i][j].run(error[i,j], 0.01)
+            assert u[i,j] == loop[i][j].saturate()
+            loop[i][j].antiwindup()
+            assert bank.integrator[i,j] == loop[i][j].integrator
+print("  passed")
+
+name = "1501_attcontroller_batch"
+print("Running Test Case: %s" % name)
+batch = controllers.AttControllerBatch_01(N)
+loop = [ controllers.AttController_01() for i in range(N) ]
+for k in range(steps):
+    ref_rpy = rng.uniform(-math.pi, math.pi, (N, 3))
+    meas_rpy = rng.uniform(-math.pi, math.pi, (N, 3))
+    ref_omegab = batch.run_angle(ref_rpy, meas_rpy)
+    meas_omegab = rng.normal(0, 5, (N, 3))
+    tau = batch.run_rate(ref_omegab, meas_omegab, J)
+    tau_N = batch.run_rate(ref_omegab, meas_omegab, np.broadcast_to(J, (N, 3, 3)))
+    for i in range(N):
+        assert np.allclose(loop[i].run_angle(ref_rpy[i], meas_rpy[i]), ref_omegab[i], rtol=1e-12, atol=0)
+        assert np.allclose(loop[i].run_rate(ref_omegab[i], meas_omegab[i], J), tau[i], rtol=1e-12, atol=1e-18)
+        assert np.allclose(loop[i].run_rate(ref_omegab[i], meas_omegab[i], J), tau_N[i], rtol=1e-12, atol=1e-18)
+print("  passed")
+
+def testcase_template_A(ki):
+    """ PosControllerBatch_02 against one PosController_02 per vehicle,
+    with the integral gains ki of the velocity PIDs """
+
+    print("Running Test Case: %s, ki %s" % (name, ki))
+    batch = controllers.PosControllerBatch_02(N)
+    loop = [ controllers.PosController_02() for i in range(N) ]
+    batch.pid_v.ki[:] = ki
+    for c in loop:
+        c.pid_vx.ki, c.pid_vy.ki, c.pid_vz.ki = ki
+    for k in range(steps):
+        ref_pos = rng.normal(0, 3, (N, 3))
+        meas_pos = rng.normal(0, 3, (N, 3))
+        meas_ve = rng.normal(0, 2, (N, 3))
+        meas_yaw = rng.uniform(-math.pi, math.pi, N)
+        ref_ve = batch.run_pos(ref_pos, meas_pos)
+        rp_ref, thrust_ref = batch.run_vel(ref_ve, meas_ve, meas_yaw, mass)
+        for i in range(N):
+            assert np.allclose(loop[i].run_pos(ref_pos[i], meas_pos[i]), ref_ve[i], rtol=1e-12, atol=0)
+            rp, thrust = loop[i].run_vel(ref_ve[i], meas_ve[i], meas_yaw[i], mass[i])
+            assert np.allclose(rp, rp_ref[i], rtol=1e-9, atol=1e-12)
+            assert np.isclose(thrust, thrust_ref[i], rtol=1e-9, atol=0)
+            assert np.allclose([ loop[i].pid_vx.integrator, loop[i].pid_vy.integrator, 
+                                 loop[i].pid_vz.integrator ], batch.pid_v.integrator[i], 
+                               rtol=1e-9, atol=1e-12)
+    # saturated: 30 degrees tilt, thrust within [0.8mg, max_thrust]
+    assert np.all(np.max(abs(rp_ref), axis=1) <= 30*math.pi/180 + 1e-12)
+    assert np.all((thrust_ref >= 0.8*mass*envir.g - 1e-12) & (thrust_ref <= batch.max_thrust))
+    print("  passed")
+
+name = "1502_poscontroller_batch"
+testcase_template_A((0, 0, 0))
+testcase_template_A((0.5, 0.5, 0.2))
+
+name = "1503_controllers_batch_speed"
+print("Running Test Case: %s" % name)
+N = 100
+batch = controllers.AttControllerBatch_01(N)
+loop = [ controllers.AttController_01() for i in range(N) ]
+ref = rng.normal(0, 1, (N, 3)); meas = rng.normal(0, 1, (N, 3))
+t_batch = timeit.timeit(lambda: batch.run_rate(batch.run_angle(ref, meas), meas, J), number=100)
+t_loop = timeit.timeit(lambda: [ c.run_rate(c.run_angle(ref[i], meas[i]), meas[i], J) 
+                                 for i, c in enumerate(loop) ], number=100)
+print("  %d vehicles: batch %.2f ms, loop %.2f ms per step" % (N, 10*t_batch, 10*t_loop))
+print("  passed")
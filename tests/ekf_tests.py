@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+# 
+# Copyright 2021 Luminita-Cristiana Totu
+#
+# Part of the QuadrotorSim aka quadsim package
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this package, in a file called LICENSE.
+# If not, see <https://www.gnu.org/licenses/>.
+
+""" Unit Tests for the ekf module """
+
+__version__ = "0.1"
+__author__ = "Luminita-Cristiana Totu"
+__copyright__ = "Copyright (C) 2019 Luminita-Cristiana Totu"
+__license__ = "GNU GPLv3"
+
+import numpy as np
+import timeit
+
+from context import rb
+from context import ekf
+
+
+def make_filter(dfdx = rb.motion3d_ros_biases_dFXdX, **options):
+    return ekf.EKF(rb.motion3d_ros_biases, dfdx, 
+                   np.eye(21), Q, x0.copy(), P0.copy(), **options)
+
+def run_filter(filter, var):
+    """ predict, then the three updates, n_cycles times """
+    for k in range(n_cycles):
+        filter.predict(0, 0.01, 1)
+        filter.update(meas_pos[k], rb.motion3d_ros_biases_meas_pos, 
+                      rb.motion3d_ros_biases_meas_pos_dhdx, R_pos, var)
+        filter.update(meas_vb[k], rb.motion3d_ros_biases_meas_vb, 
+                      rb.motion3d_ros_biases_meas_vb_dhdx, R_vb, var)
+        filter.update(meas_imu[k], rb.motion3d_ros_biases_meas_imu, 
+                      rb.motion3d_ros_biases_meas_imu_dhdx, R_imu, var)
+    return filter
+
+def run_filter_reference(var):
+    """ the textbook equations, explicit inverse and dense products """
+    x = x0.copy(); P = P0.copy(); dt = 0.01
+    for k in range(n_cycles):
+        x = x + rb.motion3d_ros_biases(x, 0, 0)*dt
+        A = np.eye(21) + rb.motion3d_ros_biases_dFXdX(x, 0)*dt
+        P = A@P@A.T + dt*Q
+        for y, h, dhdx, R in [ (meas_pos[k], rb.motion3d_ros_biases_meas_pos, 
+                                rb.motion3d_ros_biases_meas_pos_dhdx, R_pos),
+                               (meas_vb[k], rb.motion3d_ros_biases_meas_vb, 
+                                rb.motion3d_ros_biases_meas_vb_dhdx, R_vb),
+                               (meas_imu[k], rb.motion3d_ros_biases_meas_imu, 
+                                rb.motion3d_ros_biases_meas_imu_dhdx, R_imu) ]:
+            H = dhdx(x)
+            K = P@H.T@np.linalg.inv(H@P@H.T + R)
+            x = x + K@(y - h(x))
+            if var == 0:
+                P = P - K@(H@P@H.T + R)@K.T
+            else:
+                IKH = np.eye(21) - K@H
+                P = IKH@P@IKH.T + K@R@K.T
+    return x, P
+
+def testcase_template_A(var, **options):
+    
+    print("Running Test Case: %s, var %d, %s" % (name, var, options))
+    x_ref, P_ref = run_filter_reference(var)
+    f = run_filter(make_filter(**options), var)
+    assert np.allclose(f.x, x_ref, rtol=1e-8, atol=1e-10)
+    assert np.allclose(f.P, P_ref, rtol=1e-8, atol=1e-12)
+    if var == 0:
+        assert np.array_equal(f.P, f.P.T)
+    print("  passed")
+
+#######################################################################
+
+np.random.seed(0)
+x0 = np.zeros(21); x0[2] = 3
+P0 = np.diag([100.0,100.0,100.0, 0.01,0.01,9.0, 9.0,9.0,9.0, 0.1,0.1,0.1, 
+              1,1,1, 1e-6,1e-6,1e-6, 1e-6,1e-6,1e-6])
+Q = np.diag([0.0001,0.0001,0.0001, 0.0001,0.0001,0.0001, 0.01,0.01,0.01, 
+             0.1,0.1,0.1, 1,1,1, 1e-6,1e-6,1e-6, 1e-6,1e-6,1e-6])
+R_pos = np.diag([0.02**2,0.02**2,0.05**2])
+R_vb = np.diag([0.1**2,0.1**2,0.1**2])
+R_imu = np.diag([1e-4,1e-4,1e-4, 1e-3,1e-3,1e-3])
+
+n_cycles = 20
+meas_pos = np.array([0,0,3]) + np.random.normal(0, 0.02, (n_cycles,3))
+meas_vb = np.random.normal(0, 0.1, (n_cycles,3))
+meas_imu = np.array([0,0,0,0,0,9.81]) + np.random.normal(0, 0.01, (n_cycles,6))
+
+name = "0500_ekf_vs_reference"
+for var in (0, 1):
+    testcase_template_A(var)
+    testcase_template_A(var, F_rows = np.arange(9))
+    testcase_template_A(var, F_rows = rb.motion3d_ros_biases_F_rows, rows = True,
+                        dfdx = rb.motion3d_ros_biases_dFXdX_rows)
+    # all the rows listed, dfdx returning the full matrix
+    testcase_template_A(var, F_rows = np.arange(21))
+    testcase_template_A(var, F_rows = np.arange(21), rows = True)
+
+name = "0501_jacobians_vs_finite_differences"
+print("Running Test Case: %s" % name)
+eps = 1e-6
+for k in range(10):
+    X = np.random.normal(0, 1, 21)
+    for f, dfdx in [ (lambda X: rb.motion3d_ros_biases(X, 0, 0), 
+                      lambda X: rb.motion3d_ros_biases_dFXdX(X, 0)),
+                     (rb.motion3d_ros_biases_meas_pos, rb.motion3d_ros_biases_meas_pos_dhdx),
+                     (rb.motion3d_ros_biases_meas_vb, rb.motion3d_ros_biases_meas_vb_dhdx),
+                     (rb.motion3d_ros_biases_meas_imu, rb.motion3d_ros_biases_meas_imu_dhdx),
+                     (lambda X: rb.motion3d_ros(X[:15], 0, 0), 
+                      lambda X: rb.motion3d_ros_dFXdX(X[:15], 0)),
+                     (lambda X: rb.motion3d_ros_meas_imu(X[:15]), 
+                      lambda X: rb.motion3d_ros_meas_imu_dhdx(X[:15])) ]:
+        J = dfdx(X)
+        J_fd = np.array([ (f(X + eps*e) - f(X - eps*e))/2/eps for e in np.eye(J.shape[1], 21) ]).transpose()
+        assert np.allclose(J, J_fd, atol=1e-5)
+    assert np.array_equal(rb.motion3d_ros_biases_dFXdX_rows(X, 0), 
+                          rb.motion3d_ros_biases_dFXdX(X, 0)[rb.motion3d_ros_biases_F_rows])
+assert not rb.motion3d_ros_biases_meas_pos_dhdx(X).flags.writeable
+print("  passed")
+
+name = "0502_ekf_speedcheck"
+print("Running Test Case: %s" % name)
+M = 10
+for options in ({}, {"F_rows": np.arange(9)},
+                {"F_rows": np.arange(9), "rows": True, "dfdx": rb.motion3d_ros_biases_dFXdX_rows}):
+    t = timeit.timeit(lambda: run_filter(make_filter(**options), 1), number=M)/M/n_cycles
+    print("predict + 3 updates, %-45s %.3e s" % (options, t))
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+# 
+# Copyright 2021 Luminita-Cristiana Totu
+#
+# Part of the QuadrotorSim aka quadsim package
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this package, in a file called LICENSE.
+# If not, see <https://www.gnu.org/licenses/>.
+
+""" Unit Tests for the vectorized forces and torques of ftaucf """
+
+__version__ = "0.1"
+__author__ = "Luminita-Cristiana Totu"
+__copyright__ = "Copyright (C) 2019 Luminita-Cristiana Totu"
+__license__ = "GNU GPLv3"
+
+import numpy as np
+import math
+import timeit
+
+from context import qftau_cf
+
+
+def input2ftau_rotor_by_rotor(qftau, cmd, vb):
+    """ Reference, evaluates the model one rotor at a time """
+    
+    cmd = [ int(min(max(c, 0), 2**16-1)) for c in cmd ]
+    ft = [ qftau.input2thrust_i(c) for c in cmd ]
+    taur = [ qftau.thrust2torque_i(f) for f in ft ]
+    omegar = np.array([ qftau.input2omegar_i(c) for c in cmd ])
+    fb = np.array([0,0,sum(ft)]) + qftau.f_aero(omegar, vb)
+    if qftau.plus is True:
+        taub_x = (ft[1] - ft[3])*qftau.radius
+        taub_y = (ft[2] - ft[0])*qftau.radius
+    else:
+        taub_x = (ft[1] + ft[2] - ft[0] - ft[3])*math.sqrt(2)/2*qftau.radius
+        taub_y = (ft[2] + ft[3] - ft[1] - ft[0])*math.sqrt(2)/2*qftau.radius
+    taub_z = -taur[0] - taur[2] + taur[1] + taur[3]
+    return fb, np.array([taub_x, taub_y, taub_z])
+
+def testcase_template_A(plus):
+    """ Single and batch calls against the rotor by rotor reference """
+    
+    print("Running Test Case: %s, plus = %s" % (name, plus))
+    qftau = qftau_cf.QuadFTau_CF(0, plus)
+    
+    fb_ref = np.zeros((N,3)); taub_ref = np.zeros((N,3))
+    for i in range(N):
+        fb_ref[i], taub_ref[i] = input2ftau_rotor_by_rotor(qftau, cmd[i], vb[i])
+        fb, taub = qftau.input2ftau(cmd[i].copy(), vb[i])
+        assert fb.shape == (3,) and taub.shape == (3,)
+        assert np.allclose(fb, fb_ref[i], rtol=1e-12, atol=1e-15)
+        assert np.allclose(taub, taub_ref[i], rtol=1e-12, atol=1e-15)
+    
+    fb, taub = qftau.input2ftau(cmd, vb)
+    assert fb.shape == (N,3) and taub.shape == (N,3)
+    assert np.allclose(fb, fb_ref, rtol=1e-12, atol=1e-15)
+    assert np.allclose(taub, taub_ref, rtol=1e-12, atol=1e-15)
+    print("  passed")
+
+#######################################################################
+
+np.random.seed(0)
+N = 500
+cmd = np.random.uniform(-5000, 70000, (N,4))
+cmd[0] = [999, 1000, 1001, 65535]  # around the dead-bands
+cmd[1] = [0, 0, 0, 0]
+vb = np.random.normal(0, 2, (N,3))
+
+name = "0300_ftaucf_input2ftau_vectorized"
+testcase_template_A(True)
+testcase_template_A(False)
+
+name = "0301_ftaucf_input2ftau_lut"
+print("Running Test Case: %s" % name)
+for plus in (True, False):
+    qftau = qftau_cf.QuadFTau_CF(0, plus)
+    qftau_lut = qftau_cf.QuadFTau_CF(0, plus, lut = True)
+    fb, taub = qftau.input2ftau(cmd, vb)
+    fb_lut, taub_lut = qftau_lut.input2ftau(cmd, vb)
+    assert np.allclose(fb, fb_lut, rtol=1e-12, atol=1e-15)
+    assert np.allclose(taub, taub_lut, rtol=1e-12, atol=1e-15)
+    fb_lut, taub_lut = qftau_lut.input2ftau(cmd[0], vb[0])
+    assert np.allclose(fb[0], fb_lut, rtol=1e-12, atol=1e-15)
+    assert np.allclose(taub[0], taub_lut, rtol=1e-12, atol=1e-15)
+# the tables are shared between instances 
+assert qftau_lut.lut_thrust is qftau_cf.QuadFTau_CF(0, lut = True).lut_thrust
+print("  passed")
+
+name = "0302_ftaucf_input2ftau_speedcheck"
+print("Running Test Case: %s" % name)
+qftau = qftau_cf.QuadFTau_CF(0)
+qftau_lut = qftau_cf.QuadFTau_CF(0, lut = True)
+M = 20
+t_ref = timeit.timeit(lambda: [ input2ftau_rotor_by_rotor(qftau, cmd[i], vb[i]) 
+                                for i in range(N) ], number=M)/M
+t_vec = timeit.timeit(lambda: qftau.input2ftau(cmd, vb), number=M)/M
+t_lut = timeit.timeit(lambda: qftau_lut.input2ftau(cmd, vb), number=M)/M
+print("N = %d, rotor by rotor %.3e s, vectorized %.3e s, tables %.3e s \n" 
+      % (N, t_ref, t_vec, t_lut))
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+# 
+# Copyright 2021 Luminita-Cristiana Totu
+#
+# Part of the QuadrotorSim aka quadsim package
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this package, in a file called LICENSE.
+# If not, see <https://www.gnu.org/licenses/>.
+
+
+""" Unit Tests for the logger module """
+
+__version__ = "0.1"
+__author__ = "Luminita-Cristiana Totu"
+__copyright__ = "Copyright (C) 2019 Luminita-Cristiana Totu"
+__license__ = "GNU GPLv3"
+
+import numpy as np
+import math
+import time
+import os
+import subprocess
+import sys
+import gc
+import weakref
+
+from context import rb
+from context import log
+from context import plot
+
+def fill_logger(logger, n):
+    quad = rb.rigidbody(np.array([0.0,0,0]), np.array([1.0,0,0,0]), np.zeros(3), 
+                        np.zeros(3), np.zeros(3), 1.0, np.diag([0.1,0.1,0.2]), 
+                        integrator = "rk4")
+    for k in range(n):
+        t = k*0.01
+        quad.run_quadrotor_dynamic_quat(0.01, np.array([0.1,0.2,9.9]), np.array([0.01,-0.02,0.03]))
+        logger.log_rigidbody(t, quad)
+        logger.log_cmd(t, np.array([30000,30001,30002,30003]))
+        logger.log_ftau(t, np.ones(3), 2*np.ones(3), 3*np.ones(3), 4*np.ones(3))
+        logger.log_attstab(t, np.array([0.1,0.2,0.3]), np.array([0.4,0.5,0.6]), np.ones(3))
+        logger.log_posctrl(t, np.array([1.0,2,3]))
+        logger.log_filter(t, np.arange(21)*0.5 + t)
+    return quad
+
+name = "0800_logger_npz_roundtrip"
+print("Running Test Case: %s" % name)
+logger = log.Logger("testresults/logger", name)
+fill_logger(logger, 200)
+fullname = logger.save()
+loaded = log.Logger.load(fullname)
+assert loaded.basename == name
+for channel in log.Logger.channels:
+    assert np.array_equal(np.asarray(getattr(logger, channel), dtype=float), 
+                          getattr(loaded, channel)), channel
+assert loaded.rb_pos.shape == (200,3) and loaded.rb_pos.dtype == np.float64
+print("  passed")
+
+name = "0801_logger_text_export"
+print("Running Test Case: %s" % name)
+logger.log2file_rigidbody()
+logger.log2file_cmd()
+logger.log2file_ftau()
+data = np.loadtxt("testresults/logger/0800_logger_npz_roundtrip__rigidbody.txt", skiprows=1)
+expected = np.hstack([ np.asarray(logger.rb_time)[:,None], logger.rb_pos, logger.rb_ve, 
+                       logger.rb_vb, logger.rb_euler, logger.rb_omegab, logger.rb_alphab ])
+assert np.allclose(data, expected, rtol=0, atol=1e-8)
+data = np.loadtxt("testresults/logger/0800_logger_npz_roundtrip__cmd.txt", skiprows=1)
+assert data.shape == (200,5) and np.all(data[:,1:] == [30000,30001,30002,30003])
+with open("testresults/logger/0800_logger_npz_roundtrip__ftau.txt") as f:
+    assert f.readline() == "time fe taue fb taub \n"
+    assert f.readline().split() == ["0.00000000"] + ["1.00000000"]*3 + ["3.00000000"]*3 \
+                                   + ["2.00000000"]*3 + ["4.00000000"]*3
+print("  passed")
+
+name = "0802_logger_channels"
+print("Running Test Case: %s" % name)
+c = log.Channel(chunk = 3)
+for k in range(10):
+    c.append([k, 2*k])
+assert len(c) == 10 and np.array_equal(np.asarray(c)[:,0], np.arange(10))
+c = log.Channel(maxlen = 4)
+for k in range(10):
+    c.append(k)
+assert len(c) == 4 and c.n == 10 and np.array_equal(np.asarray(c), [6,7,8,9])
+c = log.Channel(180/math.pi)
+c.append(np.array([math.pi, 0.5*math.pi]))
+assert np.allclose(np.asarray(c), [[180, 90]]) and np.allclose(c.data, [[math.pi, 0.5*math.pi]])
+logger = log.Logger("testresults/logger", name, window = 1.0, dt_log = 0.01)
+quad = fill_logger(logger, 250)
+assert len(logger.rb_time) == 100 and np.allclose(np.asarray(logger.rb_time)[[0,-1]], [1.5, 2.49])
+assert np.allclose(logger.rb_euler[-1], 180/math.pi*quad.rpy)
+assert np.allclose(logger.filter_euler[-1], 180/math.pi*(np.arange(3,6)*0.5 + 2.49))
+print("  passed")
+
+name = "0803_logger_stream"
+print("Running Test Case: %s" % name)
+logger = log.Logger("testresults/logger", name, stream = True, chunk = 64)
+ref = log.Logger("testresults/logger", name + "_ref")
+fill_logger(logger, 1000)
+fill_logger(ref, 1000)
+assert len(logger.rb_pos) == 1000 - 15*64  # the rest is already on its way to disk
+logger.close()
+loaded = log.Logger.load("testresults/logger/" + name + "__log")
+for channel in ("rb_time", "rb_pos", "rb_euler", "cmd_rotors", "filter_euler"):
+    assert np.allclose(getattr(loaded, channel), np.asarray(getattr(ref, channel))), channel
+# a run killed without closing the logger, the last file cut mid sample 
+subprocess.run([sys.executable, "-c", """if True:
+    import time, os
+    import numpy as np
+    from context import log
+    logger = log.Logger("testresults/logger", "0803_killed", stream = True, chunk = 100)
+    for k in range(1050):
+        logger.log_posctrl(k*0.01, np.array([k, 2*k, 3*k]))
+    time.sleep(0.5)
+    os._exit(1)
+"""])
+with open("testresults/logger/0803_killed__log/posctrl_pos_ref.f64", "ab") as f:
+    f.write(b"\x00"*12)
+loaded = log.Logger.load("testresults/logger/0803_killed__log")
+assert loaded.posctrl_time.shape == (1000,) and loaded.posctrl_pos_ref.shape == (1000,3)
+assert np.array_equal(loaded.posctrl_pos_ref[-1], [999, 1998, 2997])
+# a closed logger is released, with its writer thread
+logger = log.Logger("testresults/logger", name + "_closed", stream = True)
+thread = logger.writer.thread
+logger.close()
+logger = weakref.ref(logger)
+gc.collect()
+assert logger() is None and not thread.is_alive()
+print("  passed")
+
+name = "0804_logreader"
+print("Running Test Case: %s" % name)
+logger = log.Logger("testresults/logger", name)
+fill_logger(logger, 300)
+reader = log.LogReader(logger.save())
+assert isinstance(reader.rb_pos, np.memmap) and not reader.rb_pos.flags.writeable
+assert reader.rb_pos is reader.rb_pos  # opened once
+for channel in log.Logger.channels:
+    assert np.array_equal(getattr(reader, channel), np.asarray(getattr(logger, channel))), channel
+stream_logger = log.Logger("testresults/logger", name + "_stream", stream = True, chunk = 64)
+fill_logger(stream_logger, 300)
+stream_logger.close()
+reader = log.open_log("testresults/logger/" + name + "_stream__log")
+assert isinstance(reader.rb_pos, np.memmap) and reader.basename == name + "_stream"
+assert np.allclose(reader.rb_euler, np.asarray(logger.rb_euler))
+assert reader.filter_vb.shape == (0,) and log.open_log(reader) is reader
+plotter = plot.Plotter()
+plotter.plot_posctrl("testresults/logger/" + name + "__log.npz")
+assert os.path.exists("testresults/logger/" + name + "__posctrl_pos_ref.png")
+print("  passed")
+
+name = "0805_logger_speedcheck"
+print("Running Test Case: %s" % name)
+logger = log.Logger("testresults/logger", name)
+t0 = time.perf_counter(); fill_logger(logger, 20000); t1 = time.perf_counter()
+print("20000 samples: logging incl. simulation %.3f s" % (t1-t0))
+t0 = time.perf_counter(); logger.log2file_rigidbody(); t1 = time.perf_counter()
+logger.save(); t2 = time.perf_counter()
+print("20000 samples: text rigidbody %.3f s, npz all channels %.3f s" % (t1-t0, t2-t1))
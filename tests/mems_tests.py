@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+# 
+# Copyright 2021 Luminita-Cristiana Totu
+#
+# Part of the QuadrotorSim aka quadsim package
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this package, in a file called LICENSE.
+# If not, see <https://www.gnu.org/licenses/>.
+
+
+""" Unit Tests for the mems module """
+
+__version__ = "0.1"
+__author__ = "Luminita-Cristiana Totu"
+__copyright__ = "Copyright (C) 2019 Luminita-Cristiana Totu"
+__license__ = "GNU GPLv3"
+
+import numpy as np
+import math
+import timeit
+
+from context import mems
+
+rw = 0.0035/180.0*math.pi
+rrw = 0.000023/180.0*math.pi
+dt = 0.001
+n_steps = 20000
+
+def run_bank(bank, n_steps, value):
+    return np.array([ bank.run_mems(dt, value) for k in range(n_steps) ])
+
+name = "0600_memsbank_statistics"
+print("Running Test Case: %s" % name)
+# white noise: measurement minus the bias, bias steps: the bias increments
+bank = mems.MemsBank(rw, rrw, np.zeros(3), seed=0, block=1000)
+biases = []; wn = []
+for k in range(n_steps):
+    y = bank.run_mems(dt, np.zeros(3))
+    biases.append(bank.bias.copy()); wn.append(y - bank.bias)
+wn = np.array(wn); db = np.diff(np.array(biases), axis=0)
+assert np.allclose(wn.std(axis=0), rw/math.sqrt(dt), rtol=0.05)
+assert np.allclose(db.std(axis=0), rrw/math.sqrt(dt), rtol=0.05)
+assert np.all(np.abs(wn.mean(axis=0)) < 5*rw/math.sqrt(dt)/math.sqrt(n_steps))
+print("  passed")
+
+name = "0601_memsbank_reproducible_streams"
+print("Running Test Case: %s" % name)
+Y1 = run_bank(mems.MemsBank(rw, rrw, np.zeros(3), seed=7), 500, np.ones(3))
+Y2 = run_bank(mems.MemsBank(rw, rrw, np.zeros(3), seed=7, block=64), 500, np.ones(3))
+assert np.array_equal(Y1, Y2)  # the block size does not change the stream
+Y3 = run_bank(mems.MemsBank(rw, rrw, np.zeros((4,3)), seed=7, block=100), 500, np.ones((4,3)))
+assert Y3.shape == (500,4,3)
+assert np.array_equal(Y1, Y3[:,0,:])  # vehicle 0 does not depend on the fleet size 
+assert not np.allclose(Y3[:,0,:], Y3[:,1,:])
+bank = mems.MemsBank(rw, rrw, np.zeros(3), seed=7, block=64)
+Y5 = np.array([ bank.run_mems(dt if k < 300 else 2*dt, np.ones(3)) for k in range(500) ])
+assert np.array_equal(Y1[:300], Y5[:300]) and not np.allclose(Y1[300:], Y5[300:])
+Y4 = run_bank(mems.MemsBank(rw, rrw, np.zeros(3), seed=8), 500, np.ones(3))
+assert not np.allclose(Y1, Y4)
+print("  passed")
+
+name = "0602_memsbank_speedcheck"
+print("Running Test Case: %s" % name)
+M = 20000
+axes = [ mems.mems(rw, rrw, 0) for i in range(6) ]
+t_old = timeit.timeit(lambda: [ a.run_mems(dt, 0.1) for a in axes ], number=M)/M
+gyro = mems.MemsBank(rw, rrw, np.zeros(3), seed=1, block=M)
+acc = mems.MemsBank(rw, rrw, np.zeros(3), seed=2, block=M)
+value = np.full(3, 0.1)
+t_new = timeit.timeit(lambda: (gyro.run_mems(dt, value), acc.run_mems(dt, value)), number=M)/M
+print("6 axes per step: mems %.3e s, 2 MemsBank %.3e s" % (t_old, t_new))
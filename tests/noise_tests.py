@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+# 
+# Copyright 2021 Luminita-Cristiana Totu
+#
+# Part of the QuadrotorSim aka quadsim package
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this package, in a file called LICENSE.
+# If not, see <https://www.gnu.org/licenses/>.
+
+
+""" Unit Tests for the noise module """
+
+__version__ = "0.1"
+__author__ = "Luminita-Cristiana Totu"
+__copyright__ = "Copyright (C) 2019 Luminita-Cristiana Totu"
+__license__ = "GNU GPLv3"
+
+import numpy as np
+import tempfile
+import timeit
+
+from context import noise
+from context import mems
+
+name = "0700_noise_reproducible_streams"
+print("Running Test Case: %s" % name)
+Z1 = noise.NoiseStreams(seed=3).stream("gps", 3, block=100).take(1000)
+streams = noise.NoiseStreams(seed=3)
+other = streams.stream("vb", 3, block=100)
+gps = streams.stream("gps", 3, block=100)
+Z2 = []
+for k in range(1000):
+    other.next()  # other streams do not change gps
+    Z2.append(gps.next())
+assert np.array_equal(Z1, np.array(Z2))
+assert not np.allclose(Z1, noise.NoiseStreams(seed=4).stream("gps", 3, block=100).take(1000))
+assert not np.allclose(Z1, noise.NoiseStreams(seed=3).stream("vb", 3, block=100).take(1000))
+gps = noise.NoiseStreams(seed=3).stream("gps", 3, block=100)
+assert np.array_equal(Z1, np.concatenate([gps.take(150), gps.take(1), gps.take(849)]))
+assert abs(Z1.mean()) < 0.1 and abs(Z1.std() - 1) < 0.05
+seed = noise.NoiseStreams().seed
+assert np.array_equal(noise.NoiseStreams(seed).stream("gps", 3).take(10), 
+                      noise.NoiseStreams(seed).stream("gps", 3).take(10))
+bank1 = mems.MemsBank(1, 1, np.zeros(3), seed=noise.NoiseStreams(seed=3).seed_sequence("gyro"))
+bank2 = mems.MemsBank(1, 1, np.zeros(3), seed=noise.NoiseStreams(seed=3).seed_sequence("gyro"))
+assert np.array_equal(bank1.run_mems(0.01, np.zeros(3)), bank2.run_mems(0.01, np.zeros(3)))
+print("  passed")
+
+name = "0701_noise_cache"
+print("Running Test Case: %s" % name)
+with tempfile.TemporaryDirectory() as cache_dir:
+    Z3 = noise.NoiseStreams(seed=3, cache_dir=cache_dir).stream("gps", 3, block=100).take(1000)
+    gps = noise.NoiseStreams(seed=3, cache_dir=cache_dir).stream("gps", 3, block=100)
+    z = gps.next()
+    assert isinstance(gps._z, np.memmap)  # second run reads the cached blocks
+    Z4 = np.concatenate([ z[None], gps.take(999) ])
+assert np.array_equal(Z1, Z3) and np.array_equal(Z1, Z4)
+print("  passed")
+
+name = "0702_noise_speedcheck"
+print("Running Test Case: %s" % name)
+M = 20000
+gps = noise.NoiseStreams(seed=3).stream("gps", 3)
+t_old = timeit.timeit(lambda: np.random.normal(0, 0.04, 3), number=M)/M
+t_new = timeit.timeit(lambda: 0.04*gps.next(), number=M)/M
+print("one 3-axis sample: np.random.normal %.3e s, NoiseStream %.3e s" % (t_old, t_new))
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+# 
+# Copyright 2019 Luminita-Cristiana Totu
+#
+# Part of the QuadrotorSim aka quadsim package
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this package, in a file called LICENSE.
+# If not, see <https://www.gnu.org/licenses/>.
+
+
+""" Unit Tests for the PID controller """
+
+__version__ = "0.1"
+__author__ = "Luminita-Cristiana Totu"
+__copyright__ = "Copyright (C) 2019 Luminita-Cristiana Totu"
+__license__ = "GNU GPLv3"
+
+import timeit
+import numpy as np
+
+from context import pid
+
+rng = np.random.default_rng(2)
+
+name = "1600_pid_step_vs_run"
+print("Running Test Case: %s" % name)
+for gains in ((2, 5, 0.1, 1, -1, 0.01), (50, 0, 0, 25.1, -25.1, 0.01), (3, 0, 3.5, 10, -10, 0.1)):
+    p1 = pid.PID(*gains)
+    p2 = pid.PID(*gains, Ts=0.0025)
+    for error in rng.normal(0, 1, 500):
+        p1.run(error, 0.0025); u1 = p1.saturate(); p1.antiwindup()
+        u2 = p2.step(error)
+        # bit for bit the same states and outputs
+        assert u1 == u2 and p1.u_unsat == p2.u_unsat
+        assert p1.integrator == p2.integrator and p1.differentiator == p2.differentiator
+print("  passed")
+
+name = "1601_pid_coefficients"
+print("Running Test Case: %s" % name)
+p = pid.PID(1, 2, 0.5, 10, -10, 0.05)
+assert not hasattr(p, "__dict__") and p.Ts == 0
+try:
+    p.step(1.0)
+    assert False
+except ValueError:
+    pass
+p.run(1.0, 0.01)
+assert p.Ts == 0.01
+# the coefficients follow the changes of ki, tau and Ts
+p.ki = 4; p.tau = 0.1; p.Ts = 0.02
+q = pid.PID(1, 2, 0.5, 10, -10, 0.05)
+q.run(1.0, 0.01)
+q.ki = 4; q.tau = 0.1
+for error in (0.5, 20.0, -3.0):
+    # run recomputes the coefficients from ki, tau and Ts
+    q.run(error, 0.02); q.saturate(); q.antiwindup()
+    assert p.step(error) == q.u and p.integrator == q.integrator
+print("  passed")
+
+name = "1602_pid_step_speed"
+print("Running Test Case: %s" % name)
+p1 = pid.PID(50, 1, 0.1, 25.1, -25.1, 0.01)
+p2 = pid.PID(50, 1, 0.1, 25.1, -25.1, 0.01, 0.002)
+def separate():
+    p1.run(0.3, 0.002); p1.saturate(); p1.antiwindup()
+t_separate = min(timeit.repeat(separate, number=100000, repeat=5))
+t_step = min(timeit.repeat(lambda: p2.step(0.3), number=100000, repeat=5))
+print("  run, saturate, antiwindup %.2f us, step %.2f us" % (10*t_separate, 10*t_step))
+print("  passed")
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+# 
+# Copyright 2021 Luminita-Cristiana Totu
+#
+# Part of the QuadrotorSim aka quadsim package
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this package, in a file called LICENSE.
+# If not, see <https://www.gnu.org/licenses/>.
+
+
+""" Unit Tests for the plotter module """
+
+__version__ = "0.1"
+__author__ = "Luminita-Cristiana Totu"
+__copyright__ = "Copyright (C) 2019 Luminita-Cristiana Totu"
+__license__ = "GNU GPLv3"
+
+import numpy as np
+import os
+import time
+
+import matplotlib
+matplotlib.use("Agg")
+
+from context import rb
+from context import log
+from context import plot
+from context import mems
+
+def fill_logger(logger, n):
+    quad = rb.rigidbody(np.array([0.0,0,0]), np.array([1.0,0,0,0]), np.zeros(3), 
+                        np.zeros(3), np.zeros(3), 1.0, np.diag([0.1,0.1,0.2]), 
+                        integrator = "rk4")
+    gyro = mems.MemsBank(1e-4, 1e-5, np.zeros(3), seed=1, block=n)
+    acc = mems.MemsBank(1e-3, 1e-4, np.zeros(3), seed=2, block=n)
+    for k in range(n):
+        t = k*0.0025
+        quad.run_quadrotor_dynamic_quat(0.0025, np.array([0.1,0.2,9.9]), 
+                                        np.array([0.01*np.sin(t),-0.02,0.03]))
+        logger.log_rigidbody(t, quad)
+        logger.log_cmd(t, np.array([30000,30001,30002,30003]) + 1000*np.sin(t))
+        logger.log_ftau(t, np.ones(3), 2*np.ones(3), 3*np.ones(3), 4*np.ones(3))
+        logger.log_attstab(t, np.array([0.1,0.2,0.3]), np.array([0.4,0.5,0.6]), np.ones(3))
+        logger.log_posctrl(t, np.array([1.0,2,3]))
+        logger.log_filter(t, np.arange(21)*0.5 + t)
+        gyro.run_mems(0.0025, quad.omegab); acc.run_mems(0.0025, quad.abmg)
+        logger.log_mems(t, gyro, acc)
+    return quad
+
+if __name__ == "__main__":
+
+    name = "0900_minmax_decimate"
+    print("Running Test Case: %s" % name)
+    np.random.seed(0)
+    x = np.arange(100003)*0.01
+    y = np.cumsum(np.random.normal(0, 1, 100003))
+    xd, yd = plot.minmax_decimate(x, y, 1000)
+    assert len(xd) == 2002 and np.all(np.diff(xd) >= 0)
+    assert yd.max() == y.max() and yd.min() == y.min()
+    for b in (0, 500, 999):  # the envelope of each bin is kept
+        assert yd[2*b:2*b+2].min() == y[100*b:100*b+100].min()
+        assert yd[2*b:2*b+2].max() == y[100*b:100*b+100].max()
+    assert len(plot.minmax_decimate(x[:2000], y[:2000], 1000)[1]) == 2000
+    print("  passed")
+
+    name = "0901_plotter_skip_unchanged"
+    print("Running Test Case: %s" % name)
+    logger = log.Logger("testresults/plotter", name)
+    quad = fill_logger(logger, 20000)
+    fullname = logger.save()
+    plotter = plot.Plotter()
+    t0 = time.perf_counter(); plotter.plot_all(fullname, processes = 1); t1 = time.perf_counter()
+    png = "testresults/plotter/" + name + "__rigidbody_pos.png"
+    mtime = os.path.getmtime(png)
+    plotter.plot_all(fullname, processes = 1); t2 = time.perf_counter()
+    assert os.path.getmtime(png) == mtime
+    logger.log_rigidbody(50.0, quad)
+    logger.log_filter(50.0, np.zeros(21))
+    plotter.plot_rigidbody(logger)
+    assert os.path.getmtime(png) != mtime
+    print("  passed")
+    print("all groups: first %.2f s, unchanged %.2f s" % (t1-t0, t2-t1))
+
+    name = "0902_plotter_pool"
+    print("Running Test Case: %s" % name)
+    logger = log.Logger("testresults/plotter", name)
+    fill_logger(logger, 20000)
+    plotter.n_bins = 0
+    t0 = time.perf_counter(); plotter.plot_all(logger, processes = 1); t1 = time.perf_counter()
+    for f in os.listdir("testresults/plotter"):
+        if f.startswith(name) and f.endswith(".png"):
+            os.remove("testresults/plotter/" + f)
+    plotter.n_bins = 2000
+    t2 = time.perf_counter(); plotter.plot_all(logger, processes = None); t3 = time.perf_counter()
+    for group in ("rigidbody_pos", "rigidbody_eulerXYZ", "cmd_rotors", "attstab_angle_ref", 
+                  "attstab_omega_ref", "attstab_tau_ref", "posctrl_pos_ref", 
+                  "mems_gyro_bias", "mems_acc_bias"):
+        assert os.path.exists("testresults/plotter/" + name + "__" + group + ".png"), group
+    print("  passed")
+    print("all groups, 20000 samples: serial, all samples %.2f s; pool, decimated %.2f s" 
+          % (t1-t0, t3-t2))
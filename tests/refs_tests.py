@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2019 Luminita-Cristiana Totu
+#
+# Part of the QuadrotorSim aka quadsim package
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this package, in a file called LICENSE.
+# If not, see <https://www.gnu.org/licenses/>.
+
+""" Unit Tests for the reference trajectories """
+
+__version__ = "0.1"
+__author__ = "Luminita-Cristiana Totu"
+__copyright__ = "Copyright (C) 2019 Luminita-Cristiana Totu"
+__license__ = "GNU GPLv3"
+
+import os
+import json
+import math
+import numpy as np
+
+from context import refs, ut
+
+folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "testresults")
+
+name = "1400_refs_legacy_tables"
+print("Running Test Case: %s" % name)
+# the tables of the former if-chain of buildCtrlReference
+pos_x_ref, pos_y_ref, pos_z_ref, yaw_ref, name2 = refs.buildCtrlReference("step")
+assert name2 == "step"
+assert np.array_equal(pos_x_ref, ut.build_signal_step(0,90,0,refs.StepAndRampMetaSignal(3,13,20),
+                                                       refs.StepAndRampMetaSignal(63,73,-20)))
+assert np.array_equal(yaw_ref, ut.build_signal_step(0,90,0,
+    refs.StepAndRampMetaSignal(3,13,45*math.pi/180), refs.StepAndRampMetaSignal(23,33,45*math.pi/180),
+    refs.StepAndRampMetaSignal(43,53,45*math.pi/180), refs.StepAndRampMetaSignal(63,73,-45*math.pi/180)))
+f = 1.0/10.0
+pos_x_ref = refs.buildCtrlReference("sin")[0]
+assert np.array_equal(pos_x_ref, ut.build_signal_sin(0,27,0,refs.SinMetaSignal(3,10,1,1/f,20),
+                                                      refs.SinMetaSignal(63,10,1,1/f,20)))
+yaw_ref = refs.buildCtrlReference("ramp")[3]
+assert np.array_equal(yaw_ref, ut.build_signal_ramp(0,90,0,
+    refs.StepAndRampMetaSignal(3,13,120*math.pi/180), refs.StepAndRampMetaSignal(23,33,120*math.pi/180),
+    refs.StepAndRampMetaSignal(43,53,120*math.pi/180), refs.StepAndRampMetaSignal(63,73,-120*math.pi/180)))
+assert refs.buildCtrlReference("manual") == (None, None, None, None, "manual")
+print("  passed")
+
+name = "1401_refs_minsnap"
+print("Running Test Case: %s" % name)
+points = np.array([ [0,0], [10,10], [20,10], [30,0], [40,0] ], dtype=float)
+curve = refs.PolyAxis(refs.minsnap(points))
+assert np.allclose(curve.evaluate(points[:,0]), points[:,1])
+for der in (1, 2, 3):
+    assert np.allclose(curve.evaluate([0, 40], der), 0, atol=1e-9)  # at rest at the ends
+    # continuous at the points
+    assert np.allclose(curve.evaluate(points[1:-1,0]-1e-9, der), curve.evaluate(points[1:-1,0]+1e-9, der), atol=1e-6)
+# velocity, acceleration against finite differences
+t = np.linspace(0, 40, 40001)
+p, v, a = [ curve.evaluate(t, der) for der in (0, 1, 2) ]
+assert np.allclose(np.gradient(p, t)[1:-1], v[1:-1], atol=1e-5)
+assert np.allclose(np.gradient(v, t)[1:-1], a[1:-1], atol=1e-5)
+# less snap than smoothsteps between the points, also at rest at the points
+s = np.clip((t[:,None] - points[:-1,0])/10.0, 0, 1)
+snap_steps = np.sum(np.diff(points[:,1])*(840 - 10080*s + 25200*s**2 - 16800*s**3)/10.0**4
+                    *((s > 0) & (s < 1)), axis=1)
+snap_curve = curve.evaluate(t, 4)
+assert np.sum(snap_curve**2) < 0.9*np.sum(snap_steps**2)
+print("  passed")
+
+name = "1402_refs_library_and_cache"
+print("Running Test Case: %s" % name)
+if not os.path.exists(folder):
+    os.makedirs(folder)
+library = { "line": { "x": { "type": "spline", "points": [ [0,0], [5,5] ] },
+                      "y": { "type": "table", "table": [ [0,0], [5,0] ] },
+                      "z": { "type": "cubic", "points": [ [0,3], [2,4], [5,3] ] },
+                      "yaw": { "type": "minsnap", "unit": "deg", "points": [ [0,0], [5,90] ] } } }
+fullname = os.path.join(folder, name + ".json")
+with open(fullname, "w") as fp:
+    json.dump(library, fp)
+trajectory = refs.trajectory("line", fullname)
+assert trajectory is refs.trajectory("line", fullname)
+assert trajectory is refs.compile_trajectory(json.loads(json.dumps(library["line"])))
+assert trajectory.t_end == 5
+pos, vel, acc = trajectory.sample(np.array([-1.0, 0.0, 2.5, 5.0, 6.0]))
+assert pos.shape == (5,4) and np.allclose(pos[:,0], [0, 0, 2.5, 5, 5])
+assert np.isclose(pos[-1,3], math.pi/2) and np.allclose(vel[[0,-1]], 0)
+assert np.allclose(trajectory.evaluate(2.5), pos[2])
+tables = trajectory.tables(0.5)
+assert np.allclose(ut.give_signal(tables[0], 2.5), 2.5)
+try:
+    refs.trajectory("circle", fullname)
+    assert False
+except ValueError:
+    pass
+print("  passed")
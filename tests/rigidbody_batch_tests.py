@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+# 
+# Copyright 2019 Luminita-Cristiana Totu
+#
+# Part of the QuadrotorSim aka quadsim package
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this package, in a file called LICENSE.
+# If not, see <https://www.gnu.org/licenses/>.
+
+""" Checks the RigidBodyBatch class against the single rigidbody class """
+
+__version__ = "0.1"
+__author__ = "Luminita-Cristiana Totu"
+__copyright__ = "Copyright (C) 2019 Luminita-Cristiana Totu"
+__license__ = "GNU GPLv3"
+
+import numpy as np
+import timeit
+
+from context import rb
+from context import qftau_cf
+
+
+def testcase_template_A(method):
+    """ N vehicles, different initial conditions and inputs, 
+    batch vs one rigidbody object per vehicle """
+    
+    print("Running Test Case: %s, method %s" % (name, method))
+    
+    quads = [ rb.rigidbody(pos[i], q[i], ve[i], omegab[i], np.zeros(3), 
+                           qftau.mass, qftau.I) for i in range(N) ]
+    batch = rb.RigidBodyBatch(pos, q, ve, omegab, qftau.mass, qftau.I)
+    
+    for t in np.arange(dt_sim,T_sim+dt_sim,dt_sim):
+        for i in range(N):
+            quads[i].run_quadrotor_dynamic_quat(dt_sim, fb[i], taub[i])
+        batch.run_quadrotor_dynamic_quat(dt_sim, fb, taub, method)
+        
+    for i in range(N):
+        assert np.allclose(quads[i].pos, batch.pos[i], atol=1e-6)
+        assert np.allclose(quads[i].q, batch.q[i], atol=1e-6)
+        assert np.allclose(quads[i].ve, batch.ve[i], atol=1e-6)
+        assert np.allclose(quads[i].omegab, batch.omegab[i], atol=1e-6)
+        assert np.allclose(quads[i].vb, batch.vb[i], atol=1e-6)
+        assert np.allclose(quads[i].rpy, batch.rpy[i], atol=1e-6)
+        assert np.allclose(quads[i].abmg, batch.abmg[i], atol=1e-9)
+    print("  passed")
+    
+def testcase_template_B():
+    """ Speed check, N vehicles, batch vs loop """
+    
+    quads = [ rb.rigidbody(pos[i], q[i], ve[i], omegab[i], np.zeros(3), 
+                           qftau.mass, qftau.I) for i in range(N) ]
+    batch = rb.RigidBodyBatch(pos, q, ve, omegab, qftau.mass, qftau.I)
+    
+    def loop():
+        for i in range(N):
+            quads[i].run_quadrotor_dynamic_quat(dt_sim, fb[i], taub[i])
+    
+    def vect():
+        batch.run_quadrotor_dynamic_quat(dt_sim, fb, taub)
+        
+    t_loop = timeit.timeit(loop, number=M)/M
+    t_vect = timeit.timeit(vect, number=M)/M
+    print("N = %d, loop with odeint %.6f s/step, batch rk4 %.6f s/step \n" 
+          % (N, t_loop, t_vect))
+
+#######################################################################
+
+np.random.seed(0)
+qftau = qftau_cf.QuadFTau_CF(0)
+
+N = 8
+pos = np.random.uniform(-1, 1, (N,3))
+q = np.random.normal(0, 1, (N,4))
+q = q / np.linalg.norm(q, axis=1)[:,None]
+ve = np.random.uniform(-1, 1, (N,3))
+omegab = np.random.uniform(-1, 1, (N,3))
+fb = np.zeros((N,3)); fb[:,2] = np.random.uniform(0.2, 0.4, N)
+taub = np.random.uniform(-1e-6, 1e-6, (N,3))
+
+dt_sim = 1.0/800
+T_sim = 0.5
+
+name = "0100_rigidbody_batch_vs_single"
+testcase_template_A("rk4")
+testcase_template_A("rk45")
+
+name = "0101_rigidbody_batch_speedcheck"
+print("Running Test Case: %s" % name)
+N = 256
+M = 20
+pos = np.zeros((N,3)); ve = np.zeros((N,3)); omegab = np.zeros((N,3))
+q = np.tile([1.0,0,0,0], (N,1))
+fb = np.tile([0,0,0.3], (N,1)); taub = np.zeros((N,3))
+testcase_template_B()
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+# 
+# Copyright 2019 Luminita-Cristiana Totu
+#
+# Part of the QuadrotorSim aka quadsim package
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this package, in a file called LICENSE.
+# If not, see <https://www.gnu.org/licenses/>.
+
+""" Accuracy and speed of the rigidbody integrators against odeint """
+
+__version__ = "0.1"
+__author__ = "Luminita-Cristiana Totu"
+__copyright__ = "Copyright (C) 2019 Luminita-Cristiana Totu"
+__license__ = "GNU GPLv3"
+
+import numpy as np
+import timeit
+from scipy.integrate import odeint
+
+from context import rb
+from context import qftau_cf
+
+
+def reference_solution():
+    """ odeint over the whole horizon with tight tolerances """
+    X = np.concatenate([pos, q, ve, omegab])
+    Y = odeint(rb.quadrotor_dt_dynamic_quat, X, np.array([0, T_sim]),
+               args=(qftau.mass, qftau.I, np.linalg.inv(qftau.I), fb, taub),
+               rtol=1e-12, atol=1e-12)
+    Y = Y[1]
+    Y[3:7] = Y[3:7]/np.linalg.norm(Y[3:7])
+    return Y
+
+def testcase_template_A(integrator):
+    """ Constant input, returns the final state and the time per step """
+    
+    quad = rb.rigidbody(pos, q, ve, omegab, np.zeros(3), qftau.mass, qftau.I, 
+                        integrator)
+    
+    n_steps = int(round(T_sim/dt_sim))
+    t0 = timeit.default_timer()
+    for i in range(n_steps):
+        quad.run_quadrotor_dynamic_quat(dt_sim, fb, taub)
+    t1 = timeit.default_timer()
+    
+    return (np.concatenate([quad.pos, quad.q, quad.ve, quad.omegab]), 
+            (t1-t0)/n_steps)
+
+#######################################################################
+
+qftau = qftau_cf.QuadFTau_CF(0)
+
+pos = np.array([0.0,0.0,3.0])
+q = np.array([1.0,0.0,0.0,0.0])
+ve = np.array([0.5,-0.2,0.1])
+omegab = np.array([2.0,-1.0,3.0])  # rad/s, tumbling
+fb = np.array([0.0,0.0,0.3])
+taub = np.array([1e-6,-2e-6,5e-7])
+
+dt_sim = 1.0/800
+T_sim = 2.0
+
+name = "1010_rigidbody_integrators"
+print("Running Test Case: %s \n" % name)
+
+Yref = reference_solution()
+print("%-10s %12s %12s %12s %14s" % ("method", "err pos", "err q", "err omegab", "time/step [s]"))
+for integrator in rb.rigidbody.integrators:
+    Y, t_step = testcase_template_A(integrator)
+    err_pos = np.max(np.abs(Y[0:3]-Yref[0:3]))
+    err_q = np.max(np.abs(Y[3:7]-Yref[3:7]))
+    err_omegab = np.max(np.abs(Y[10:13]-Yref[10:13]))
+    print("%-10s %12.3e %12.3e %12.3e %14.3e" % (integrator, err_pos, err_q, err_omegab, t_step))
+    if integrator in ("odeint", "rk4", "lie"):
+        assert err_pos < 1e-5 and err_q < 1e-5, integrator
+    else:
+        assert err_pos < 1e-2 and err_q < 1e-2, integrator
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2019 Luminita-Cristiana Totu
+#
+# Part of the QuadrotorSim aka quadsim package
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this package, in a file called LICENSE.
+# If not, see <https://www.gnu.org/licenses/>.
+
+""" Unit Tests for the scheduler module """
+
+__version__ = "0.1"
+__author__ = "Luminita-Cristiana Totu"
+__copyright__ = "Copyright (C) 2019 Luminita-Cristiana Totu"
+__license__ = "GNU GPLv3"
+
+from context import scheduler
+
+dt_sim = 1.0/800.0
+
+name = "1200_scheduler_periods"
+print("Running Test Case: %s" % name)
+sched = scheduler.Scheduler(dt_sim)
+calls = []
+sched.add("rate", 1.0/400, lambda: calls.append(("rate", sched.tick)))
+sched.add("gps", 1.0/20.0, lambda: calls.append(("gps", sched.tick)))
+sched.add("log", 0.1, lambda: calls.append(("log", sched.tick)), offset = -1)
+sched.add("vis", 1.0/30)  # 26.67 ticks, rounded to 27
+assert sched.period("rate") == 2 and sched.period("gps") == 40 and sched.period("vis") == 27
+for k in range(800):
+    sched.step()
+assert sched.tick == 800 and abs(sched.t - 1.0) < 1e-12
+assert [ k for n, k in calls if n == "rate" ] == list(range(0, 800, 2))
+assert [ k for n, k in calls if n == "gps" ] == list(range(0, 800, 40))
+assert [ k for n, k in calls if n == "log" ] == list(range(79, 800, 80))
+assert calls[0] == ("rate", 0) and calls[1] == ("gps", 0)  # in the order added
+timing = sched.timing()
+assert timing["gps"]["calls"] == 20 and timing["vis"]["calls"] == 0
+assert abs(timing["vis"]["rate"] - 800/27) < 1e-9
+try:
+    sched.add("fast", dt_sim/4)
+    assert False
+except ValueError:
+    pass
+print("  passed")
+
+name = "1201_scheduler_no_drift"
+print("Running Test Case: %s" % name)
+# a long run: the float check on an accumulated t misses, the ticks do not
+sched = scheduler.Scheduler(dt_sim)
+sched.add("gps", 1.0/20.0)
+sched.add("predict", 1.0/100.0)
+n_ticks = 800*3600
+float_gps = 0; tick_gps = 0; tick_predict = 0
+t = 0
+for k in range(n_ticks):
+    if abs(t/(1.0/20.0) - round(t/(1.0/20.0))) < 0.000001:
+        float_gps += 1
+    t = t + dt_sim
+    tick_gps += sched.due("gps")
+    tick_predict += sched.due("predict")
+    sched.advance()
+assert tick_gps == 20*3600 and tick_predict == 100*3600
+assert float_gps != tick_gps
+# the table and the modulo give the same due tasks
+big = scheduler.Scheduler(dt_sim)
+big.max_table = 10
+big.add("a", 3*dt_sim); big.add("b", 7*dt_sim, offset = 2); big.add("c", 11*dt_sim)
+small = scheduler.Scheduler(dt_sim)
+small.add("a", 3*dt_sim); small.add("b", 7*dt_sim, offset = 2); small.add("c", 11*dt_sim)
+for k in range(500):
+    assert [ task.name for task in big.due_tasks() ] == [ task.name for task in small.due_tasks() ]
+    big.advance(); small.advance()
+print("  passed")
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2019 Luminita-Cristiana Totu
+#
+# Part of the QuadrotorSim aka quadsim package
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this package, in a file called LICENSE.
+# If not, see <https://www.gnu.org/licenses/>.
+
+""" Unit Tests for the reference signals of utils """
+
+__version__ = "0.1"
+__author__ = "Luminita-Cristiana Totu"
+__copyright__ = "Copyright (C) 2019 Luminita-Cristiana Totu"
+__license__ = "GNU GPLv3"
+
+import numpy as np
+import timeit
+
+from context import ut, refs
+
+def give_signal_scan(ref, t):
+    # the linear scan give_signal used to do 
+    k = 0
+    n = len(ref)
+    while (ref[k,0] < t) and (k < n-1):
+        k+=1 
+    if (k==0):
+        return ref[k,1] 
+    return( ((ref[k,1]-ref[k-1,1])*t + (ref[k-1,1]*ref[k,0]-ref[k,1]*ref[k-1,0]))
+                 /(ref[k,0] - ref[k-1,0]) )
+
+name = "1300_signal_same_values"
+print("Running Test Case: %s" % name)
+for mode in ("step", "shortstep", "ramp", "sin", "hover"):
+    for ref in refs.buildCtrlReference(mode)[:4]:
+        # a grid past both ends, and the breakpoints themselves
+        ts = np.concatenate([ np.arange(-1, 100, 0.01), ref[:,0] ])
+        expected = np.array([ give_signal_scan(ref, t) for t in ts ])
+        signal = ut.Signal(ref)
+        assert np.array_equal(expected, [ ut.give_signal(ref, t) for t in ts ])
+        assert np.array_equal(expected, signal.evaluate(ts))
+        assert np.array_equal(expected, [ signal(t) for t in ts ])  # cursor goes back 
+        order = np.argsort(ts, kind="stable")
+        assert np.array_equal(expected[order], [ ut.give_signal(signal, t) for t in ts[order] ])
+        assert signal.t_end == ref[-1,0] and np.array_equal(signal[-1], ref[-1])
+print("  passed")
+
+name = "1301_signal_speedcheck"
+print("Running Test Case: %s" % name)
+ref = refs.buildCtrlReference("sin")[3]
+signal = ut.Signal(ref)
+ts = np.arange(0, 90, 0.005)
+t_old = timeit.timeit(lambda: [ give_signal_scan(ref, t) for t in ts ], number=1)
+t_new = timeit.timeit(lambda: [ signal(t) for t in ts ], number=1)
+t_grid = timeit.timeit(lambda: signal.evaluate(ts), number=1)
+print("  %d breakpoints, %d times: scan %.4f s, cursor %.4f s, grid %.5f s" % 
+      (len(ref), len(ts), t_old, t_new, t_grid))
+print("  passed")
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2019 Luminita-Cristiana Totu
+#
+# Part of the QuadrotorSim aka quadsim package
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this package, in a file called LICENSE.
+# If not, see <https://www.gnu.org/licenses/>.
+
+""" Unit Tests for the headless simulation """
+
+__version__ = "0.1"
+__author__ = "Luminita-Cristiana Totu"
+__copyright__ = "Copyright (C) 2019 Luminita-Cristiana Totu"
+__license__ = "GNU GPLv3"
+
+import os
+import sys
+import numpy as np
+
+from context import simulation, log
+
+folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "testresults")
+
+name = "1000_simulation_headless"
+print("Running Test Case: %s" % name)
+assert "pandaapp" not in sys.modules and "panda3d" not in sys.modules
+for estimator in simulation.estimators:
+    results = simulation.run(estimator=estimator, ref_mode="hover", t_end=2)
+    assert results.steps == 1600 and abs(results.t - 2) < 1e-9
+    assert len(results.log.rb_time) == 20 and results.log_file is None
+    # hovering at 3 m, estimate close to the truth
+    assert np.allclose(results.log.rb_pos[-1], [0,0,3], atol=0.3)
+    assert np.allclose(results.x[0:3], results.log.rb_pos[-1], atol=0.3)
+    assert results.P.shape == (results.x.size, results.x.size)
+print("  passed")
+
+name = "1001_simulation_reproducible"
+print("Running Test Case: %s" % name)
+config = simulation.SimConfig(ref_mode="shortstep", t_end=1.5, seed=3)
+r1 = simulation.run(config)
+r2 = simulation.run(config)
+r3 = simulation.run(config, seed=4)
+assert np.array_equal(r1.x, r2.x) and not np.array_equal(r1.x, r3.x)
+assert np.array_equal(np.asarray(r1.log.filter_pos), np.asarray(r2.log.filter_pos))
+print("  passed")
+
+name = "1002_simulation_log_file"
+print("Running Test Case: %s" % name)
+results = simulation.run({ "ref_mode": "manual", "ref": (1.0, 0.0, 3.0, 0.0), "t_end": 1.0,
+                           "log_folder": folder, "name": name })
+saved = log.Logger.load(results.log_file)
+assert np.allclose(saved.posctrl_pos_ref, [1.0, 0.0, 3.0])
+assert np.array_equal(saved.rb_pos, np.asarray(results.log.rb_pos))
+try:
+    simulation.run(ref_mode="manual")
+    assert False
+except ValueError:
+    pass
+print("  passed")
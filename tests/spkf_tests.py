@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+# 
+# Copyright 2021 Luminita-Cristiana Totu
+#
+# Part of the QuadrotorSim aka quadsim package
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this package, in a file called LICENSE.
+# If not, see <https://www.gnu.org/licenses/>.
+
+""" Unit Tests for the spkf module """
+
+__version__ = "0.1"
+__author__ = "Luminita-Cristiana Totu"
+__copyright__ = "Copyright (C) 2019 Luminita-Cristiana Totu"
+__license__ = "GNU GPLv3"
+
+import numpy as np
+import timeit
+
+from context import rb
+from context import spkf
+
+
+def make_filter(batch, variant = 1):
+    sut = spkf.SUT(1e-3, 2.0, 0, x0.shape[0])
+    if batch:
+        f = rb.motion3d_ros_biases_batch
+    else:
+        f = rb.motion3d_ros_biases
+    return spkf.SPKF(f, np.eye(x0.shape[0]), Q, x0.copy(), P0.copy(), sut, 
+                     variant, batch)
+
+def run_filter(filter, batch, var = (1, 0, 1)):
+    """ predict, then the three updates, n_cycles times """
+    if batch:
+        h_pos = rb.motion3d_ros_biases_meas_pos_batch
+        h_vb = rb.motion3d_ros_biases_meas_vb_batch
+        h_imu = rb.motion3d_ros_biases_meas_imu_batch
+    else:
+        h_pos = rb.motion3d_ros_biases_meas_pos
+        h_vb = rb.motion3d_ros_biases_meas_vb
+        h_imu = rb.motion3d_ros_biases_meas_imu
+    for k in range(n_cycles):
+        filter.predict(0, 0.01, 1)
+        filter.update(meas_pos[k], h_pos, 0, R_pos, var[0])
+        filter.update(meas_vb[k], h_vb, 0, R_vb, var[1])
+        filter.update(meas_imu[k], h_imu, 0, R_imu, var[2])
+    return filter
+
+def testcase_template_A(variant):
+    """ batch mode gives the same estimates as the list mode, up to the
+    rounding amplified by the large sigma point weights ( alpha = 1e-3 ) """
+    
+    print("Running Test Case: %s, variant %d" % (name, variant))
+    f_list = run_filter(make_filter(False, variant), False)
+    f_batch = run_filter(make_filter(True, variant), True)
+    assert np.allclose(f_list.x, f_batch.x, rtol=1e-6, atol=1e-6)
+    assert np.allclose(f_list.P, f_batch.P, rtol=1e-6, atol=1e-6)
+    print("  passed")
+
+def testcase_template_B(alpha, var):
+    """ the square root filter follows the SPKF, simple ( var 0 ) and 
+    Joseph form updates """
+    
+    print("Running Test Case: %s, alpha %g, var %s" % (name, alpha, var))
+    sut = spkf.SUT(alpha, 2.0, 0, x0.shape[0])
+    f = rb.motion3d_ros_biases_batch
+    f_ref = spkf.SPKF(f, np.eye(21), Q, x0.copy(), P0.copy(), sut, 0, True)
+    f_sr = spkf.SRSPKF(f, np.eye(21), Q, x0.copy(), P0.copy(), sut, 0, True)
+    f_ref = run_filter(f_ref, True, var)
+    f_sr = run_filter(f_sr, True, var)
+    assert np.allclose(f_ref.x, f_sr.x, rtol=1e-6, atol=1e-6)
+    assert np.allclose(f_ref.P, f_sr.P, rtol=1e-6, atol=1e-6)
+    assert np.allclose(f_sr.S, np.tril(f_sr.S))
+    print("  passed")
+
+#######################################################################
+
+np.random.seed(0)
+x0 = np.zeros(21); x0[2] = 3
+P0 = np.diag([100.0,100.0,100.0, 0.01,0.01,9.0, 9.0,9.0,9.0, 0.1,0.1,0.1, 
+              1,1,1, 1e-6,1e-6,1e-6, 1e-6,1e-6,1e-6])
+Q = np.diag([0.0001,0.0001,0.0001, 0.0001,0.0001,0.0001, 0.01,0.01,0.01, 
+             0.1,0.1,0.1, 1,1,1, 1e-6,1e-6,1e-6, 1e-6,1e-6,1e-6])
+R_pos = np.diag([0.02**2,0.02**2,0.05**2])
+R_vb = np.diag([0.1**2,0.1**2,0.1**2])
+R_imu = np.diag([1e-4,1e-4,1e-4, 1e-3,1e-3,1e-3])
+
+n_cycles = 20
+meas_pos = np.array([0,0,3]) + np.random.normal(0, 0.02, (n_cycles,3))
+meas_vb = np.random.normal(0, 0.1, (n_cycles,3))
+meas_imu = np.array([0,0,0,0,0,9.81]) + np.random.normal(0, 0.01, (n_cycles,6))
+
+name = "0400_spkf_batch_vs_list"
+testcase_template_A(0)
+testcase_template_A(1)
+
+name = "0401_srspkf_vs_spkf"
+testcase_template_B(1e-3, (0, 0, 0))
+testcase_template_B(1.0, (0, 0, 0))
+testcase_template_B(1e-3, (1, 0, 1))
+testcase_template_B(1.0, (1, 1, 1))
+
+name = "0402_spkf_speedcheck"
+print("Running Test Case: %s" % name)
+n_cycles = 5
+M = 5
+t_list = timeit.timeit(lambda: run_filter(make_filter(False), False), number=M)/M/n_cycles
+t_batch = timeit.timeit(lambda: run_filter(make_filter(True), True), number=M)/M/n_cycles
+sut = spkf.SUT(1e-3, 2.0, 0, x0.shape[0])
+t_sr = timeit.timeit(lambda: run_filter(spkf.SRSPKF(rb.motion3d_ros_biases_batch, 
+        np.eye(21), Q, x0.copy(), P0.copy(), sut, 0, True), True), number=M)/M/n_cycles
+print("predict + 3 updates, list %.3e s, batch %.3e s, square root batch %.3e s \n" 
+      % (t_list, t_batch, t_sr))
+
+name = "0403_cholupdate"
+print("Running Test Case: %s" % name)
+A = np.random.normal(0, 1, (6, 6))
+L = np.linalg.cholesky(A@A.T + np.eye(6))
+X = np.random.normal(0, 0.3, (6, 3))
+for sign in (1.0, -1.0):
+    L1 = spkf.cholupdate(L, X, sign)
+    assert np.allclose(L1, np.tril(L1)) and np.all(np.diagonal(L1) > 0)
+    assert np.allclose(L1@L1.T, L@L.T + sign*X@X.T, rtol=0, atol=1e-10)
+# the numpy version of the downdate, same as the kernel
+L2 = L.copy()
+assert spkf._chol_downdate_numpy(L2, X.copy())
+assert np.allclose(L2, L1, rtol=0, atol=1e-12)
+# a downdate past positive definiteness raises
+try:
+    spkf.cholupdate(L, 10*X, -1.0)
+    assert False, "no LinAlgError"
+except np.linalg.LinAlgError:
+    pass
+print("  passed")
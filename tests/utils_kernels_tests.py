@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+# 
+# Copyright 2021 Luminita-Cristiana Totu
+#
+# Part of the QuadrotorSim aka quadsim package
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this package, in a file called LICENSE.
+# If not, see <https://www.gnu.org/licenses/>.
+
+""" Parity tests, kernels module vs the numpy versions in utils """
+
+__version__ = "0.1"
+__author__ = "Luminita-Cristiana Totu"
+__copyright__ = "Copyright (C) 2019 Luminita-Cristiana Totu"
+__license__ = "GNU GPLv3"
+
+import numpy as np
+import math
+import timeit
+
+from context import ut
+from context import kernels
+
+
+def testcase_template_A(fname, inputs, n_args = 1):
+    """ Same outputs for all the inputs, compiled ( if numba ) and 
+    pure Python kernel against the numpy version """
+    
+    print("Running Test Case: %s, %s" % (name, fname))
+    
+    f_np = ut.numpy_kernels[fname]
+    f_k = getattr(kernels, fname)
+    f_list = [ f_k ]
+    if kernels.compiled:
+        f_list.append(f_k.py_func)
+    
+    for x in inputs:
+        args = x if n_args > 1 else (x,)
+        ref = f_np(*args)
+        for f in f_list:
+            assert np.allclose(f(*args), ref, rtol=1e-12, atol=1e-12), (fname, x)
+    print("  passed")
+    
+def testcase_template_B(fname, x):
+    """ Speed check, numpy version vs utils ( compiled if numba ) """
+    
+    f_np = ut.numpy_kernels[fname]
+    f_ut = getattr(ut, fname)
+    f_ut(x)  # compile 
+    t_np = timeit.timeit(lambda: f_np(x), number=M)/M
+    t_ut = timeit.timeit(lambda: f_ut(x), number=M)/M
+    print("%-20s numpy %.3e s, utils %.3e s" % (fname, t_np, t_ut))
+
+#######################################################################
+
+np.random.seed(0)
+K = 200
+
+quats = np.random.normal(0, 1, (K,4))
+quats = quats/np.linalg.norm(quats, axis=1)[:,None]
+vects = np.random.normal(0, 3, (K,3))
+angles = np.column_stack([ np.random.uniform(-math.pi, math.pi, K),
+                           np.random.uniform(-math.pi/2+1e-3, math.pi/2-1e-3, K),
+                           np.random.uniform(-math.pi, math.pi, K) ])
+rotms = [ ut.numpy_kernels["rpy2rotm"](a) for a in angles ]
+
+name = "0200_kernels_parity"
+print("numba compiled kernels: %s" % kernels.compiled)
+testcase_template_A("quat2rotm", quats)
+testcase_template_A("skew", vects)
+testcase_template_A("quaternion_multiply", list(zip(quats[:-1], quats[1:])), 2)
+testcase_template_A("rpy2q", angles)
+testcase_template_A("rpy2rotm", angles)
+testcase_template_A("rotm2rpy", rotms)
+
+name = "0201_kernels_gimbal_lock"
+print("Running Test Case: %s" % name)
+for pitch in [ math.pi/2, -math.pi/2 ]:
+    R = ut.numpy_kernels["rpy2rotm"](np.array([0.3, pitch, 0.0]))
+    assert np.allclose(ut.numpy_kernels["rpy2rotm"](kernels.rotm2rpy(R)), R, atol=1e-6)
+print("  passed")
+
+name = "0202_kernels_speedcheck"
+print("Running Test Case: %s" % name)
+M = 20000
+testcase_template_B("quat2rotm", quats[0])
+testcase_template_B("skew", vects[0])
+testcase_template_B("rpy2q", angles[0])
+testcase_template_B("rpy2rotm", angles[0])
+testcase_template_B("rotm2rpy", rotms[0])
+
+name = "0203_utils_inputs"
+print("Running Test Case: %s" % name)
+# lists, stacked inputs and sol go to the numpy versions
+assert np.array_equal(ut.rpy2rotm(angles[0:5]), ut.numpy_kernels["rpy2rotm"](angles[0:5]))
+assert np.array_equal(ut.rotm2rpy(np.array(rotms[0:5])), 
+                      ut.numpy_kernels["rotm2rpy"](np.array(rotms[0:5])))
+assert np.array_equal(ut.rotm2rpy(rotms[0], sol=2), ut.numpy_kernels["rotm2rpy"](rotms[0], 2))
+assert np.allclose(ut.quat2rotm(list(quats[0])), ut.numpy_kernels["quat2rotm"](quats[0]))
+assert np.allclose(ut.skew([1, 2, 3]), ut.numpy_kernels["skew"](np.array([1.0, 2.0, 3.0])))
+assert np.array_equal(ut.quaternion_multiply(quats[0:4].T, quats[4:8].T),
+                      ut.numpy_kernels["quaternion_multiply"](quats[0:4].T, quats[4:8].T))
+assert np.allclose(ut.rpy2q([0.1, 0.2, 0.3]), ut.numpy_kernels["rpy2q"]([0.1, 0.2, 0.3]))
+print("  passed")